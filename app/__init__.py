@@ -1,12 +1,13 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from flask_login import LoginManager
 from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import timedelta 
+from app import utils as date_filters
 from app.utils import momentjs
-from lib.database import connect_db
+from app.fragment_cache import cached_card
+from lib.database import connect_db, replica_urls
 import os
 import hashlib
 import logging
@@ -28,6 +29,10 @@ app.wsgi_app = ProxyFix(  # type: ignore[assignment]
 
 csrf = CSRFProtect(app)
 
+# Queue-backed JSON logging and X-Request-ID correlation
+from app import log_pipeline
+log_pipeline.init_app(app)
+
 if app.config['DATABASE_DEFAULT'] == 'postgres':
     connect_db('postgres', app)
 elif app.config['DATABASE_DEFAULT'] == 'mysql':
@@ -35,12 +40,19 @@ elif app.config['DATABASE_DEFAULT'] == 'mysql':
 else:
     """ sqlite connection """
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(app.instance_path, app.config['DATABASE_NAME'])
+app.config.setdefault('DB_REPLICA_URLS', replica_urls(app.config['DATABASE_DEFAULT']))
 
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['PERMANENT_SESSION_LIFETIME'] =  timedelta(minutes=120)
 # Set jinja template global
 app.jinja_env.globals['momentjs'] = momentjs
+app.jinja_env.globals['cached_card'] = cached_card
+# Date filters: calendar, fromnow, fmt
+date_filters.init_app(app)
+# Cached markdown rendering (see app/markdown_render.py)
+from app import markdown_render
+markdown_render.init_app(app)
 
 # Add md5 filter for Gravatar
 @app.template_filter('md5')
@@ -51,29 +63,7 @@ def md5_filter(text):
 @app.template_filter('render_markdown')
 def render_markdown(text):
     """Render markdown text to HTML"""
-    import markdown
-    from bleach import clean
-    
-    if not text:
-        return ''
-    
-    # Convert markdown to HTML
-    html = markdown.markdown(text, extensions=['fenced_code', 'tables', 'pymdownx.tilde'])
-    
-    # Sanitize HTML to allow safe tags
-    allowed_tags = [
-        'p', 'br', 'strong', 'em', 'u', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-        'ul', 'ol', 'li', 'blockquote', 'code', 'pre', 'a', 'img', 'hr',
-        'table', 'thead', 'tbody', 'tr', 'th', 'td', 'del', 's', 'strike'
-    ]
-    allowed_attrs = {
-        'a': ['href', 'title'],
-        'img': ['src', 'alt', 'title'],
-        'code': ['class'],
-        'pre': ['class']
-    }
-    
-    return clean(html, tags=allowed_tags, attributes=allowed_attrs, strip=False)
+    return markdown_render.render_markdown(text, policy='page')
 
 # Add cache-busting headers for static files in development
 @app.after_request
@@ -90,6 +80,11 @@ def add_security_headers(response):
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '0'
     
+    # ETag-validated responses (see app/data_version.py) may be stored by the
+    # browser, but must be revalidated with If-None-Match on every use
+    if response.headers.get('ETag'):
+        response.headers['Cache-Control'] = 'private, no-cache, must-revalidate'
+    
     # Security headers
     response.headers['X-Content-Type-Options'] = 'nosniff'
     response.headers['X-Frame-Options'] = 'DENY'
@@ -133,19 +128,58 @@ def disable_cache():
     """Disable caching on all responses to ensure direct online queries"""
     pass
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Reads in GET requests go to a replica when DB_REPLICA_URLS is set (see app/db_routing.py)
+from app.db_routing import RoutingSession
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 
-with app.app_context():
-    if db.engine.url.drivername == 'sqlite': # type: ignore[attr-defined]
-        migrate.init_app(app, db, render_as_batch=True)
-    else:
-        migrate.init_app(app, db)
+# Read-replica engines and per-request routing
+from app import db_routing
+db_routing.init_app(app, db)
+
+# SQLite pragmas (WAL, busy timeout, cache) and periodic WAL checkpoints
+from app import sqlite_tuning
+sqlite_tuning.init_app(app, db)
 
-# Register CLI commands
+# Register CLI commands (including `flask db`, which loads Flask-Migrate on demand)
 from app import cli
 cli.create_cli(app)
 
+# Per-request Server-Timing / SQL instrumentation
+from app import request_timing
+request_timing.init_app(app)
+
+# Prometheus-style /metrics collection (endpoint lives in routes.py)
+from app import metrics
+metrics.init_app(app, db)
+
+# Admin-armed cProfile capture (see Admin Panel > Profiler)
+from app import profiler
+profiler.init_app(app)
+
+# In-process reminder heap; wakes reminder streams when reminders fall due
+from app import reminder_scheduler
+reminder_scheduler.init_app(app)
+
+# Background sender for queued email (verification, invitations, reminder digests)
+from app import email_service
+email_service.init_app(app)
+
+# Pooled requests.Session shared by outbound API calls
+from app import http_client
+http_client.init_app(app)
+
+# /api/quote pool, refreshed from the quote API in the background
+from app import quote_service
+quote_service.init_app(app)
+
+# Cached IP -> timezone resolver used at sign-up
+from app import geolocation
+geolocation.init_app(app)
+
+# Cached Google discovery document and signing certificates
+from app import oauth
+oauth.init_app(app)
+
 from app import routes, models, utils
 
 # Serve service worker at root scope
@@ -162,30 +196,31 @@ def cleanup_pending_deletions():
         from datetime import datetime, timedelta
         from app import models
         
-        # Find accounts marked for deletion that are older than 1 hour
-        one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-        pending_deletions = models.User.query.filter(
-            models.User.pending_deletion == True,
-            models.User.deletion_requested_at <= one_hour_ago
-        ).all()
-        
-        for user in pending_deletions:
-            try:
-                # Delete all related todos first
-                models.Todo.query.filter_by(user_id=user.id).delete()
-                
-                # Delete the user
-                db.session.delete(user)
-                logging.info(f'Permanently deleted unverified account: {user.email}')
-            except Exception as e:
-                logging.error(f'Error deleting user {user.email}: {str(e)}')
-        
-        if pending_deletions:
-            db.session.commit()
-            logging.info(f'Cleaned up {len(pending_deletions)} pending account deletions')
+        with metrics.track_job('cleanup_pending_deletions'):
+            # Find accounts marked for deletion that are older than 1 hour
+            one_hour_ago = datetime.utcnow() - timedelta(hours=1)
+            pending_deletions = models.User.query.filter(
+                models.User.pending_deletion == True,
+                models.User.deletion_requested_at <= one_hour_ago
+            ).all()
+            
+            for user in pending_deletions:
+                try:
+                    # Delete all related todos first
+                    models.Todo.query.filter_by(user_id=user.id).delete()
+                    
+                    # Delete the user
+                    db.session.delete(user)
+                    logging.info('Permanently deleted unverified account: %s', user.email)
+                except Exception as e:
+                    logging.error('Error deleting user %s: %s', user.email, e)
+            
+            if pending_deletions:
+                db.session.commit()
+                logging.info('Cleaned up %s pending account deletions', len(pending_deletions))
     
     except Exception as e:
-        logging.error(f'Error in cleanup_pending_deletions: {str(e)}')
+        logging.error('Error in cleanup_pending_deletions: %s', e)
         # Don't raise - this is a background operation
 
 def initialize_default_data():
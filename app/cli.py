@@ -5,12 +5,56 @@ Add this to app/cli.py
 
 import click
 import getpass
+from sqlalchemy.engine import make_url
 from app import db
 from app.models import User
 
+
+class MigrateGroup(click.Group):
+    """``flask db``: sets up Flask-Migrate (which imports alembic) only when a db command runs"""
+
+    def __init__(self, app, db, **kwargs):
+        # Same options as flask_migrate.cli.db; its callback stores them on g for Migrate.get_config()
+        params = [
+            click.Option(['-d', '--directory'], default=None,
+                         help='Migration script directory (default is "migrations")'),
+            click.Option(['-x', '--x-arg'], multiple=True,
+                         help='Additional arguments consumed by custom env.py scripts'),
+        ]
+        super().__init__(name='db', help='Perform database migrations.', params=params,
+                         callback=self._invoke_migrate_group, **kwargs)
+        self.app = app
+        self.db = db
+        self._group = None
+
+    def _migrate_group(self):
+        if self._group is None:
+            from flask_migrate import Migrate
+            from flask_migrate.cli import db as db_group
+
+            if make_url(self.app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+                Migrate(self.app, self.db, render_as_batch=True)
+            else:
+                Migrate(self.app, self.db)
+            self._group = db_group
+        return self._group
+
+    def _invoke_migrate_group(self, directory, x_arg):
+        return self._migrate_group().callback(directory=directory, x_arg=x_arg)
+
+    def list_commands(self, ctx):
+        return self._migrate_group().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._migrate_group().get_command(ctx, name)
+
+
 def create_cli(app):
     """Register CLI commands with Flask app"""
     
+    # Flask-Migrate's `flask db` commands, loaded on demand
+    app.cli.add_command(MigrateGroup(app, db))
+    
     @app.cli.command()
     @click.option('--username', prompt=False, help='Username')
     @click.option('--email', prompt=False, help='Email address')
@@ -162,3 +206,63 @@ def create_cli(app):
         except Exception as e:
             click.echo(f'❌ Error deleting user: {e}')
             db.session.rollback()
+    
+    @app.cli.command('send-reminder-emails')
+    @click.option('--limit', default=100, show_default=True, help='Maximum emails to send in this run')
+    def send_reminder_emails(limit):
+        """Queue reminder digest emails and deliver the email outbox (run every minute)"""
+        from app import metrics
+        from app.email_service import send_outbox
+        from app.reminder_service import ReminderService
+        
+        with metrics.track_job('reminder_emails'):
+            queued = 0
+            if app.config.get('REMINDER_EMAIL_ENABLED'):
+                queued = ReminderService.queue_reminder_digests()
+            sent, failed = send_outbox(limit=limit)
+        click.echo(f'Queued {queued} digest(s); sent {sent}, failed {failed}')
+    
+    @app.cli.command('cleanup-tokens')
+    def cleanup_tokens():
+        """Delete expired email verification tokens (run daily)"""
+        from app import metrics
+        from app.verification import VerificationToken
+        
+        with metrics.track_job('cleanup_tokens'):
+            deleted = VerificationToken.purge_expired()
+        click.echo(f'Deleted {deleted} expired token(s)')
+    
+    @app.cli.command('cleanup-outbox')
+    @click.option('--days', type=int, default=None, help='Keep sent/failed emails this many days (default: EMAIL_OUTBOX_RETENTION_DAYS)')
+    def cleanup_outbox(days):
+        """Delete sent and failed outbox emails past their retention (run daily)"""
+        from app import metrics
+        from app.email_service import purge_outbox
+        
+        if days is None:
+            days = app.config.get('EMAIL_OUTBOX_RETENTION_DAYS', 7)
+        with metrics.track_job('cleanup_outbox'):
+            deleted = purge_outbox(days)
+        click.echo(f'Deleted {deleted} outbox email(s) older than {days} day(s)')
+    
+    @app.cli.command('sqlite-maintenance')
+    def sqlite_maintenance():
+        """Checkpoint the SQLite WAL and run PRAGMA optimize"""
+        from app.sqlite_tuning import checkpoint
+        
+        if db.engine.url.drivername != 'sqlite':
+            click.echo('Not using SQLite, nothing to do')
+            return
+        busy, wal_pages, checkpointed = checkpoint(db.engine, app.config.get('SQLITE_CHECKPOINT_MODE', 'TRUNCATE'))
+        click.echo(f'Checkpointed {checkpointed}/{wal_pages} WAL page(s){" (readers busy)" if busy else ""}')
+    
+    @app.cli.command('email-worker')
+    def email_worker():
+        """Deliver queued email continuously over one SMTP connection (Ctrl+C to stop)"""
+        from app.email_service import outbox_worker
+        
+        click.echo('📧 Email outbox worker running...')
+        try:
+            outbox_worker.run(app)
+        except KeyboardInterrupt:
+            click.echo('Stopped.')
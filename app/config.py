@@ -16,15 +16,117 @@ if not os.environ.get('SECRET_KEY'):
 DATABASE_NAME = os.environ.get('DATABASE_NAME', 'todobox.db')
 DATABASE_DEFAULT = os.environ.get('DATABASE_DEFAULT', 'sqlite') # sqlite, mysql, or postgres
 
+# Read replicas: DB_REPLICA_URLS (comma separated, parsed in lib/database.py) sends GET requests' reads to a replica
+DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', '5'))  # Primary-only window after a user's write
+
+# SQLite production profile (see app/sqlite_tuning.py); pragmas run on every new connection
+SQLITE_TUNING_ENABLED = os.environ.get('SQLITE_TUNING_ENABLED', 'true').lower() == 'true'
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', '5000'))  # Milliseconds a writer waits for the lock
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', '-16000'))  # Negative = KiB (16 MB), positive = pages
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', '134217728'))  # Bytes (128 MB)
+SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+SQLITE_MAINTENANCE_INTERVAL = float(os.environ.get('SQLITE_MAINTENANCE_INTERVAL', '600'))  # Seconds between wal_checkpoint/optimize runs, 0 = off
+SQLITE_CHECKPOINT_MODE = os.environ.get('SQLITE_CHECKPOINT_MODE', 'TRUNCATE')
+
+# Database connection pool (mysql/postgres presets and DB_POOL_* overrides live in lib/database.py)
+DB_POOL_SLOW_CHECKOUT = float(os.environ.get('DB_POOL_SLOW_CHECKOUT', '0.5'))  # Seconds waiting for a connection before a warning is logged
+DB_POOL_LOG_INTERVAL = float(os.environ.get('DB_POOL_LOG_INTERVAL', '0'))  # Seconds between pool status log lines, 0 = off
+
 # Todo Encryption Configuration
 # Set to 'true' to enable encryption of todo data (name, details, details_html)
 # When enabled, database administrators cannot read todo content in raw database
 TODO_ENCRYPTION_ENABLED = os.environ.get('TODO_ENCRYPTION_ENABLED', 'false').lower() == 'true'
 
+# Rendered todo card cache (see app/fragment_cache.py)
+# Backend: 'memory' (per-process LRU), 'file' (shared directory, e.g. /dev/shm/todobox-cards) or 'none'
+# 'file' falls back to 'memory' when TODO_ENCRYPTION_ENABLED is on (cards contain decrypted text)
+FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'memory')
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', '2048'))  # Max cards held by the memory backend
+FRAGMENT_CACHE_DIR = os.environ.get('FRAGMENT_CACHE_DIR', '')  # Defaults to instance/fragment_cache
+
+# Rendered markdown cache (see app/markdown_render.py): entries keyed by a hash of the source text, 0 disables
+MARKDOWN_CACHE_SIZE = int(os.environ.get('MARKDOWN_CACHE_SIZE', '1024'))
+
+# Logging (see app/log_pipeline.py): JSON lines written by a background thread, tagged with the request id
+# Installed on the first served request (not in tests or CLI commands)
+LOG_PIPELINE_ENABLED = os.environ.get('LOG_PIPELINE_ENABLED', 'true').lower() == 'true'
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # 'json' or 'text'
+LOG_FILE = os.environ.get('LOG_FILE', '')  # Defaults to stderr
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))  # Records buffered before new ones are dropped
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', 'app.reminders.poll=0.01')  # Fraction of INFO/DEBUG records kept per logger
+
+# Request timing instrumentation (see app/request_timing.py)
+# Adds a Server-Timing header and a JSON log line with SQL/template/encryption time
+REQUEST_TIMING_ENABLED = os.environ.get('REQUEST_TIMING_ENABLED', 'true').lower() == 'true'
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', '0.01'))  # Fraction of requests instrumented
+# Who receives the Server-Timing header: 'admin' (sessions that logged in as a system admin; always timed), 'all' or 'off'
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'admin').lower()
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '20'))  # Repeats of one SQL statement before warning
+
+# Metrics endpoint (see app/metrics.py)
+# /metrics accepts 'Authorization: Bearer <METRICS_TOKEN>' or an admin user's API token
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_DIR = os.environ.get('METRICS_DIR', '')  # Shared by all workers; defaults to instance/metrics. Only request-serving processes write here
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '1.0'))  # Seconds between per-worker flushes
+
+# Request profiler (Admin Panel > Profiler); profiles are stored in instance/profiles by default
+PROFILER_DIR = os.environ.get('PROFILER_DIR', '')
+PROFILER_MAX_REQUESTS = int(os.environ.get('PROFILER_MAX_REQUESTS', '50'))  # Upper bound per arming
+
+# In-process reminder scheduler (see app/reminder_scheduler.py)
+# Answers "is anything due" from memory; set to 'false' to always query the database
+REMINDER_SCHEDULER_ENABLED = os.environ.get('REMINDER_SCHEDULER_ENABLED', 'true').lower() == 'true'
+
+# Polling hints returned by /api/reminders/check (seconds); idle users poll at the max
+REMINDER_POLL_MIN_INTERVAL = int(os.environ.get('REMINDER_POLL_MIN_INTERVAL', '5'))
+REMINDER_POLL_MAX_INTERVAL = int(os.environ.get('REMINDER_POLL_MAX_INTERVAL', '300'))
+
+# Reminder email digests (see ReminderService.queue_reminder_digests); run 'flask send-reminder-emails' every minute to queue them
+REMINDER_EMAIL_ENABLED = os.environ.get('REMINDER_EMAIL_ENABLED', 'false').lower() == 'true'
+REMINDER_EMAIL_WINDOW = int(os.environ.get('REMINDER_EMAIL_WINDOW', '60'))  # Seconds to collect due reminders into one digest
+REMINDER_EMAIL_MAX_PER_HOUR = int(os.environ.get('REMINDER_EMAIL_MAX_PER_HOUR', '4'))  # Digests per user per hour
+
+# Reminder Server-Sent Events stream (see app/reminder_stream.py). Off by default: each open stream holds a
+# worker thread, so only enable it with threaded or gevent workers (gunicorn -k gthread --threads N, or -k gevent)
+# Browsers poll /api/reminders/check when disabled or when a worker is at its cap
+REMINDER_STREAM_ENABLED = os.environ.get('REMINDER_STREAM_ENABLED', 'false').lower() == 'true'
+REMINDER_STREAM_MAX_PER_WORKER = int(os.environ.get('REMINDER_STREAM_MAX_PER_WORKER', '50'))
+REMINDER_STREAM_HEARTBEAT = float(os.environ.get('REMINDER_STREAM_HEARTBEAT', '15'))  # Seconds between keep-alive comments
+REMINDER_STREAM_MAX_AGE = float(os.environ.get('REMINDER_STREAM_MAX_AGE', '3600'))  # Seconds before the client is asked to reconnect
+
+# Quote pool for /api/quote (see app/quote_service.py); fetched in the background, never during a request
+QUOTE_SERVICE_ENABLED = os.environ.get('QUOTE_SERVICE_ENABLED', 'true').lower() == 'true'
+QUOTE_API_URL = os.environ.get('QUOTE_API_URL', 'https://zenquotes.io/api/quotes')
+QUOTE_REFRESH_INTERVAL = float(os.environ.get('QUOTE_REFRESH_INTERVAL', '3600'))  # Seconds between pool refreshes
+QUOTE_FETCH_TIMEOUT = float(os.environ.get('QUOTE_FETCH_TIMEOUT', '5'))
+QUOTE_BREAKER_THRESHOLD = int(os.environ.get('QUOTE_BREAKER_THRESHOLD', '3'))  # Consecutive failures before backing off
+QUOTE_BREAKER_COOLDOWN = float(os.environ.get('QUOTE_BREAKER_COOLDOWN', '300'))  # Seconds to leave the API alone
+
+# Keep-alive connections pooled per host for outbound API calls (see app/http_client.py)
+OUTBOUND_HTTP_POOL_SIZE = int(os.environ.get('OUTBOUND_HTTP_POOL_SIZE', '10'))
+
+# IP geolocation used to preset the timezone at sign-up (see app/geolocation.py)
+# Backends are tried in order; 'mmdb' needs GEOIP_MMDB_PATH (a GeoLite2-City .mmdb) and 'pip install maxminddb'
+GEOIP_BACKENDS = os.environ.get('GEOIP_BACKENDS', 'mmdb,ip-api')
+GEOIP_MMDB_PATH = os.environ.get('GEOIP_MMDB_PATH', '')
+GEOIP_CACHE_SIZE = int(os.environ.get('GEOIP_CACHE_SIZE', '4096'))  # Networks kept in memory per worker
+GEOIP_CACHE_TTL = float(os.environ.get('GEOIP_CACHE_TTL', '86400'))  # Seconds
+GEOIP_CACHE_FILE = os.environ.get('GEOIP_CACHE_FILE', '')  # SQLite file in the instance folder shared by workers, e.g. geoip_cache.sqlite
+
 # Google OAuth Configuration
 GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID', '')
 GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET', '')
 GOOGLE_DISCOVERY_URL = 'https://accounts.google.com/.well-known/openid-configuration'
+GOOGLE_CERTS_URL = os.environ.get('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+
+# Discovery document and signing certificates are cached per their Cache-Control headers (see app/oauth.py)
+OAUTH_METADATA_REFRESH_ENABLED = os.environ.get('OAUTH_METADATA_REFRESH_ENABLED', 'true').lower() == 'true'  # Refresh in the background before expiry
+OAUTH_METADATA_DEFAULT_TTL = float(os.environ.get('OAUTH_METADATA_DEFAULT_TTL', '3600'))  # Seconds, when the provider sends no caching headers
+OAUTH_HTTP_TIMEOUT = float(os.environ.get('OAUTH_HTTP_TIMEOUT', '10'))
 
 # Google OAuth UX and security
 # Default to showing the Google account chooser to avoid silent auto-login
@@ -39,6 +141,15 @@ SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
 SMTP_USERNAME = os.environ.get('SMTP_USERNAME', '')
 SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')  # App-specific password for Gmail
 SMTP_FROM_EMAIL = os.environ.get('SMTP_FROM_EMAIL', '')
+SMTP_IDLE_TIMEOUT = int(os.environ.get('SMTP_IDLE_TIMEOUT', '60'))  # Seconds the outbox worker keeps an unused connection open
+
+# Email outbox worker (see app/email_service.py); requests only queue mail
+# Set EMAIL_OUTBOX_WORKER_ENABLED to 'false' when running 'flask email-worker' as a separate process
+EMAIL_OUTBOX_WORKER_ENABLED = os.environ.get('EMAIL_OUTBOX_WORKER_ENABLED', 'true').lower() == 'true'
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.environ.get('EMAIL_OUTBOX_POLL_INTERVAL', '10'))  # Seconds between checks when idle
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', '50'))
+# Bodies are cleared once a message is sent or failed; 'flask cleanup-outbox' deletes the rows after this many days
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.environ.get('EMAIL_OUTBOX_RETENTION_DAYS', '7'))
 
 # Reverse Proxy Configuration (for running behind load balancers, tunnels, etc.)
 # Set these values to the number of trusted proxy layers for each header type
@@ -0,0 +1,223 @@
+"""
+Per-user data versioning and conditional GET support.
+
+Every user row carries a ``data_version`` counter that is bumped whenever
+one of their Todo, Tracker, KIV or TodoShare rows is written. List pages and
+polling endpoints derive a weak ETag from that counter so repeated requests
+can be answered with ``304 Not Modified`` before any expensive query runs.
+"""
+
+import calendar
+import hashlib
+import time
+from datetime import date
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, or_, select
+
+from app import db
+from app.db_routing import sticky_deadline
+from app.metrics import cache_hit
+from app.models import KIV, Todo, TodoShare, Tracker, User
+
+
+def _collect_user_ids(session_):
+    """Collect the user ids and todo ids touched by the pending flush"""
+    user_ids = set()
+    todo_ids = set()
+    for obj in list(session_.new) + list(session_.dirty) + list(session_.deleted):
+        if isinstance(obj, Todo):
+            if obj.user_id is not None:
+                user_ids.add(obj.user_id)
+        elif isinstance(obj, Tracker):
+            if obj.todo_id is not None:
+                todo_ids.add(obj.todo_id)
+        elif isinstance(obj, KIV):
+            if obj.user_id is not None:
+                user_ids.add(obj.user_id)
+        elif isinstance(obj, TodoShare):
+            user_ids.update(i for i in (obj.owner_id, obj.shared_with_id) if i is not None)
+        elif isinstance(obj, User) and obj in session_.dirty and obj.id is not None:
+            # Profile edits (timezone, name) change the rendered page chrome too
+            user_ids.add(obj.id)
+    return user_ids, todo_ids
+
+
+def bump_data_version(connection, user_ids=(), todo_ids=()):
+    """Increment ``data_version`` for the given users and the owners of the given todos
+
+    Args:
+        connection: SQLAlchemy connection to execute the UPDATE on
+        user_ids: Iterable of user IDs
+        todo_ids: Iterable of todo IDs whose owners should be bumped
+    """
+    user_ids = {int(u) for u in user_ids if u is not None}
+    todo_ids = {int(t) for t in todo_ids if t is not None}
+    if not user_ids and not todo_ids:
+        return
+
+    user_table = User.__table__  # type: ignore[attr-defined]
+    todo_table = Todo.__table__  # type: ignore[attr-defined]
+    conditions = []
+    if user_ids:
+        conditions.append(user_table.c.id.in_(user_ids))
+    if todo_ids:
+        conditions.append(user_table.c.id.in_(
+            select(todo_table.c.user_id).where(todo_table.c.id.in_(todo_ids))
+        ))
+
+    values = {'data_version': db.func.coalesce(user_table.c.data_version, 0) + 1}
+    deadline = sticky_deadline()
+    if deadline is not None:
+        # Read-your-writes: these users read from the primary until then (see app/db_routing.py)
+        values['db_primary_until'] = deadline
+    connection.execute(user_table.update().where(or_(*conditions)).values(**values))
+
+
+def bump_todo_owners(todo_ids):
+    """Bump the data version of todo owners ahead of a bulk ``Query.delete()``
+
+    Bulk deletes bypass the flush hooks below, so callers that remove rows
+    that way must bump explicitly while the todo rows still exist.
+    """
+    bump_data_version(db.session.connection(), todo_ids=todo_ids)  # type: ignore[attr-defined]
+
+
+def bump_users(user_ids):
+    """Bump the data version of users whose rows were changed by a bulk ``UPDATE``
+
+    Like :func:`bump_todo_owners`, but for callers that already know the
+    owners; change listeners are notified when the transaction commits.
+    """
+    user_ids = set(user_ids)
+    if user_ids:
+        bump_data_version(db.session.connection(), user_ids=user_ids)  # type: ignore[attr-defined]
+        db.session.info.setdefault('data_version_committed', set()).update(user_ids)  # type: ignore[attr-defined]
+
+
+@event.listens_for(db.session, 'before_flush')
+def _remember_touched_users(session_, flush_context, instances):
+    user_ids, todo_ids = _collect_user_ids(session_)
+    if user_ids or todo_ids:
+        pending = session_.info.setdefault('data_version_pending', (set(), set()))
+        pending[0].update(user_ids)
+        pending[1].update(todo_ids)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_touched_users(session_, flush_context):
+    pending = session_.info.pop('data_version_pending', None)
+    if pending:
+        bump_data_version(session_.connection(), *pending)
+        session_.info.setdefault('data_version_committed', set()).update(pending[0])
+
+
+_change_listeners = []
+
+
+def on_data_change(callback):
+    """Register ``callback(user_ids)`` to run after a commit that changed those users' todos
+
+    Only users known directly from the flushed rows are reported (todo and KIV
+    writes); tracker-only writes are not resolved to their owners here.
+    """
+    _change_listeners.append(callback)
+    return callback
+
+
+@event.listens_for(db.session, 'after_commit')
+def _notify_data_change(session_):
+    user_ids = session_.info.pop('data_version_committed', None)
+    if user_ids:
+        for callback in _change_listeners:
+            callback(user_ids)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_data_change(session_, previous_transaction):
+    session_.info.pop('data_version_committed', None)
+
+
+def _time_bucket():
+    """Return the time component of page ETags.
+
+    Pages embed today's date (calendar labels) and a timed CSRF token, so a
+    cached copy must not outlive either.
+    """
+    window = current_app.config.get('WTF_CSRF_TIME_LIMIT') or 86400
+    window = max(60, min(int(window), 86400))
+    return '{}.{}'.format(date.today().strftime('%Y%m%d'), int(time.time() // window))
+
+
+def _base_etag(user, scope):
+    path_hash = hashlib.sha1(request.full_path.encode('utf-8')).hexdigest()[:8]  # nosec - cache key only
+    return '{}-{}-{}-{}-{}'.format(scope, user.id, user.data_version or 0, _time_bucket(), path_hash)
+
+
+def _fresh_etag(if_none_match, base, now):
+    """Return the first client-supplied ETag still valid for ``base``, if any"""
+    for candidate in if_none_match.as_set(include_weak=True):
+        if _etag_is_fresh(candidate, base, now):
+            return candidate
+    return None
+
+
+def _etag_is_fresh(candidate, base, now):
+    """Check a client-supplied ETag against the current base tag
+
+    Tags may carry a ``~<epoch>`` suffix meaning the content is only valid
+    until that moment (for example, until the next reminder falls due).
+    """
+    value, _, valid_until = candidate.partition('~')
+    if value != base:
+        return False
+    if valid_until:
+        try:
+            return now < int(valid_until)
+        except ValueError:
+            return False
+    return True
+
+
+def conditional_get(scope, user_getter=None):
+    """Decorator adding weak ETag / ``If-None-Match`` handling to a GET view
+
+    Must be applied below the authentication decorator so the user is known.
+    Views can set ``g.etag_valid_until`` (a naive UTC datetime) to bound how
+    long the response stays valid even without any data change.
+
+    Args:
+        scope: Short name distinguishing endpoints that share a user version
+        user_getter: Optional callable returning the user; defaults to current_user
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            user = user_getter() if user_getter else current_user
+            # Pending flash messages are consumed by rendering; never skip it
+            cacheable = user is not None and not session.get('_flashes')
+
+            if cacheable and request.if_none_match:
+                matched = _fresh_etag(request.if_none_match, _base_etag(user, scope), int(time.time()))
+                cache_hit('etag', matched is not None)
+                if matched:
+                    response = make_response('', 304)
+                    response.set_etag(matched, weak=True)
+                    return response
+
+            response = make_response(f(*args, **kwargs))
+            if cacheable and response.status_code == 200:
+                # Re-read the version: the view itself may have committed
+                tag = _base_etag(user, scope)
+                valid_until = g.pop('etag_valid_until', None)
+                if valid_until is not None:
+                    tag = '{}~{}'.format(tag, calendar.timegm(valid_until.utctimetuple()))
+                response.set_etag(tag, weak=True)
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,150 @@
+"""
+Read-replica query routing.
+
+With replicas configured (DB_REPLICA_URLS, see lib/database.py), queries
+made while handling a GET/HEAD request, or any request whose view is
+decorated with ``@read_only``, go to a replica chosen at random for that
+request. Everything else uses the primary:
+
+- flushes and UPDATE/INSERT/DELETE statements;
+- reads later in a request that has already written;
+- views decorated with ``@use_primary``;
+- code running outside a request (background workers, CLI).
+
+Read-your-writes: a request that changed a user's data stores a deadline
+DB_REPLICA_STICKY_SECONDS ahead in ``User.db_primary_until``, in the same
+UPDATE that bumps their ``data_version``. Requests from that user, whether
+they come from a browser session, another device or a bearer-token API
+client, read from the primary until the deadline passes. The deadline itself
+is looked up on the primary, since a lagging replica would not have it yet.
+Other writes (login, settings) pin the browser that made them through a
+value in the signed session cookie.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, g, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, select
+
+STICKY_KEY = '_db_primary_until'
+
+
+def read_only(view):
+    """Send this view's queries to a replica whatever the HTTP method"""
+    view._db_route = 'replica'
+    return view
+
+
+def use_primary(view):
+    """Keep this view on the primary even for GET requests"""
+    view._db_route = 'primary'
+    return view
+
+
+class Router:
+    """Replica engines and the read-your-writes window"""
+
+    def __init__(self, replicas=(), sticky_seconds=5.0):
+        self.replicas = list(replicas)
+        self.sticky_seconds = sticky_seconds
+
+    def choose(self):
+        return random.choice(self.replicas) if self.replicas else None
+
+
+def sticky_deadline():
+    """The ``db_primary_until`` to store for users written by this request, or None
+
+    Only writes made while handling a request pin their users, and only when
+    replicas are configured.
+    """
+    if not has_request_context():
+        return None
+    router = current_app.extensions.get('db_routing')
+    if router is None or not router.replicas:
+        return None
+    return datetime.utcnow() + timedelta(seconds=router.sticky_seconds)
+
+
+def _requesting_user():
+    """A condition selecting the user making this request (session login or API token), or None"""
+    from app.models import User
+
+    user_id = flask_session.get('_user_id')
+    if user_id is not None:
+        try:
+            return User.id == int(user_id)
+        except (TypeError, ValueError):
+            return None
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer ') and len(auth_header) > len('Bearer '):
+        return User.api_token == auth_header[len('Bearer '):]
+    return None
+
+
+def _user_pinned(db):
+    """Whether the requesting user's data changed within the sticky window (read on the primary)"""
+    from app.models import User
+
+    condition = _requesting_user()
+    if condition is None:
+        return False
+    deadline = db.session.execute(select(User.db_primary_until).where(condition)).scalar()
+    return deadline is not None and deadline > datetime.utcnow()
+
+
+class RoutingSession(Session):
+    """Session that reads from the request's replica until something is written"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not self.info.get('wrote')
+                and not getattr(clause, 'is_dml', False) and has_request_context()):
+            replica = g.get('_db_replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+def init_app(app, db):
+    """Create the replica engines and route each request before its first query"""
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    replicas = [create_engine(url, **options) for url in app.config.get('DB_REPLICA_URLS', [])]
+    app.extensions['db_routing'] = Router(replicas, float(app.config.get('DB_REPLICA_STICKY_SECONDS', 5)))
+
+    @app.before_request
+    def choose_database():
+        router = app.extensions['db_routing']
+        if not router.replicas:
+            return
+        db.session().info.pop('wrote', None)
+        route = getattr(app.view_functions.get(request.endpoint), '_db_route', None)
+        if route == 'primary' or (route != 'replica' and request.method not in ('GET', 'HEAD')):
+            return
+        if flask_session.get(STICKY_KEY, 0) > time.time() or _user_pinned(db):
+            return
+        g._db_replica = router.choose()
+
+    @app.after_request
+    def stick_to_primary(response):
+        router = app.extensions['db_routing']
+        if router.replicas and db.session().info.get('wrote'):
+            flask_session[STICKY_KEY] = time.time() + router.sticky_seconds
+        return response
+
+    @app.teardown_request
+    def clear_database_route(exc):
+        g.pop('_db_replica', None)
@@ -1,13 +1,25 @@
 """
 Email Service for sending sharing invitation links via Gmail API
+
+All mail goes through the email outbox: requests queue messages with
+``enqueue_email`` and return immediately; ``OutboxWorker`` (a daemon thread,
+or ``flask email-worker``) delivers them over a long-lived SMTP connection,
+retrying failures with backoff.
 """
 
 import os
-import smtplib
 import logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import threading
+import time
+from datetime import datetime, timedelta
 from flask import current_app, url_for, render_template_string
+from sqlalchemy import event
+from app import db
+from app.lazy_imports import LazyModule
+from app.metrics import track_smtp
+from app.models import EmailOutbox
+
+smtplib = LazyModule('smtplib')  # imported when the outbox first delivers
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -110,13 +122,16 @@ def is_email_configured():
     # SMTP_FROM_EMAIL is required to send from
     config = _get_smtp_config()
     configured = all([config['server'], config['port'], config['from_email']])
-    logger.debug(f"Email configured check: {configured} (server={config['server']}, port={config['port']}, from={config['from_email']})")
+    logger.debug("Email configured check: %s (server=%s, port=%s, from=%s)", configured, config['server'], config['port'], config['from_email'])
     return configured
 
 
 def send_sharing_invitation(invitation, from_user):
     """
-    Send a sharing invitation email
+    Queue a sharing invitation email
+    
+    The message is delivered by the outbox worker; this only renders it and
+    commits the outbox entry, so the request does not wait on SMTP.
     
     Args:
         invitation: ShareInvitation model instance
@@ -125,8 +140,7 @@ def send_sharing_invitation(invitation, from_user):
     Returns:
         tuple: (success: bool, error_message: str or None)
     """
-    config = _get_smtp_config()
-    logger.info(f"Attempting to send email to {invitation.to_email} from {from_user.email}")
+    logger.info("Queueing invitation email to %s from %s", invitation.to_email, from_user.email)
     
     if not is_email_configured():
         msg = "Email service is not configured. Please configure SMTP settings."
@@ -134,8 +148,6 @@ def send_sharing_invitation(invitation, from_user):
         return False, msg
     
     try:
-        logger.debug(f"Connecting to SMTP server {config['server']}:{config['port']}")
-        
         # Generate URLs for accept/decline actions
         try:
             # Try to generate URLs with proper request context
@@ -149,12 +161,11 @@ def send_sharing_invitation(invitation, from_user):
             base_url = f"{scheme}://{server_name}"
             accept_url = f"{base_url}/accept_invitation/{invitation.token}"
             decline_url = f"{base_url}/decline_invitation/{invitation.token}"
-            logger.debug(f"Generated manual URLs: accept={accept_url}, decline={decline_url}")
+            logger.debug("Generated manual URLs: accept=%s, decline=%s", accept_url, decline_url)
         
         
         # Get sender's display name and escape for safety
         from html import escape
-        from markupsafe import Markup
         
         from_user_name = escape(from_user.fullname or from_user.email)
         from_user_email = escape(from_user.email)
@@ -178,59 +189,15 @@ def send_sharing_invitation(invitation, from_user):
             **template_context
         )
         
-        # Create email message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"{from_user_name} wants to share their todos with you"
-        msg['From'] = config['from_email']
-        msg['To'] = invitation.to_email
-        
-        # Attach both plain text and HTML versions
-        part1 = MIMEText(text_content, 'plain')
-        part2 = MIMEText(html_content, 'html')
-        msg.attach(part1)
-        msg.attach(part2)
-        
-        # Send email via SMTP
-        smtp_server = config['server']
-        smtp_port = config['port']
-
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            logger.debug("Connected to SMTP server")
-            
-            # Only use TLS and login if credentials are provided (not needed for MailHog)
-            if config['username'] and config['password']:
-                logger.debug("Using TLS and authentication")
-                # Skip STARTTLS for localhost (MailHog) as it doesn't support it
-                if smtp_server not in ['localhost', '127.0.0.1']:
-                    try:
-                        server.starttls()
-                    except smtplib.SMTPNotSupportedError:
-                        logger.warning("STARTTLS not supported by SMTP server, proceeding without encryption")
-                server.login(config['username'], config['password'])
-            else:
-                logger.debug("No credentials provided, sending without authentication (MailHog mode)")
-            
-            logger.info(f"Sending email from {config['from_email']} to {invitation.to_email}")
-            server.sendmail(config['from_email'], invitation.to_email, msg.as_string())
-            logger.info(f"Email sent successfully to {invitation.to_email}")
-        
+        enqueue_email(invitation.to_email, f"{from_user_name} wants to share their todos with you",
+                      text_content, html_content, kind='invitation', user_id=from_user.id)
+        db.session.commit()  # type: ignore[attr-defined]
         return True, None
         
-    except smtplib.SMTPAuthenticationError as e:
-        msg = "Failed to authenticate with email server. Please check SMTP credentials."
-        logger.error(f"SMTP Auth Error: {str(e)}")
-        return False, msg
-    except smtplib.SMTPRecipientsRefused as e:
-        msg = f"The email address {invitation.to_email} was rejected by the server."
-        logger.error(f"SMTP Recipients Refused: {str(e)}")
-        return False, msg
-    except smtplib.SMTPException as e:
-        msg = f"Failed to send email: {str(e)}"
-        logger.error(f"SMTP Exception: {str(e)}")
-        return False, msg
     except Exception as e:
+        db.session.rollback()  # type: ignore[attr-defined]
         msg = f"An unexpected error occurred: {str(e)}"
-        logger.exception(f"Unexpected error sending email: {str(e)}")
+        logger.exception("Unexpected error queueing email: %s", e)
         return False, msg
 
 
@@ -245,3 +212,393 @@ def get_invitation_link(invitation):
         str: The accept invitation URL
     """
     return url_for('accept_share_invitation', token=invitation.token, _external=True)
+
+
+# ---------------------------------------------------------------------------
+# Outbox
+# ---------------------------------------------------------------------------
+
+SMTP_TIMEOUT = 30  # seconds
+SMTP_IDLE_TIMEOUT = 60  # seconds an unused connection is kept open
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE = 60  # seconds; doubled after every failed attempt
+OUTBOX_LEASE = 300  # seconds a claimed entry stays reserved for its sender
+OUTBOX_RETENTION_DAYS = 7  # sent/failed entries kept this long by 'flask cleanup-outbox'
+
+
+def open_smtp_connection(config=None):
+    """
+    Open an SMTP session, with STARTTLS and login when credentials are set
+    
+    Args:
+        config: SMTP settings as returned by _get_smtp_config (default: current)
+    
+    Returns:
+        smtplib.SMTP: connected session; the caller must quit() it
+    """
+    config = config or _get_smtp_config()
+    server = smtplib.SMTP(config['server'], config['port'], timeout=SMTP_TIMEOUT)
+    try:
+        # Only use TLS and login if credentials are provided (not needed for MailHog)
+        if config['username'] and config['password']:
+            # Skip STARTTLS for localhost (MailHog) as it doesn't support it
+            if config['server'] not in ['localhost', '127.0.0.1']:
+                try:
+                    server.starttls()
+                except smtplib.SMTPNotSupportedError:
+                    logger.warning("STARTTLS not supported by SMTP server, proceeding without encryption")
+            server.login(config['username'], config['password'])
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def enqueue_email(recipient, subject, body_text, body_html=None, kind='generic', user_id=None, payload=None):
+    """
+    Queue an email for delivery by the outbox sender
+    
+    The entry is added to the current session; it is sent once the caller
+    commits and the sender next runs. Kinds that carry user content (reminder
+    digests) pass a JSON ``payload`` instead of a body; the message is
+    rendered from it at send time, so that content is never stored.
+    
+    Returns:
+        EmailOutbox: the queued entry
+    """
+    entry = EmailOutbox(
+        user_id=user_id,
+        kind=kind,
+        recipient=recipient,
+        subject=subject,
+        body_text=body_text,
+        body_html=body_html,
+        payload=payload,
+        status='pending',
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(entry)  # type: ignore[attr-defined]
+    db.session.info['outbox_enqueued'] = True  # type: ignore[attr-defined]  # wake the worker on commit
+    return entry
+
+
+def _render_entry(entry):
+    """
+    The (subject, body_text, body_html) to send for an entry
+    
+    Entries with a payload are rendered now; None means there is nothing
+    left to send (e.g. every todo in a digest was deleted).
+    """
+    if entry.payload is None:
+        return entry.subject, entry.body_text, entry.body_html
+    if entry.kind == 'reminder_digest':
+        from app.reminder_service import ReminderService
+        return ReminderService.render_digest(entry)
+    raise ValueError(f'No renderer for outbox payload of kind {entry.kind!r}')
+
+
+def _outbox_message(entry, from_email, content=None):
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    subject, body_text, body_html = content or (entry.subject, entry.body_text, entry.body_html)
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = from_email
+    msg['To'] = entry.recipient
+    msg['Reply-To'] = from_email
+    msg['X-Priority'] = '3'  # Normal priority
+    msg['X-Mailer'] = 'TodoBox/1.0'
+    msg.attach(MIMEText(body_text, 'plain', 'utf-8'))
+    if body_html:
+        msg.attach(MIMEText(body_html, 'html', 'utf-8'))
+    return msg
+
+
+def _redact(entry):
+    """Drop the message body once it will not be sent again (it may hold tokens or codes)"""
+    entry.body_text = ''
+    entry.body_html = None
+
+
+def _record_failure(entry, error, permanent=False):
+    entry.attempts = (entry.attempts or 0) + 1
+    entry.last_error = str(error)[:1000]
+    if permanent or entry.attempts >= OUTBOX_MAX_ATTEMPTS:
+        entry.status = 'failed'
+        _redact(entry)
+        logger.error("Giving up on %r after %s attempt(s): %s", entry, entry.attempts, error)
+    else:
+        delay = OUTBOX_RETRY_BASE * 2 ** (entry.attempts - 1)
+        entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        logger.warning("Delivery of %r failed, retrying in %ss: %s", entry, delay, error)
+
+
+def _drop_connection(server):
+    try:
+        server.close()
+    except Exception:
+        pass
+
+
+class OutboxSender:
+    """
+    Delivers outbox entries over one SMTP session kept open between batches
+    
+    The session is checked with NOOP before each batch and reopened when it
+    has been idle longer than ``idle_timeout`` or the SMTP settings changed.
+    """
+    
+    def __init__(self, idle_timeout=SMTP_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._server = None
+        self._config = None
+        self._last_used = 0.0
+    
+    @property
+    def connected(self):
+        return self._server is not None
+    
+    def _connection(self, config):
+        if self._server is not None:
+            if config != self._config or time.monotonic() - self._last_used > self.idle_timeout:
+                self.close()
+            else:
+                try:
+                    if self._server.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected('NOOP rejected')
+                except (smtplib.SMTPException, OSError):
+                    _drop_connection(self._server)
+                    self._server = None
+        if self._server is None:
+            self._server = open_smtp_connection(config)
+            self._config = config
+            logger.debug("Opened SMTP connection to %s:%s", config['server'], config['port'])
+        return self._server
+    
+    def close(self):
+        """Quit the SMTP session, if one is open"""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            _drop_connection(self._server)
+        self._server = None
+    
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+    
+    def claim(self, limit):
+        """
+        Claim up to ``limit`` due entries for this sender
+        
+        Each row moves from pending to 'sending' with a conditional UPDATE, so
+        when several workers race for the same row only one of them wins.
+        ``next_attempt_at`` then holds the lease expiry: a 'sending' row whose
+        worker died is picked up again once its lease has run out.
+        
+        Returns:
+            list: claimed EmailOutbox entries, committed as 'sending'
+        """
+        now = datetime.utcnow()
+        due = EmailOutbox.status.in_(('pending', 'sending'))
+        candidates = [row[0] for row in db.session.query(EmailOutbox.id).filter(  # type: ignore[attr-defined]
+            due, EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(limit)]
+        
+        lease = now + timedelta(seconds=OUTBOX_LEASE)
+        claimed = []
+        for entry_id in candidates:
+            won = EmailOutbox.query.filter(
+                EmailOutbox.id == entry_id, due, EmailOutbox.next_attempt_at <= now
+            ).update({'status': 'sending', 'next_attempt_at': lease}, synchronize_session=False)
+            if won:
+                claimed.append(entry_id)
+        db.session.commit()  # type: ignore[attr-defined]
+        if not claimed:
+            return []
+        return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id).all()
+    
+    def send_batch(self, limit=100):
+        """
+        Claim and deliver due entries
+        
+        Args:
+            limit: Maximum number of entries to send in this batch
+        
+        Returns:
+            tuple: (sent: int, failed: int)
+        """
+        if not is_email_configured():
+            logger.debug("Email not configured; outbox left pending")
+            return 0, 0
+        
+        entries = self.claim(limit)
+        if not entries:
+            return 0, 0
+        
+        config = _get_smtp_config()
+        sent = failed = 0
+        try:
+            for entry in entries:
+                try:
+                    # A savepoint, so a failed query only undoes this render, not the batch's statuses
+                    with db.session.begin_nested():  # type: ignore[attr-defined]
+                        content = _render_entry(entry)
+                except Exception as e:
+                    # A payload that cannot be rendered never will be; don't let it hold up the batch
+                    _record_failure(entry, e, permanent=True)
+                    failed += 1
+                    continue
+                if content is None:
+                    entry.status = 'failed'
+                    entry.last_error = 'Nothing left to send'
+                    continue
+                try:
+                    server = self._connection(config)
+                    with track_smtp(entry.kind):
+                        server.sendmail(config['from_email'], [entry.recipient],
+                                        _outbox_message(entry, config['from_email'], content).as_string())
+                    self._last_used = time.monotonic()
+                    entry.status = 'sent'
+                    entry.attempts = (entry.attempts or 0) + 1
+                    entry.sent_at = datetime.utcnow()
+                    _redact(entry)
+                    sent += 1
+                except smtplib.SMTPRecipientsRefused as e:
+                    _record_failure(entry, e, permanent=True)
+                    failed += 1
+                except (smtplib.SMTPException, OSError) as e:
+                    _record_failure(entry, e)
+                    failed += 1
+                    # Reconnect for the next entry; the session may be unusable
+                    if self._server is not None:
+                        _drop_connection(self._server)
+                        self._server = None
+        finally:
+            for entry in entries:
+                # Anything left 'sending' (an unexpected error) is retried once the lease expires
+                if entry.status == 'sending' and entry.sent_at is None:
+                    entry.status = 'pending'
+            db.session.commit()  # type: ignore[attr-defined]
+        
+        logger.info("Outbox batch: %s sent, %s failed", sent, failed)
+        return sent, failed
+
+
+def purge_outbox(days=OUTBOX_RETENTION_DAYS):
+    """
+    Delete sent and failed outbox entries older than ``days``
+    
+    Returns:
+        int: number of entries deleted
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = EmailOutbox.query.filter(
+        EmailOutbox.status.in_(('sent', 'failed')), EmailOutbox.created_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()  # type: ignore[attr-defined]
+    return deleted
+
+
+def send_outbox(limit=100):
+    """
+    Deliver due outbox entries once, reusing one SMTP connection for the batch
+    
+    Args:
+        limit: Maximum number of entries to send in this run
+    
+    Returns:
+        tuple: (sent: int, failed: int)
+    """
+    sender = OutboxSender()
+    try:
+        return sender.send_batch(limit)
+    finally:
+        sender.close()
+
+
+class OutboxWorker:
+    """
+    Background loop that drains the outbox
+    
+    Runs either as a daemon thread in the web process (started on the first
+    request) or in the foreground via ``flask email-worker``. It keeps its
+    SMTP session open across batches, sleeps ``EMAIL_OUTBOX_POLL_INTERVAL``
+    seconds when the outbox is empty, and is woken early whenever a request
+    commits a newly queued email.
+    """
+    
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.sender = OutboxSender()
+    
+    def wake(self):
+        self._wakeup.set()
+    
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+    
+    def start(self, app):
+        """Start the daemon thread (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, args=(app,), name='email-outbox', daemon=True)
+        self._thread.start()
+    
+    def run(self, app):
+        """Send batches until stopped"""
+        batch_size = app.config.get('EMAIL_OUTBOX_BATCH_SIZE', 50)
+        poll_interval = app.config.get('EMAIL_OUTBOX_POLL_INTERVAL', 10)
+        self.sender.idle_timeout = app.config.get('SMTP_IDLE_TIMEOUT', SMTP_IDLE_TIMEOUT)
+        try:
+            while not self._stop.is_set():
+                self._wakeup.clear()
+                handled = 0
+                with app.app_context():
+                    try:
+                        handled = sum(self.sender.send_batch(batch_size))
+                    except Exception as e:
+                        db.session.rollback()  # type: ignore[attr-defined]
+                        logger.error("Outbox worker batch failed: %s", e)
+                    finally:
+                        db.session.remove()  # type: ignore[attr-defined]
+                if handled >= batch_size:
+                    continue  # more may be waiting
+                self.sender.close_if_idle()
+                self._wakeup.wait(poll_interval)
+        finally:
+            self.sender.close()
+
+
+outbox_worker = OutboxWorker()
+
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_outbox_worker(session_):
+    if session_.info.pop('outbox_enqueued', None):
+        outbox_worker.wake()
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_outbox_wakeup(session_, previous_transaction):
+    session_.info.pop('outbox_enqueued', None)
+
+
+def init_app(app):
+    """Start the outbox worker thread on the first request (after any worker fork)"""
+    started = []
+    
+    @app.before_request
+    def start_outbox_worker():
+        if started or not app.config.get('EMAIL_OUTBOX_WORKER_ENABLED', True) or app.testing:
+            return
+        started.append(True)
+        outbox_worker.start(app)
@@ -8,6 +8,8 @@ import os
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from app.metrics import ENCRYPTION_OPS
+from app.request_timing import timed_crypto
 
 
 def is_encryption_enabled():
@@ -60,6 +62,7 @@ def get_fernet():
     return Fernet(key)
 
 
+@timed_crypto
 def encrypt_text(plaintext):
     """
     Encrypt plaintext string and return base64-encoded ciphertext.
@@ -73,6 +76,7 @@ def encrypt_text(plaintext):
     if not is_encryption_enabled():
         return plaintext
     
+    ENCRYPTION_OPS.inc(op='encrypt')
     try:
         fernet = get_fernet()
         if isinstance(plaintext, str):
@@ -88,6 +92,7 @@ def encrypt_text(plaintext):
         return plaintext
 
 
+@timed_crypto
 def decrypt_text(ciphertext):
     """
     Decrypt base64-encoded ciphertext and return plaintext string.
@@ -102,6 +107,7 @@ def decrypt_text(ciphertext):
     if not is_encryption_enabled():
         return ciphertext
     
+    ENCRYPTION_OPS.inc(op='decrypt')
     # Store original value before any modifications because ciphertext may be
     # converted to bytes during decryption attempt, and we need the original
     # value to return in case of decryption failure (backward compatibility)
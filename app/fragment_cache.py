@@ -0,0 +1,189 @@
+"""
+Rendered-fragment cache for todo cards.
+
+List and undone pages render one card per todo, and each card decrypts the
+todo fields, renders the calendar label and emits the stored HTML. Cards are
+cached by a key built from the todo's stored (possibly encrypted) columns,
+its latest tracker entry, the viewing user's timezone and today's date, so
+any edit produces a new key and stale entries simply age out.
+
+Backends are selected with ``FRAGMENT_CACHE_BACKEND``:
+
+- ``memory`` (default): per-process LRU holding ``FRAGMENT_CACHE_SIZE`` cards
+- ``file``: one file per card under ``FRAGMENT_CACHE_DIR`` (use a tmpfs such
+  as ``/dev/shm`` to share cards between workers). Cards hold decrypted todo
+  text, so this backend is refused when ``TODO_ENCRYPTION_ENABLED`` is on and
+  the memory backend is used instead
+- ``none``: disable caching
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from flask_login import current_user
+from markupsafe import Markup
+
+from app.metrics import cache_hit
+from app.utils import date_context
+
+
+class LRUFragmentCache:
+    """Thread-safe in-process LRU cache"""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class FileFragmentCache:
+    """Directory-backed cache shared by every worker on the host"""
+
+    def __init__(self, directory, max_files=20000):
+        self.directory = directory
+        self.max_files = max_files
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.html')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as fh:
+                return fh.read()
+        except OSError:
+            return None
+
+    def set(self, key, value):
+        try:
+            # Write to a temp file and rename so readers never see partial cards
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                fh.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logging.warning("Fragment cache write failed: %s", e)
+            return
+        self._prune()
+
+    def _prune(self):
+        """Drop the oldest half of the cards once the directory is full"""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith('.html')]
+            if len(entries) <= self.max_files:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:len(entries) // 2]:
+                os.remove(entry.path)
+        except OSError:
+            pass  # another worker is pruning concurrently
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.html'):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_fragment_cache():
+    """Return the configured cache backend, or None when caching is disabled"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _create_backend(current_app.config)
+    return _cache or None
+
+
+def _create_backend(config):
+    backend = (config.get('FRAGMENT_CACHE_BACKEND') or 'memory').lower()
+    if backend == 'none':
+        return False
+    if backend == 'file' and config.get('TODO_ENCRYPTION_ENABLED'):
+        # Cards are rendered after decryption; writing them out would put todo text on disk in the clear
+        logging.warning("FRAGMENT_CACHE_BACKEND=file is not allowed with TODO_ENCRYPTION_ENABLED, using memory")
+        backend = 'memory'
+    if backend == 'file':
+        directory = config.get('FRAGMENT_CACHE_DIR') or os.path.join(current_app.instance_path, 'fragment_cache')
+        try:
+            return FileFragmentCache(directory)
+        except OSError as e:
+            logging.warning("Fragment cache directory %s unusable, falling back to memory: %s", directory, e)
+    return LRUFragmentCache(config.get('FRAGMENT_CACHE_SIZE', 2048))
+
+
+def reset_fragment_cache():
+    """Forget the current backend so the next lookup rebuilds it from config"""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def card_key(kind, todo, tracker=None, variant=''):
+    """Build the cache key for a todo card
+
+    The stored ``name`` / ``details_html`` columns are hashed without
+    decrypting them; encrypted values change on every write, plaintext ones
+    whenever the content does.
+    """
+    timezone = getattr(current_user, 'timezone', None) or 'UTC'
+    user_id = getattr(current_user, 'id', None)
+    parts = [
+        kind, variant, user_id, timezone, date_context().today.isoformat(),
+        todo.id, todo._name, todo._details_html, todo.modified,
+    ]
+    if tracker is not None:
+        parts.extend([tracker.id, tracker.status_id, tracker.timestamp])
+    raw = '\x1f'.join('' if p is None else str(p) for p in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()  # nosec - cache key only
+
+
+def cached_card(kind, todo, tracker=None, variant='', caller=None):
+    """Jinja helper wrapping a card body in a ``{% call %}`` block
+
+    Example::
+
+        {% call cached_card('list', list.Todo, list.Tracker, title) %}
+            ... card markup ...
+        {% endcall %}
+    """
+    cache = get_fragment_cache()
+    if cache is None:
+        return caller()
+
+    key = card_key(kind, todo, tracker, variant)
+    html = cache.get(key)
+    cache_hit('fragment', html is not None)
+    if html is None:
+        html = str(caller())
+        cache.set(key, html)
+    return Markup(html)
@@ -1,11 +1,41 @@
-"""Geolocation utility for detecting user timezone from IP address"""
+"""Geolocation utility for detecting user timezone from IP address
 
-import requests
-from flask import request
+Lookups go through ``GeoResolver``: an in-memory LRU with TTL keyed by
+network (/24 for IPv4, /48 for IPv6), an optional SQLite file shared by all
+workers, and then the backends listed in ``GEOIP_BACKENDS`` in order:
+
+- ``mmdb``: a local MaxMind-format database (GeoLite2-City or similar) read
+  through a memory map; needs the optional ``maxminddb`` package and
+  ``GEOIP_MMDB_PATH``
+- ``ip-api``: the ip-api.com JSON API (45 requests/minute, no key)
+
+A backend that cannot answer (missing file, network error, rate limit)
+passes the lookup to the next one; only answers are cached.
+"""
+
+import ipaddress
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, current_app, has_app_context
 import pytz
 from typing import Optional, Tuple
 import logging
 
+from app import http_client
+from app.lazy_imports import LazyModule
+from app.timezone_utils import is_valid_timezone
+
+requests = LazyModule('requests')
+
+try:
+    import maxminddb
+except ImportError:  # optional; pip install maxminddb for the offline backend
+    maxminddb = None
+
 # Timezone mapping for country codes to default timezones
 COUNTRY_TO_TIMEZONE = {
     'US': 'America/New_York',
@@ -52,9 +82,291 @@ def get_client_ip() -> str:
     return request.remote_addr or '127.0.0.1'
 
 
+def _timezone_from(timezone: Optional[str], country_code: Optional[str]) -> Optional[str]:
+    # Validate timezone against pytz available timezones
+    if timezone and is_valid_timezone(timezone):
+        return timezone
+    
+    # Fallback to country-based timezone
+    return COUNTRY_TO_TIMEZONE.get(country_code or '')
+
+
+def _is_public(ip: str) -> bool:
+    """Don't try to geolocate localhost/private IPs"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return not (address.is_private or address.is_loopback or address.is_link_local
+                or address.is_multicast or address.is_reserved or address.is_unspecified)
+
+
+def network_key(ip: str, prefix_v4: int = 24, prefix_v6: int = 48) -> str:
+    """Cache key for an IP: the network it belongs to, since timezones don't change within one"""
+    address = ipaddress.ip_address(ip)
+    prefix = prefix_v4 if address.version == 4 else prefix_v6
+    return str(ipaddress.ip_network(f'{address}/{prefix}', strict=False))
+
+
+class TTLCache:
+    """Thread-safe LRU whose entries expire after a per-entry TTL"""
+    
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key) -> Tuple[bool, Optional[str]]:
+        """Return (found, value)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+    
+    def set(self, key, value: Optional[str], ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteGeoCache:
+    """Lookup results persisted in a small SQLite file, shared by all workers"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=1, check_same_thread=False, isolation_level=None)
+            self._conn.execute('CREATE TABLE IF NOT EXISTS geo_cache '
+                               '(network TEXT PRIMARY KEY, timezone TEXT, expires REAL NOT NULL)')
+            # Expired rows are only overwritten on lookup; drop the rest when a worker starts using the file
+            self._conn.execute('DELETE FROM geo_cache WHERE expires <= ?', (time.time(),))
+        return self._conn
+    
+    def get(self, key) -> Tuple[bool, Optional[str]]:
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    'SELECT timezone, expires FROM geo_cache WHERE network = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            logging.debug("Geo cache read failed: %s", e)
+            return False, None
+        if row is None or row[1] <= time.time():
+            return False, None
+        return True, row[0]
+    
+    def set(self, key, value: Optional[str], ttl: float) -> None:
+        try:
+            with self._lock:
+                self._connection().execute(
+                    'INSERT OR REPLACE INTO geo_cache (network, timezone, expires) VALUES (?, ?, ?)',
+                    (key, value, time.time() + ttl))
+        except sqlite3.Error as e:
+            logging.debug("Geo cache write failed: %s", e)
+
+
+class IpApiBackend:
+    """ip-api.com lookups (free, no key needed, allows 45 requests per minute)"""
+    name = 'ip-api'
+    
+    def __init__(self, timeout: float = 3, url: str = 'http://ip-api.com/json/{ip}'):
+        self.timeout = timeout
+        self.url = url
+        self.blocked_until = 0.0
+    
+    def _note_rate_limit(self, response) -> None:
+        # X-Rl: requests left in this minute, X-Ttl: seconds until the window resets
+        try:
+            if response.status_code == 429 or response.headers.get('X-Rl') == '0':
+                self.blocked_until = time.monotonic() + int(response.headers.get('X-Ttl', 60))
+        except (TypeError, ValueError, AttributeError):
+            self.blocked_until = time.monotonic() + 60
+    
+    def lookup(self, ip: str) -> Tuple[bool, Optional[str]]:
+        """Return (answered, timezone)"""
+        if time.monotonic() < self.blocked_until:
+            return False, None
+        try:
+            response = http_client.session.get(
+                self.url.format(ip=ip),
+                params={'fields': 'status,timezone,countryCode'},
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            # If the API call fails, let the next backend try
+            logging.debug("Timezone detection failed: %s", e)
+            return False, None
+        
+        self._note_rate_limit(response)
+        if response.status_code != 200:
+            return False, None
+        
+        data = response.json()
+        if data.get('status') != 'success':
+            # Reserved or unknown address: a definite "no timezone"
+            return True, None
+        return True, _timezone_from(data.get('timezone'), data.get('countryCode'))
+
+
+class MMDBBackend:
+    """Offline lookups in a MaxMind-format database, memory-mapped"""
+    name = 'mmdb'
+    
+    def __init__(self, path: str, reader=None):
+        self.path = path
+        self._reader = reader
+        self._unavailable = False
+    
+    def _open(self):
+        if self._reader is None and not self._unavailable:
+            if not self.path:
+                self._unavailable = True
+            elif maxminddb is None:
+                logging.warning("GEOIP_MMDB_PATH is set but the maxminddb package is not installed")
+                self._unavailable = True
+            else:
+                try:
+                    self._reader = maxminddb.open_database(self.path, maxminddb.MODE_MMAP)
+                except (OSError, ValueError) as e:
+                    logging.warning("Could not open GeoIP database %s: %s", self.path, e)
+                    self._unavailable = True
+        return self._reader
+    
+    def lookup(self, ip: str) -> Tuple[bool, Optional[str]]:
+        """Return (answered, timezone)"""
+        reader = self._open()
+        if reader is None:
+            return False, None
+        try:
+            record = reader.get(ip)
+        except ValueError:
+            return False, None
+        if not isinstance(record, dict):
+            return True, None
+        location = record.get('location') or {}
+        country = record.get('country') or record.get('registered_country') or {}
+        return True, _timezone_from(location.get('time_zone'), country.get('iso_code'))
+    
+    def close(self):
+        if self._reader is not None and hasattr(self._reader, 'close'):
+            self._reader.close()
+        self._reader = None
+
+
+NEGATIVE_TTL = 3600  # seconds to remember that an address has no timezone
+
+
+class GeoResolver:
+    """Cached timezone lookups over an ordered list of backends"""
+    
+    def __init__(self, backends, cache: Optional[TTLCache] = None, store: Optional[SQLiteGeoCache] = None,
+                 ttl: float = 86400, prefix_v4: int = 24, prefix_v6: int = 48):
+        self.backends = list(backends)
+        self.cache = cache
+        self.store = store
+        self.ttl = ttl
+        self.prefix_v4 = prefix_v4
+        self.prefix_v6 = prefix_v6
+    
+    def lookup(self, ip: str) -> Optional[str]:
+        """Timezone for a public IP, or None if no backend knows it"""
+        key = network_key(ip, self.prefix_v4, self.prefix_v6)
+        
+        if self.cache is not None:
+            found, timezone = self.cache.get(key)
+            if found:
+                return timezone
+        if self.store is not None:
+            found, timezone = self.store.get(key)
+            if found:
+                if self.cache is not None:
+                    self.cache.set(key, timezone, self.ttl if timezone else NEGATIVE_TTL)
+                return timezone
+        
+        for backend in self.backends:
+            answered, timezone = backend.lookup(ip)
+            if answered:
+                break
+        else:
+            return None
+        
+        ttl = self.ttl if timezone else NEGATIVE_TTL
+        if self.cache is not None:
+            self.cache.set(key, timezone, ttl)
+        if self.store is not None:
+            self.store.set(key, timezone, ttl)
+        return timezone
+
+
+def build_resolver(config, instance_path: str = '') -> GeoResolver:
+    """Create a resolver from GEOIP_* settings"""
+    backends = []
+    for name in str(config.get('GEOIP_BACKENDS', 'mmdb,ip-api')).split(','):
+        name = name.strip().lower()
+        if name == 'mmdb':
+            if config.get('GEOIP_MMDB_PATH'):
+                backends.append(MMDBBackend(config['GEOIP_MMDB_PATH']))
+        elif name == 'ip-api':
+            backends.append(IpApiBackend())
+        elif name:
+            logging.warning("Unknown GeoIP backend '%s' ignored", name)
+    
+    store = None
+    if config.get('GEOIP_CACHE_FILE'):
+        store = SQLiteGeoCache(os.path.join(instance_path, config['GEOIP_CACHE_FILE']))
+    
+    return GeoResolver(
+        backends,
+        cache=TTLCache(int(config.get('GEOIP_CACHE_SIZE', 4096))),
+        store=store,
+        ttl=float(config.get('GEOIP_CACHE_TTL', 86400)),
+    )
+
+
+_uncached_resolver = GeoResolver([IpApiBackend()])
+
+
+def init_app(app):
+    """Attach the configured resolver to the app"""
+    app.extensions['geolocation'] = build_resolver(app.config, app.instance_path)
+
+
+def get_resolver() -> GeoResolver:
+    """The app's resolver; outside an app context, plain uncached ip-api lookups"""
+    if has_app_context():
+        resolver = current_app.extensions.get('geolocation')
+        if resolver is not None:
+            return resolver
+    return _uncached_resolver
+
+
 def detect_timezone_from_ip() -> Optional[str]:
     """
-    Detect user's timezone from their IP address using ip-api.com (free, no API key needed)
+    Detect user's timezone from their IP address
+    
+    Uses the resolver configured by ``GEOIP_BACKENDS`` (cached local MaxMind
+    database and/or ip-api.com).
     
     Returns:
         Timezone string (e.g., 'America/New_York') or None if detection fails
@@ -63,40 +375,14 @@ def detect_timezone_from_ip() -> Optional[str]:
         client_ip = get_client_ip()
         
         # Don't try to geolocate localhost/private IPs
-        if client_ip in ['127.0.0.1', 'localhost'] or client_ip.startswith('192.168.') or client_ip.startswith('10.'):
+        if not _is_public(client_ip):
             return None
         
-        # Use ip-api.com (free, no key needed, allows 45 requests per minute)
-        response = requests.get(
-            f'http://ip-api.com/json/{client_ip}',
-            params={'fields': 'status,timezone,countryCode'},
-            timeout=3
-        )
+        return get_resolver().lookup(client_ip)
         
-        if response.status_code == 200:
-            data = response.json()
-            
-            if data.get('status') == 'success':
-                timezone = data.get('timezone')
-                
-                # Validate timezone against pytz available timezones
-                if timezone and timezone in pytz.all_timezones:
-                    return timezone
-                
-                # Fallback to country-based timezone
-                country_code = data.get('countryCode')
-                if country_code in COUNTRY_TO_TIMEZONE:
-                    return COUNTRY_TO_TIMEZONE[country_code]
-        
-        return None
-        
-    except requests.RequestException as e:
-        # If the API call fails, silently return None
-        # This ensures the app doesn't break if the service is unavailable
-        logging.debug(f"Timezone detection failed: {str(e)}")
-        return None
     except Exception as e:
-        logging.debug(f"Unexpected error in timezone detection: {str(e)}")
+        # This ensures the app doesn't break if a backend misbehaves
+        logging.debug("Unexpected error in timezone detection: %s", e)
         return None
 
 
@@ -115,7 +401,7 @@ def get_timezone_for_user(user_timezone: Optional[str] = None) -> str:
         Valid timezone string
     """
     # If user has already set a timezone, use it
-    if user_timezone and user_timezone in pytz.all_timezones:
+    if user_timezone and is_valid_timezone(user_timezone):
         return user_timezone
     
     # Try to detect from IP
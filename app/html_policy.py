@@ -0,0 +1,36 @@
+"""
+HTML allow-lists for rendered markdown.
+
+Every place that turns user-supplied markdown into HTML sanitizes it with
+one of these policies (see app/markdown_render.py):
+
+- ``details``: todo details written by users (stored in ``details_html``)
+- ``page``: admin-managed pages such as the terms of use and disclaimer,
+  which may also use headings, images and tables
+"""
+
+# Todo details
+DETAILS_TAGS = frozenset([
+    'p', 'br', 'strong', 'em', 'u', 'h1', 'h2', 'h3', 'code', 'pre', 'blockquote',
+    'ul', 'ol', 'li', 'a', 'del', 's',
+])
+DETAILS_ATTRIBUTES = {'a': ['href', 'title']}
+DETAILS_EXTENSIONS = ('fenced_code', 'pymdownx.tilde')
+
+# Terms of use / disclaimer pages
+PAGE_TAGS = DETAILS_TAGS | frozenset([
+    'h4', 'h5', 'h6', 'img', 'hr', 'table', 'thead', 'tbody', 'tr', 'th', 'td', 'strike',
+])
+PAGE_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'img': ['src', 'alt', 'title'],
+    'code': ['class'],
+    'pre': ['class'],
+}
+PAGE_EXTENSIONS = ('fenced_code', 'tables', 'pymdownx.tilde')
+
+# name -> (tags, attributes, markdown extensions)
+POLICIES = {
+    'details': (DETAILS_TAGS, DETAILS_ATTRIBUTES, DETAILS_EXTENSIONS),
+    'page': (PAGE_TAGS, PAGE_ATTRIBUTES, PAGE_EXTENSIONS),
+}
@@ -0,0 +1,65 @@
+"""
+Shared HTTP session for outbound calls.
+
+Every ``requests.get``/``requests.post`` opens (and TLS-handshakes) a new
+connection. ``session`` keeps a pool of keep-alive connections per host so
+repeated calls to the same API reuse them. It never stores cookies, so
+nothing set by one upstream response leaks into later calls made on behalf
+of other users.
+
+The session (and ``requests`` itself) is created on the first outbound
+call, not when the app is imported.
+"""
+
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+USER_AGENT = 'TodoBox/1.0'
+
+_pool_size = 10
+_session = None
+_session_lock = threading.Lock()
+
+
+def _mount(http, pool_size):
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    http.mount('https://', adapter)
+    http.mount('http://', adapter)
+
+
+def build_session(pool_size=10):
+    """Create a requests.Session with pooled connections and no cookie jar"""
+    import requests
+
+    http = requests.Session()
+    _mount(http, pool_size)
+    http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    http.headers['User-Agent'] = USER_AGENT
+    return http
+
+
+def get_session():
+    """Return the shared session, building it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session(_pool_size)
+    return _session
+
+
+def __getattr__(name):
+    # ``http_client.session`` keeps working without importing requests up front
+    if name == 'session':
+        return get_session()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def init_app(app):
+    """Size the shared pool from OUTBOUND_HTTP_POOL_SIZE (connections kept per host)"""
+    global _pool_size
+    _pool_size = app.config.get('OUTBOUND_HTTP_POOL_SIZE', 10)
+    if _session is not None:
+        _mount(_session, _pool_size)
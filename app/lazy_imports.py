@@ -0,0 +1,32 @@
+"""
+Deferred imports for modules only a few code paths use.
+
+``requests``, ``google.auth.jwt`` and ``smtplib`` take tens of milliseconds
+to import and are only needed when a request calls out to another service
+or an email is sent. Binding them to a ``LazyModule`` keeps the usual
+``requests.get(...)`` / ``except requests.RequestException`` spelling (and
+``mock.patch('app.geolocation.requests.get')``) while the real import
+happens on first attribute access, through the normal import machinery.
+
+    requests = LazyModule('requests')
+"""
+
+import importlib
+
+
+class LazyModule:
+    """Module proxy that imports ``name`` the first time an attribute is read"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<LazyModule {self._name!r} ({state})>'
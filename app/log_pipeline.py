@@ -0,0 +1,261 @@
+"""
+Non-blocking structured logging.
+
+Records are put on an in-memory queue by a ``QueueHandler`` on the root
+logger and written by a ``QueueListener`` thread, so request threads never
+wait on the disk or the terminal. Each line is a JSON object carrying the
+request id of the request that logged it (taken from an incoming
+``X-Request-ID`` header or generated, and echoed on the response).
+
+High-volume loggers can be sampled: ``LOG_SAMPLE_RATES`` maps logger names
+to the fraction of their records kept (warnings and errors are always
+kept), e.g. ``app.reminders.poll=0.01``.
+
+The root handler is installed by the first request the app serves; tests,
+CLI commands and scripts that only import the app keep their own logging.
+
+Configuration (app/config.py):
+    LOG_PIPELINE_ENABLED - master switch
+    LOG_LEVEL            - root logger level
+    LOG_FORMAT           - 'json' or 'text'
+    LOG_FILE             - append to this file instead of stderr
+    LOG_QUEUE_SIZE       - records buffered before new ones are dropped
+    LOG_SAMPLE_RATES     - per-logger sampling, 'name=rate,name=rate'
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+def current_request_id():
+    """Return the current request's id, or None outside a request"""
+    if not has_request_context():
+        return None
+    return g.get('request_id')
+
+
+def parse_sample_rates(value):
+    """Parse ``'app.reminders.poll=0.01,app.request_timing=0.1'`` into a dict"""
+    rates = {}
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, rate = entry.partition('=')
+        rate = float(rate)
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f'LOG_SAMPLE_RATES rate for {name!r} must be between 0 and 1')
+        rates[name.strip()] = rate
+    return rates
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the request id while still on the logging thread"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a configured fraction of INFO/DEBUG records per logger (and its children)"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved = {}
+
+    def rate_for(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            parts = name.split('.')
+            for i in range(len(parts), 0, -1):
+                prefix = '.'.join(parts[:i])
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0:
+            return True
+        if random.random() < rate:  # nosec - sampling only, not security
+            record.sample_rate = rate
+            return True
+        return False
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain lines with the request id, for development"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = None
+        return super().format(record)
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped"""
+
+    def __init__(self, queue_):
+        super().__init__(queue_)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the %-args and render the traceback here, before another
+        # thread sees the record; extra={...} fields stay for the formatter
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record = copy.copy(record)  # other handlers still get the live traceback
+            record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _StderrHandler(logging.StreamHandler):
+    """Writes to whatever ``sys.stderr`` is when the record is handled"""
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class LogPipeline:
+    """The root QueueHandler and the listener thread draining it"""
+
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+
+    @property
+    def installed(self):
+        return self.handler is not None
+
+    def configure(self, level='INFO', fmt='json', filename='', queue_size=10000, sample_rates=None):
+        self.stop()
+        output = logging.FileHandler(filename, encoding='utf-8') if filename else _StderrHandler()
+        output.setFormatter(JSONFormatter() if fmt == 'json' else TextFormatter())
+
+        self.handler = AsyncQueueHandler(queue.Queue(maxsize=queue_size))
+        if sample_rates:
+            self.handler.addFilter(SamplingFilter(sample_rates))
+        self.handler.addFilter(RequestIdFilter())
+        self.listener = logging.handlers.QueueListener(self.handler.queue, output, respect_handler_level=True)
+
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(level)
+        self.listener.start()
+
+    def stop(self):
+        """Detach from the root logger and flush the records still queued"""
+        if self.handler is not None:
+            logging.getLogger().removeHandler(self.handler)
+            self.handler = None
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+
+
+pipeline = LogPipeline()
+atexit.register(pipeline.stop)
+
+
+def init_app(app):
+    """Assign request ids, and install the queue-backed root handler once the app serves
+
+    The handler is installed by the first request, so importing the app (in
+    tests, CLI commands and scripts) leaves logging as the caller set it up.
+    """
+    install_lock = threading.Lock()
+
+    @app.before_request
+    def install_log_pipeline():
+        if pipeline.installed or app.testing or not app.config.get('LOG_PIPELINE_ENABLED', True):
+            return
+        with install_lock:
+            if not pipeline.installed:
+                pipeline.configure(
+                    level=app.config.get('LOG_LEVEL', 'INFO').upper(),
+                    fmt=app.config.get('LOG_FORMAT', 'json'),
+                    filename=app.config.get('LOG_FILE', ''),
+                    queue_size=int(app.config.get('LOG_QUEUE_SIZE', 10000)),
+                    sample_rates=parse_sample_rates(app.config.get('LOG_SAMPLE_RATES', '')),
+                )
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
@@ -0,0 +1,80 @@
+"""
+Markdown to sanitized HTML, with reused converters and a result cache.
+
+Building a ``markdown.Markdown`` converter loads its extensions, and
+``bleach.clean()`` builds a new ``Cleaner`` (and html5lib parser setup) on
+every call. Here each thread keeps one converter and one cleaner per policy
+(neither is thread-safe), resetting the converter between documents, and
+rendered HTML is kept in an LRU keyed by a hash of the policy and source
+text, so the same details or terms page is only rendered once.
+
+    from app.markdown_render import render_markdown
+    todo.details_html = render_markdown(details)            # 'details' policy
+    render_markdown(terms.terms_of_use, policy='page')
+"""
+
+import hashlib
+import threading
+
+from app.fragment_cache import LRUFragmentCache
+from app.html_policy import POLICIES
+from app.metrics import cache_hit
+
+_local = threading.local()
+_cache = LRUFragmentCache(1024)
+
+
+def configure(maxsize):
+    """Resize the rendered-HTML cache (MARKDOWN_CACHE_SIZE); 0 disables it"""
+    global _cache
+    _cache = LRUFragmentCache(maxsize) if maxsize > 0 else None
+
+
+def _renderer(policy):
+    """This thread's (Markdown, Cleaner) pair for ``policy``"""
+    renderers = getattr(_local, 'renderers', None)
+    if renderers is None:
+        renderers = _local.renderers = {}
+    pair = renderers.get(policy)
+    if pair is None:
+        # markdown and bleach are imported here, on the first render, to keep them out of startup
+        import markdown
+        from bleach.sanitizer import Cleaner
+
+        tags, attributes, extensions = POLICIES[policy]
+        pair = renderers[policy] = (
+            markdown.Markdown(extensions=list(extensions)),
+            Cleaner(tags=tags, attributes=attributes, strip=False),
+        )
+    return pair
+
+
+def _render(text, policy):
+    converter, cleaner = _renderer(policy)
+    try:
+        html = converter.convert(text)
+    finally:
+        converter.reset()
+    return cleaner.clean(html)
+
+
+def render_markdown(text, policy='details'):
+    """Render ``text`` as markdown and sanitize it with the named policy"""
+    if not text:
+        return ''
+    cache = _cache
+    if cache is None:
+        return _render(text, policy)
+
+    key = hashlib.sha1(f'{policy}\x1f{text}'.encode('utf-8')).hexdigest()  # nosec - cache key only
+    html = cache.get(key)
+    cache_hit('markdown', html is not None)
+    if html is None:
+        html = _render(text, policy)
+        cache.set(key, html)
+    return html
+
+
+def init_app(app):
+    """Size the cache from config"""
+    configure(app.config.get('MARKDOWN_CACHE_SIZE', 1024))
@@ -0,0 +1,511 @@
+"""
+Prometheus-style metrics for the hot paths.
+
+Metrics live in a small in-process registry. Each worker periodically writes
+its values to ``<METRICS_DIR>/metrics_<pid>.json``; the ``/metrics`` endpoint
+merges every worker's file so counters and histograms add up correctly under
+Gunicorn. Gauges only count live workers. No client library or external
+service is required: the endpoint renders the text exposition format itself.
+
+Only processes that serve requests write a file; importing the app for a CLI
+command or a script does not. When a scrape finds the file of a worker that
+has exited, its counters and histograms are folded into
+``metrics_archive.json`` and the file is removed, so totals never go
+backwards and the directory does not grow with every restart.
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, request
+
+try:
+    import fcntl
+except ImportError:  # Windows: archive updates are not serialized between workers
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Registry:
+    """Values for every metric in this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.values = {}       # (name, labels) -> float            (counters, gauges)
+        self.histograms = {}   # (name, labels) -> [bucket counts..., sum, count]
+        self.collectors = []
+        self.directory = None
+        self.flush_interval = 1.0
+        self.last_flush = 0.0
+        self.serving = False   # set by the first request; only serving processes flush
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+
+REGISTRY = _Registry()
+
+
+def _label_key(metric, labels):
+    if set(labels) != set(metric.labelnames):
+        raise ValueError(f"{metric.name} expects labels {metric.labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in metric.labelnames)
+
+
+class Counter:
+    """Monotonically increasing value"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.register(self)
+
+    def inc(self, amount=1, **labels):
+        key = (self.name, _label_key(self, labels))
+        with REGISTRY.lock:
+            REGISTRY.values[key] = REGISTRY.values.get(key, 0.0) + amount
+
+
+class Gauge(Counter):
+    """Value that can go up and down; summed over live workers"""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = (self.name, _label_key(self, labels))
+        with REGISTRY.lock:
+            REGISTRY.values[key] = float(value)
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Bucketed distribution of observed values"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        REGISTRY.register(self)
+
+    def observe(self, value, **labels):
+        key = (self.name, _label_key(self, labels))
+        with REGISTRY.lock:
+            data = REGISTRY.histograms.get(key)
+            if data is None:
+                data = REGISTRY.histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def register_collector(fn):
+    """Register a callable returning ``[(metric, labels, value)]`` at scrape time
+
+    Collectors run only in the worker serving ``/metrics`` and are meant for
+    values that are global rather than per worker (e.g. database counts).
+    """
+    REGISTRY.collectors.append(fn)
+    return fn
+
+
+# ---------------------------------------------------------------------------
+# Metric definitions
+# ---------------------------------------------------------------------------
+
+REQUEST_LATENCY = Histogram(
+    'todobox_request_duration_seconds', 'Request latency by endpoint', ('endpoint', 'method'))
+DB_POOL_WAIT = Histogram(
+    'todobox_db_pool_checkout_seconds', 'Time spent waiting for a pooled DB connection',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+DB_POOL_IN_USE = Gauge(
+    'todobox_db_pool_connections_in_use', 'DB connections currently checked out of the pool')
+DB_POOL_OVERFLOW = Gauge(
+    'todobox_db_pool_overflow', 'DB connections checked out beyond the pool size')
+DB_POOL_TIMEOUTS = Counter(
+    'todobox_db_pool_timeouts_total', 'Checkouts that gave up waiting for a pooled DB connection')
+REMINDER_POLLS = Counter(
+    'todobox_reminder_polls_total', 'Reminder check requests served')
+REMINDERS_PENDING = Gauge(
+    'todobox_reminders_pending', 'Enabled reminders that are due and not yet sent')
+ENCRYPTION_OPS = Counter(
+    'todobox_encryption_operations_total', 'Todo field encryption operations', ('op',))
+SMTP_LATENCY = Histogram(
+    'todobox_smtp_send_seconds', 'SMTP send latency', ('kind',))
+SMTP_FAILURES = Counter(
+    'todobox_smtp_failures_total', 'SMTP sends that raised an error', ('kind',))
+CACHE_REQUESTS = Counter(
+    'todobox_cache_requests_total', 'Cache lookups by cache and result', ('cache', 'result'))
+JOB_DURATION = Histogram(
+    'todobox_job_duration_seconds', 'Maintenance job duration', ('job',))
+
+
+def cache_hit(cache, hit):
+    """Record a cache lookup result"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+@contextmanager
+def track_smtp(kind):
+    """Time an SMTP send and count it as failed if the block raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SMTP_FAILURES.inc(kind=kind)
+        raise
+    finally:
+        SMTP_LATENCY.observe(time.perf_counter() - started, kind=kind)
+
+
+def counted(counter, **labels):
+    """Decorator incrementing ``counter`` on every call, including short-circuited ones"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            counter.inc(**labels)
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def track_job(name):
+    """Context manager timing a maintenance job"""
+    return JOB_DURATION.time(job=name)
+
+
+# ---------------------------------------------------------------------------
+# Multiprocess aggregation
+# ---------------------------------------------------------------------------
+
+def _snapshot():
+    with REGISTRY.lock:
+        return {
+            'pid': os.getpid(),
+            'values': [[name, list(labels), value] for (name, labels), value in REGISTRY.values.items()],
+            'histograms': [[name, list(labels), list(data)] for (name, labels), data in REGISTRY.histograms.items()],
+        }
+
+
+def _worker_file(pid):
+    return os.path.join(REGISTRY.directory, f'metrics_{pid}.json')
+
+
+ARCHIVE_FILE = 'metrics_archive.json'
+
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(data, fh)
+    os.replace(tmp_path, path)
+
+
+def flush():
+    """Write this worker's values to the shared metrics directory"""
+    if not REGISTRY.directory:
+        return
+    REGISTRY.last_flush = time.monotonic()
+    try:
+        os.makedirs(REGISTRY.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=REGISTRY.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(_snapshot(), fh)
+        os.replace(tmp_path, _worker_file(os.getpid()))
+    except OSError as e:
+        logger.warning("Could not write metrics file: %s", e)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _worker_pid(filename):
+    try:
+        return int(filename[len('metrics_'):-len('.json')])
+    except ValueError:
+        return None  # the archive
+
+
+def _merge_snapshot(values, histograms, snapshot, gauges=True):
+    """Add a snapshot's values into ``values`` / ``histograms`` (keyed by (name, labels))"""
+    for name, labels, value in snapshot.get('values', []):
+        metric = REGISTRY.metrics.get(name)
+        if metric is None or (metric.type == 'gauge' and not gauges):
+            continue
+        key = (name, tuple(labels))
+        values[key] = values.get(key, 0.0) + value
+    for name, labels, data in snapshot.get('histograms', []):
+        key = (name, tuple(labels))
+        merged = histograms.get(key)
+        if merged is None:
+            histograms[key] = list(data)
+        elif len(merged) == len(data):
+            histograms[key] = [a + b for a, b in zip(merged, data)]
+
+
+def _archive_dead_workers(names):
+    """Fold the counters and histograms of exited workers into the archive and delete their files"""
+    directory = REGISTRY.directory
+    dead = [name for name in names
+            if _worker_pid(name) is not None and _worker_pid(name) != os.getpid()
+            and not _pid_alive(_worker_pid(name))]
+    if not dead:
+        return
+    with open(os.path.join(directory, '.archive.lock'), 'a') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        values, histograms = {}, {}
+        try:
+            with open(archive_path) as fh:
+                _merge_snapshot(values, histograms, json.load(fh), gauges=False)
+        except (OSError, ValueError):
+            pass
+        archived = []
+        for filename in dead:
+            path = os.path.join(directory, filename)
+            try:
+                with open(path) as fh:
+                    _merge_snapshot(values, histograms, json.load(fh), gauges=False)
+            except (OSError, ValueError):
+                continue  # already archived by another worker
+            archived.append(path)
+        if not archived:
+            return
+        _write_json(archive_path, {
+            'pid': None,
+            'values': [[name, list(labels), value] for (name, labels), value in values.items()],
+            'histograms': [[name, list(labels), data] for (name, labels), data in histograms.items()],
+        })
+        for path in archived:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _load_worker_snapshots():
+    snapshots = [_snapshot()]
+    if not REGISTRY.directory:
+        return snapshots
+    own = os.path.basename(_worker_file(os.getpid()))
+    try:
+        names = [name for name in os.listdir(REGISTRY.directory)
+                 if name.startswith('metrics_') and name.endswith('.json')]
+        _archive_dead_workers(names)
+        names = os.listdir(REGISTRY.directory)
+    except OSError as e:
+        logger.warning("Could not read metrics directory: %s", e)
+        return snapshots
+    for filename in names:
+        if not filename.startswith('metrics_') or not filename.endswith('.json') or filename == own:
+            continue
+        try:
+            with open(os.path.join(REGISTRY.directory, filename)) as fh:
+                snapshots.append(json.load(fh))
+        except (OSError, ValueError):
+            continue  # half-written or removed while reading
+    return snapshots
+
+
+def collect():
+    """Merge every worker's values plus scrape-time collectors"""
+    values = {}
+    histograms = {}
+    for snapshot in _load_worker_snapshots():
+        pid = snapshot.get('pid')
+        alive = pid == os.getpid() or (pid is not None and _pid_alive(pid))
+        _merge_snapshot(values, histograms, snapshot, gauges=alive)
+
+    for collector in REGISTRY.collectors:
+        try:
+            for metric, labels, value in collector():
+                values[(metric.name, _label_key(metric, labels))] = float(value)
+        except Exception as e:
+            logger.warning("Metrics collector %s failed: %s", collector.__name__, e)
+    return values, histograms
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_text():
+    """Render all metrics in the Prometheus text exposition format"""
+    values, histograms = collect()
+    lines = []
+    for metric in REGISTRY.metrics.values():
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        if metric.type == 'histogram':
+            for (name, labels), data in sorted(histograms.items()):
+                if name != metric.name:
+                    continue
+                # observe() counts a value in every bucket it fits, so counts are already cumulative
+                for bound, count in zip(metric.buckets, data[:len(metric.buckets)]):
+                    lines.append('{}_bucket{} {}'.format(
+                        name, _format_labels(metric.labelnames, labels, ('le', _format_value(bound))), int(count)))
+                lines.append('{}_bucket{} {}'.format(
+                    name, _format_labels(metric.labelnames, labels, ('le', '+Inf')), int(data[-1])))
+                lines.append('{}_sum{} {}'.format(name, _format_labels(metric.labelnames, labels), _format_value(data[-2])))
+                lines.append('{}_count{} {}'.format(name, _format_labels(metric.labelnames, labels), int(data[-1])))
+        else:
+            for (name, labels), value in sorted(values.items()):
+                if name == metric.name:
+                    lines.append('{}{} {}'.format(name, _format_labels(metric.labelnames, labels), _format_value(value)))
+    return '\n'.join(lines) + '\n'
+
+
+# ---------------------------------------------------------------------------
+# Wiring
+# ---------------------------------------------------------------------------
+
+def _instrument_pool(engine, slow_checkout=0.5, log_interval=0):
+    """
+    Time pool checkouts and track connections in use and overflow
+
+    Checkouts waiting at least ``slow_checkout`` seconds and pool timeouts
+    are logged with the pool status; with ``log_interval`` the status and
+    the longest wait since the previous line are logged at that interval.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+    pool = engine.pool
+    original_connect = pool.connect
+    report = {'at': time.monotonic(), 'max_wait': 0.0, 'checked_out': 0}
+    checkout_lock = threading.Lock()
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            connection = original_connect()
+        except PoolTimeout:
+            DB_POOL_TIMEOUTS.inc()
+            logger.error("Timed out after %.3fs waiting for a DB connection (%s)",
+                         time.perf_counter() - started, pool.status())
+            raise
+        waited = time.perf_counter() - started
+        DB_POOL_WAIT.observe(waited)
+        if waited >= slow_checkout:
+            logger.warning("Waited %.3fs for a DB connection (%s)", waited, pool.status())
+        report['max_wait'] = max(report['max_wait'], waited)
+        if log_interval and time.monotonic() - report['at'] >= log_interval:
+            logger.info("DB pool: %s, longest checkout wait %.3fs", pool.status(), report['max_wait'])
+            report['at'], report['max_wait'] = time.monotonic(), 0.0
+        return connection
+
+    pool.connect = timed_connect
+
+    def record_overflow(change):
+        with checkout_lock:
+            report['checked_out'] += change
+            if hasattr(pool, 'size'):
+                DB_POOL_OVERFLOW.set(max(report['checked_out'] - pool.size(), 0))
+
+    @event.listens_for(pool, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_IN_USE.inc()
+        record_overflow(1)
+
+    @event.listens_for(pool, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_IN_USE.dec()
+        record_overflow(-1)
+
+
+def _pending_reminder_count():
+    from datetime import datetime
+    from app.models import Todo
+
+    count = Todo.query.filter(
+        Todo.reminder_enabled == True,
+        Todo.reminder_sent == False,
+        Todo.reminder_next_fire_at <= datetime.utcnow()
+    ).count()
+    return [(REMINDERS_PENDING, {}, count)]
+
+
+def init_app(app, db):
+    """Register request hooks, pool instrumentation and the flush schedule"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    # Created on the first flush, so importing the app (CLI, scripts) leaves no trace
+    REGISTRY.directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+    REGISTRY.flush_interval = float(app.config.get('METRICS_FLUSH_INTERVAL', 1.0))
+
+    with app.app_context():
+        _instrument_pool(db.engine, float(app.config.get('DB_POOL_SLOW_CHECKOUT', 0.5)),
+                         float(app.config.get('DB_POOL_LOG_INTERVAL', 0)))
+    register_collector(_pending_reminder_count)
+
+    @app.before_request
+    def start_request_metrics():
+        if not REGISTRY.serving:
+            REGISTRY.serving = True
+            atexit.register(flush)
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('_metrics_start', None)
+        if started is not None:
+            REQUEST_LATENCY.observe(time.perf_counter() - started,
+                                    endpoint=request.endpoint or 'unknown', method=request.method)
+        if time.monotonic() - REGISTRY.last_flush >= REGISTRY.flush_interval:
+            flush()
+        return response
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 # from sqlalchemy.orm import backref, func
 from sqlalchemy import func, or_
 from sqlalchemy.sql.expression import null
-from app import db, login
+from app import db, login, unit_of_work
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
@@ -24,6 +24,8 @@ class User(UserMixin, db.Model): # type: ignore[attr-defined]
     terms_accepted_version = db.Column(db.String(50)) # type: ignore[attr-defined]  # Version of terms user accepted (None if not accepted)
     pending_deletion = db.Column(db.Boolean, default=False) # type: ignore[attr-defined]  # Mark account for deletion
     deletion_requested_at = db.Column(db.DateTime) # type: ignore[attr-defined]  # When deletion was requested
+    data_version = db.Column(db.Integer, default=0, server_default='0', nullable=False) # type: ignore[attr-defined]  # Bumped on any todo data write (see app/data_version.py)
+    db_primary_until = db.Column(db.DateTime, nullable=True) # type: ignore[attr-defined]  # UTC; reads stay on the primary until then (see app/db_routing.py)
     todo = db.relationship('Todo', backref='user', lazy='dynamic') # type: ignore[attr-defined]
 
     def __init__(self, email, oauth_provider=None, oauth_id=None, fullname=None):
@@ -199,7 +201,7 @@ class Tracker(db.Model): # type: ignore[attr-defined]
         if timestamp is None:
             timestamp = datetime.now()
         db.session.add(Tracker(todo_id=todo_id, status_id=status_id, timestamp=timestamp)) # type: ignore[attr-defined]
-        db.session.commit() # type: ignore[attr-defined]
+        unit_of_work.commit()
     
     @classmethod
     def getId(cls, todo_id):
@@ -214,9 +216,11 @@ class Tracker(db.Model): # type: ignore[attr-defined]
 
     @classmethod
     def delete(cls, todo_id):
+        from app.data_version import bump_todo_owners
+        bump_todo_owners([todo_id])
         db.session.query(Tracker).filter(Tracker.todo_id == todo_id).delete() # type: ignore[attr-defined]
         db.session.query(Todo).filter(Todo.id == todo_id).delete() # type: ignore[attr-defined]
-        db.session.commit() # type: ignore[attr-defined]
+        unit_of_work.commit()
 
 class KIV(db.Model): # type: ignore[attr-defined]
     """
@@ -248,7 +252,7 @@ class KIV(db.Model): # type: ignore[attr-defined]
         else:
             kiv = cls(todo_id=todo_id, user_id=user_id)
         db.session.add(kiv) # type: ignore[attr-defined]
-        db.session.commit() # type: ignore[attr-defined]
+        unit_of_work.commit()
 
     @classmethod
     def remove(cls, todo_id):
@@ -257,7 +261,7 @@ class KIV(db.Model): # type: ignore[attr-defined]
         if kiv:
             kiv.is_active = False
             kiv.exited_at = datetime.now()
-            db.session.commit() # type: ignore[attr-defined]
+            unit_of_work.commit()
 
     @classmethod
     def is_kiv(cls, todo_id):
@@ -279,8 +283,12 @@ class Todo(db.Model): # type: ignore[attr-defined]
     reminder_sent = db.Column(db.Boolean, default=False) # type: ignore[attr-defined]  # Whether reminder has been sent
     reminder_notification_count = db.Column(db.Integer, default=0) # type: ignore[attr-defined]  # Count of notifications sent
     reminder_first_notification_time = db.Column(db.DateTime, nullable=True) # type: ignore[attr-defined]  # Time of first notification
+    reminder_next_fire_at = db.Column(db.DateTime, nullable=True) # type: ignore[attr-defined]  # When the next notification is due (UTC); kept current on flush
+    reminder_emailed_at = db.Column(db.DateTime, nullable=True) # type: ignore[attr-defined]  # When this reminder went out in an email digest (UTC)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id')) # type: ignore[attr-defined]
     tracker_entries = db.relationship('Tracker', backref='todo', lazy='dynamic') # type: ignore[attr-defined]
+    # Per-user "what is due" checks are a single range scan on this index
+    __table_args__ = (db.Index('ix_todo_reminder_due', 'reminder_enabled', 'reminder_sent', 'user_id', 'reminder_next_fire_at'),) # type: ignore[attr-defined]
 
     @property
     def name(self):
@@ -328,7 +336,7 @@ class Todo(db.Model): # type: ignore[attr-defined]
         self.reminder_sent = False
         self.reminder_notification_count = 0
         self.reminder_first_notification_time = None
-        db.session.commit()  # type: ignore[attr-defined]
+        unit_of_work.commit()
     
     def clear_reminder(self):
         """Clear/disable reminder for this todo"""
@@ -337,7 +345,7 @@ class Todo(db.Model): # type: ignore[attr-defined]
         self.reminder_sent = False
         self.reminder_notification_count = 0
         self.reminder_first_notification_time = None
-        db.session.commit()  # type: ignore[attr-defined]
+        unit_of_work.commit()
     
     def has_pending_reminder(self):
         """Check if todo has a pending reminder to be sent"""
@@ -504,6 +512,44 @@ class TermsAndDisclaimer(db.Model): # type: ignore[attr-defined]
         return default_terms
 
 
+
+class EmailOutbox(db.Model): # type: ignore[attr-defined]
+    """Outgoing emails, queued in the request and delivered by the outbox sender"""
+    id = db.Column(db.Integer, primary_key=True) # type: ignore[attr-defined]
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True, index=True) # type: ignore[attr-defined]
+    kind = db.Column(db.String(32), nullable=False) # type: ignore[attr-defined]  # reminder_digest, invitation, verification, ...
+    recipient = db.Column(db.String(120), nullable=False) # type: ignore[attr-defined]
+    subject = db.Column(db.String(255), nullable=False) # type: ignore[attr-defined]
+    body_text = db.Column(db.Text, nullable=False) # type: ignore[attr-defined]
+    body_html = db.Column(db.Text, nullable=True) # type: ignore[attr-defined]
+    payload = db.Column(db.Text, nullable=True) # type: ignore[attr-defined]  # JSON the body is rendered from at send time (reminder_digest: todo ids)
+    status = db.Column(db.String(20), default='pending', nullable=False) # type: ignore[attr-defined]  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False) # type: ignore[attr-defined]
+    last_error = db.Column(db.Text, nullable=True) # type: ignore[attr-defined]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False) # type: ignore[attr-defined]  # UTC
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False) # type: ignore[attr-defined]  # UTC; lease expiry while 'sending'
+    sent_at = db.Column(db.DateTime, nullable=True) # type: ignore[attr-defined]  # UTC
+    __table_args__ = (db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),) # type: ignore[attr-defined]
+
+    def __repr__(self):
+        return '<EmailOutbox {} {} to {}>'.format(self.id, self.kind, self.recipient)
+
+
+class UserToken(db.Model): # type: ignore[attr-defined]
+    """Single-use tokens sent by email (verification links), stored as SHA-256 hashes"""
+    id = db.Column(db.Integer, primary_key=True) # type: ignore[attr-defined]
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True) # type: ignore[attr-defined]
+    purpose = db.Column(db.String(32), nullable=False) # type: ignore[attr-defined]  # email_verification
+    token_hash = db.Column(db.String(64), unique=True, index=True, nullable=False) # type: ignore[attr-defined]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False) # type: ignore[attr-defined]  # UTC
+    expires_at = db.Column(db.DateTime, nullable=False, index=True) # type: ignore[attr-defined]  # UTC
+
+    user = db.relationship('User', backref=db.backref('tokens', passive_deletes=True)) # type: ignore[attr-defined]
+
+    def __repr__(self):
+        return '<UserToken {} {} for user {}>'.format(self.id, self.purpose, self.user_id)
+
+
 @login.user_loader
 def load_user(id):
     return User.query.get(int(id))
@@ -1,20 +1,228 @@
 """
 Google OAuth2 Authentication Handler
+
+The discovery document and Google's signing certificates are kept in memory
+for as long as their Cache-Control (or Expires) headers allow and a
+background thread refreshes them before they run out, so a login only waits
+on the token exchange. An ID token signed with a key we have not seen yet
+triggers one early certificate refresh (key rotation). All calls go through
+the pooled ``app.http_client.session``.
 """
 
-import os
-import requests
-import json
+import email.utils
 import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
 from flask import current_app, url_for, session
-from google.auth.transport.requests import Request
-from google.oauth2.id_token import verify_oauth2_token
+from app import http_client
+from app.lazy_imports import LazyModule
+from app.metrics import cache_hit
 from app.models import User
 from app import db
 
+logger = logging.getLogger(__name__)
+
+# Imported on first use so workers and CLI commands start without them
+requests = LazyModule('requests')
+google_jwt = LazyModule('google.auth.jwt')
+
+# Google's signing certificates as {key id: PEM}, the format google.auth.jwt verifies against
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+
+_MAX_AGE = re.compile(r'(?:^|[,\s])max-age=(\d+)')
+
+
+def cache_lifetime(headers, default):
+    """Seconds a response may be reused according to its Cache-Control, Age and Expires headers"""
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    match = _MAX_AGE.search(cache_control)
+    if match:
+        try:
+            age = int(headers.get('Age', 0))
+        except ValueError:
+            age = 0
+        return max(int(match.group(1)) - age, 0)
+    if 'Expires' in headers:
+        try:
+            expires = email.utils.parsedate_to_datetime(headers['Expires'])
+            date = email.utils.parsedate_to_datetime(headers['Date']) if 'Date' in headers else datetime.now(timezone.utc)
+            return max((expires - date).total_seconds(), 0)
+        except (TypeError, ValueError):
+            # Invalid dates such as "Expires: 0" mean already expired
+            return 0
+    return default
+
+
+class CachedDocument:
+    """A JSON document fetched over HTTP and reused until its cache lifetime runs out"""
+
+    # Background refresh happens after this fraction of the lifetime
+    REFRESH_AHEAD = 0.8
+
+    def __init__(self, name, url, default_ttl=3600, timeout=10, retry_interval=60):
+        self.name = name
+        self.url = url
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.value = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def fresh(self):
+        return self.value is not None and time.monotonic() < self.expires_at
+
+    def _fetch(self):
+        response = http_client.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        value = response.json()
+        if not isinstance(value, dict):
+            raise ValueError(f'{self.name} is not a JSON object')
+        ttl = cache_lifetime(response.headers, self.default_ttl)
+        now = time.monotonic()
+        self.value = value
+        self.expires_at = now + ttl
+        # Uncacheable documents are fetched on use, never in the background
+        self.refresh_at = now + ttl * self.REFRESH_AHEAD if ttl else float('inf')
+        return value
+
+    def get(self):
+        """Return the document, downloading it only if the cached copy has expired"""
+        if self.fresh:
+            cache_hit(self.name, True)
+            return self.value
+        cache_hit(self.name, False)
+        with self._lock:
+            if self.fresh:
+                return self.value
+            try:
+                return self._fetch()
+            except (requests.RequestException, ValueError) as e:
+                if self.value is None:
+                    raise
+                # Serve the stale copy rather than failing logins while the provider is unreachable
+                logger.warning("Could not refresh %s, using cached copy: %s", self.name, e)
+                self.expires_at = time.monotonic() + self.retry_interval
+                return self.value
+
+    def refresh(self):
+        """Download the document now; on failure keep the current copy and return None"""
+        with self._lock:
+            try:
+                return self._fetch()
+            except (requests.RequestException, ValueError) as e:
+                logger.warning("Could not refresh %s: %s", self.name, e)
+                self.refresh_at = time.monotonic() + self.retry_interval
+                return None
+
+    def clear(self):
+        with self._lock:
+            self.value = None
+            self.expires_at = self.refresh_at = 0.0
+
+
+class OIDCProvider:
+    """Cached discovery document and signing certificates for Google sign-in"""
+
+    def __init__(self):
+        self.discovery = CachedDocument('oidc_discovery', 'https://accounts.google.com/.well-known/openid-configuration')
+        self.certs = CachedDocument('oidc_certs', GOOGLE_CERTS_URL)
+        # Minimum seconds between certificate refreshes forced by unknown key ids
+        self.rotation_interval = 60
+        self._rotated_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def configure(self, config):
+        ttl = config.get('OAUTH_METADATA_DEFAULT_TTL', 3600)
+        timeout = config.get('OAUTH_HTTP_TIMEOUT', 10)
+        self.discovery = CachedDocument('oidc_discovery', config.get('GOOGLE_DISCOVERY_URL', self.discovery.url),
+                                        ttl, timeout)
+        self.certs = CachedDocument('oidc_certs', config.get('GOOGLE_CERTS_URL', self.certs.url), ttl, timeout)
+
+    def config(self):
+        """The provider's discovery document"""
+        return self.discovery.get()
+
+    def signing_certs(self, id_token):
+        """Certificates to verify id_token with, refreshed early if it names a key we don't have"""
+        certs = self.certs.get()
+        try:
+            key_id = google_jwt.decode_header(id_token).get('kid')
+        except ValueError:
+            # Malformed; google_jwt.decode reports it
+            return certs
+        now = time.monotonic()
+        if key_id and key_id not in certs and (
+                self._rotated_at is None or now - self._rotated_at >= self.rotation_interval):
+            self._rotated_at = now
+            certs = self.certs.refresh() or certs
+        return certs
+
+    def verify_id_token(self, id_token, audience):
+        """Check an ID token's signature, audience, expiry and issuer; raises ValueError if invalid"""
+        id_info = google_jwt.decode(id_token, certs=self.signing_certs(id_token), audience=audience)
+        issuer = self.config().get('issuer', 'https://accounts.google.com')
+        # Google issues tokens with and without the scheme
+        if id_info.get('iss') not in (issuer, issuer.split('://', 1)[-1]):
+            raise ValueError(f"Wrong issuer: {id_info.get('iss')}")
+        return id_info
+
+    def start(self):
+        """Start the refresh thread (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='oidc-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            documents = (self.discovery, self.certs)
+            for document in documents:
+                if time.monotonic() >= document.refresh_at:
+                    document.refresh()
+            delay = min(document.refresh_at for document in documents) - time.monotonic()
+            self._stop.wait(min(max(delay, 1), 3600))
+
+    def reset(self):
+        """Forget cached documents (tests)"""
+        self.discovery.clear()
+        self.certs.clear()
+        self._rotated_at = None
+
+
+google_provider = OIDCProvider()
+
+
+def init_app(app):
+    """Configure the provider cache and keep it warm from a background thread"""
+    google_provider.configure(app.config)
+    started = []
+
+    @app.before_request
+    def start_oidc_refresh():
+        if started or app.testing or not app.config.get('GOOGLE_CLIENT_ID'):
+            return
+        if not app.config.get('OAUTH_METADATA_REFRESH_ENABLED', True):
+            return
+        started.append(True)
+        google_provider.start()
+
+
 def get_google_provider_config():
     """Fetch Google OAuth configuration"""
-    return requests.get(current_app.config['GOOGLE_DISCOVERY_URL'], timeout=10).json()
+    return google_provider.config()
 
 def get_oauth_redirect_uri():
     """Get the OAuth redirect URI from config or generate dynamically"""
@@ -81,7 +289,8 @@ def process_google_callback(code):
             "grant_type": "authorization_code",
         }
         
-        token_response = requests.post(token_endpoint, data=token_request_body, timeout=10)
+        token_response = http_client.session.post(token_endpoint, data=token_request_body,
+                                                  timeout=current_app.config.get('OAUTH_HTTP_TIMEOUT', 10))
         tokens = token_response.json()
         
         if "error" in tokens:
@@ -91,7 +300,7 @@ def process_google_callback(code):
         
         # Verify and decode the token
         try:
-            id_info = verify_oauth2_token(id_token, Request(), current_app.config['GOOGLE_CLIENT_ID'])
+            id_info = google_provider.verify_id_token(id_token, current_app.config['GOOGLE_CLIENT_ID'])
         except ValueError:
             # Token verification failed
             return None, False
@@ -141,7 +350,7 @@ def process_google_callback(code):
         detected_tz = detect_timezone_from_ip()
         if detected_tz:
             new_user.timezone = detected_tz
-            logging.debug(f"Auto-detected timezone {detected_tz} for Google user {email}")
+            logging.debug("Auto-detected timezone %s for Google user %s", detected_tz, email)
         
         db.session.add(new_user)  # type: ignore[attr-defined]
         db.session.commit()  # type: ignore[attr-defined]
@@ -149,5 +358,5 @@ def process_google_callback(code):
         return new_user, True
         
     except Exception as e:
-        logging.error(f"Error processing Google callback: {str(e)}")
+        logging.error("Error processing Google callback: %s", e)
         return None, False
@@ -0,0 +1,226 @@
+"""
+Admin-triggered request profiler.
+
+An admin arms the profiler for the next N requests matching a path prefix
+and/or user. Each matching request runs under cProfile and its stats are
+written to ``<instance>/profiles`` as a ``.prof`` file (load it with
+``python -m pstats`` or snakeviz) plus a ``.txt`` summary of the top
+functions. The admin panel lists and serves both.
+
+The arming state is a small JSON file so every worker sees it. Workers only
+look for it once every few seconds, so an unarmed profiler costs a single
+timestamp comparison per request.
+"""
+
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request
+from flask_login import current_user
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ARM_FILE = 'armed.json'
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+\.(prof|txt)$')
+CHECK_INTERVAL = 2.0
+
+_state = {'next_check': 0.0, 'armed': False}
+_state_lock = threading.Lock()
+
+
+def profile_dir(app):
+    """Directory holding the arming file and the captured profiles"""
+    return app.config.get('PROFILER_DIR') or os.path.join(app.instance_path, 'profiles')
+
+
+def _arm_path(app):
+    return os.path.join(profile_dir(app), ARM_FILE)
+
+
+def arm(app, count, path_prefix='', user_email=''):
+    """Profile the next ``count`` requests matching the given filters"""
+    directory = profile_dir(app)
+    os.makedirs(directory, exist_ok=True)
+    config = {
+        'remaining': int(count),
+        'path_prefix': path_prefix or '',
+        'user_email': (user_email or '').strip().lower(),
+        'armed_at': datetime.utcnow().isoformat(),
+    }
+    tmp_path = _arm_path(app) + '.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(config, fh)
+    os.replace(tmp_path, _arm_path(app))
+    _state['next_check'] = 0.0
+
+
+def disarm(app):
+    """Stop profiling requests"""
+    try:
+        os.remove(_arm_path(app))
+    except FileNotFoundError:
+        pass
+    _state['next_check'] = 0.0
+
+
+def get_arm_state(app):
+    """Return the current arming config, or None when disarmed"""
+    try:
+        with open(_arm_path(app)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _matches(config):
+    if config['path_prefix'] and not request.path.startswith(config['path_prefix']):
+        return False
+    if config['user_email']:
+        email = getattr(current_user, 'email', None) if current_user.is_authenticated else None
+        if (email or '').lower() != config['user_email']:
+            return False
+    return True
+
+
+def _claim_slot(app):
+    """Take one of the remaining profiling slots if this request matches"""
+    path = _arm_path(app)
+    try:
+        fh = open(path, 'r+')
+    except OSError:
+        _state['armed'] = False
+        return False
+    with fh:
+        if fcntl:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            config = json.load(fh)
+        except ValueError:
+            return False
+        if config.get('remaining', 0) <= 0 or not _matches(config):
+            return False
+        config['remaining'] -= 1
+        if config['remaining'] <= 0:
+            os.remove(path)
+            _state['armed'] = False
+        else:
+            fh.seek(0)
+            fh.truncate()
+            json.dump(config, fh)
+    return True
+
+
+def list_profiles(app):
+    """Return captured profiles, newest first"""
+    directory = profile_dir(app)
+    profiles = []
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return profiles
+    for entry in entries:
+        if entry.name.endswith('.prof'):
+            stat = entry.stat()
+            base = entry.name[:-len('.prof')]
+            profiles.append({
+                'name': entry.name,
+                'summary': base + '.txt' if os.path.exists(os.path.join(directory, base + '.txt')) else None,
+                'size': stat.st_size,
+                'created': datetime.utcfromtimestamp(stat.st_mtime),
+            })
+    profiles.sort(key=lambda p: p['created'], reverse=True)
+    return profiles
+
+
+def clear_profiles(app):
+    """Delete every captured profile and summary; returns the number of files removed"""
+    removed = 0
+    directory = profile_dir(app)
+    for profile in list_profiles(app):
+        for name in (profile['name'], profile['summary']):
+            if not name:
+                continue
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def is_profile_name(filename):
+    """Validate a requested profile filename before serving it"""
+    return bool(PROFILE_NAME_RE.match(filename)) and filename != ARM_FILE
+
+
+def _save(app, profiler, elapsed, status_code):
+    directory = profile_dir(app)
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    endpoint = re.sub(r'[^\w.-]', '_', request.endpoint or 'unknown')
+    base = os.path.join(directory, f'{stamp}_{endpoint}_{os.getpid()}')
+
+    profiler.dump_stats(base + '.prof')
+
+    import pstats
+
+    summary = io.StringIO()
+    summary.write(f'{request.method} {request.full_path} -> {status_code} in {elapsed * 1000:.1f} ms\n\n')
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats('cumulative').print_stats(40)
+    with open(base + '.txt', 'w') as fh:
+        fh.write(summary.getvalue())
+
+
+def init_app(app):
+    """Register the request hooks"""
+
+    @app.before_request
+    def start_profiler():
+        now = time.monotonic()
+        if now >= _state['next_check']:
+            with _state_lock:
+                _state['next_check'] = now + CHECK_INTERVAL
+                _state['armed'] = os.path.exists(_arm_path(app))
+        if not _state['armed'] or not _claim_slot(app):
+            return
+
+        import cProfile  # only once an admin has armed the profiler
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return
+        g._profiler = (profiler, time.perf_counter())
+
+    @app.after_request
+    def stop_profiler(response):
+        active = g.pop('_profiler', None)
+        if active is None:
+            return response
+        profiler, started = active
+        profiler.disable()
+        try:
+            _save(app, profiler, time.perf_counter() - started, response.status_code)
+        except OSError as e:
+            logger.warning("Could not save request profile: %s", e)
+        return response
+
+    @app.teardown_request
+    def discard_profiler(exc):
+        # Unhandled exceptions skip after_request; never leave a profiler running
+        active = g.pop('_profiler', None)
+        if active is not None:
+            active[0].disable()
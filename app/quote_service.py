@@ -0,0 +1,272 @@
+"""
+Quote pool for /api/quote.
+
+Requests never talk to the quote API. A daemon thread fetches a batch of
+quotes (ZenQuotes' ``/api/quotes`` returns 50 per call) every
+``QUOTE_REFRESH_INTERVAL`` seconds, keeps them in memory and writes them to
+``instance/quotes.json`` so a restarted worker has quotes straight away.
+``get_quote()`` picks from that pool, or from ``LOCAL_QUOTES`` while the pool
+is empty.
+
+Fetches go through a small circuit breaker: after
+``QUOTE_BREAKER_THRESHOLD`` consecutive failures the upstream is left alone
+for ``QUOTE_BREAKER_COOLDOWN`` seconds, then a single trial fetch decides
+whether it closes again.
+"""
+
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+from app import http_client
+from app.lazy_imports import LazyModule
+from app.metrics import cache_hit
+
+logger = logging.getLogger(__name__)
+
+requests = LazyModule('requests')  # imported on the first refresh
+
+# Fallback local quotes (expanded for higher variety)
+LOCAL_QUOTES = [
+    "Stay focused",
+    "Keep it simple",
+    "Progress over perfection",
+    "One step at a time",
+    "You got this",
+    "Be present",
+    "Make it count",
+    "Dream big",
+    "Start now",
+    "Stay curious",
+    "Do better",
+    "Be kind",
+    "Never stop learning",
+    "Create value",
+    "Think different",
+    "Small steps, big gains",
+    "Consistency beats intensity",
+    "Prioritize what matters",
+    "One task at a time",
+    "Momentum starts small",
+    "Plan, then execute",
+    "Trim distractions",
+    "Keep moving forward",
+    "Progress is a process",
+    "Make today count",
+    "Focus on what’s next",
+    "Done is better than perfect",
+    "Clarity drives action",
+    "Build it, then refine it",
+    "Simplify to amplify",
+    "Intent before effort",
+    "Less noise, more work",
+    "Start where you are",
+    "Show up consistently",
+    "Ship, learn, improve",
+    "Think long-term, act today",
+    "Seek momentum, not motivation",
+    "Direction over speed",
+    "Tiny wins, big outcomes",
+    "Focus. Execute. Iterate.",
+]
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a cooldown and a single half-open trial"""
+
+    def __init__(self, threshold=3, cooldown=300):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        """True if a call may be attempted now"""
+        return self.state != 'open'
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                # A failed half-open trial re-opens for another full cooldown
+                self.opened_at = time.monotonic()
+
+
+def _parse(payload):
+    """Extract {'quote', 'author'} items from a ZenQuotes response"""
+    quotes = []
+    if isinstance(payload, list):
+        for item in payload:
+            if not isinstance(item, dict) or not item.get('q'):
+                continue
+            # Rate-limited responses come back as a "quote" from zenquotes.io itself
+            if (item.get('a') or '').lower() == 'zenquotes.io':
+                continue
+            quotes.append({'quote': item['q'], 'author': item.get('a')})
+    return quotes
+
+
+class QuoteService:
+    """In-memory quote pool refreshed in the background"""
+
+    def __init__(self):
+        self._quotes = []
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.url = 'https://zenquotes.io/api/quotes'
+        self.timeout = 5.0
+        self.refresh_interval = 3600.0
+        self.path = None
+        self.breaker = CircuitBreaker()
+
+    def configure(self, config, instance_path=None):
+        self.url = config.get('QUOTE_API_URL', self.url)
+        self.timeout = config.get('QUOTE_FETCH_TIMEOUT', self.timeout)
+        self.refresh_interval = config.get('QUOTE_REFRESH_INTERVAL', self.refresh_interval)
+        self.breaker = CircuitBreaker(config.get('QUOTE_BREAKER_THRESHOLD', 3),
+                                      config.get('QUOTE_BREAKER_COOLDOWN', 300))
+        if instance_path:
+            self.path = os.path.join(instance_path, 'quotes.json')
+
+    @property
+    def size(self):
+        return len(self._quotes)
+
+    def get_quote(self):
+        """Return a quote dict from the pool, or a local quote; never blocks on the network"""
+        quotes = self._quotes
+        cache_hit('quotes', bool(quotes))
+        if quotes:
+            return dict(random.choice(quotes))
+        return {'quote': random.choice(LOCAL_QUOTES)}
+
+    def load(self):
+        """Load the pool persisted by an earlier refresh, if any"""
+        if not self.path:
+            return False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            quotes = [q for q in data.get('quotes', []) if isinstance(q, dict) and q.get('quote')]
+        except (OSError, ValueError, AttributeError):
+            return False
+        if not quotes:
+            return False
+        with self._lock:
+            self._quotes = quotes
+            self._fetched_at = float(data.get('fetched_at') or 0)
+        return True
+
+    def _save(self, quotes):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': self._fetched_at, 'quotes': quotes}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Could not persist quotes to %s: %s", self.path, e)
+
+    def refresh(self):
+        """
+        Fetch a new batch from the quote API
+
+        Skipped while the circuit breaker is open or another refresh is in
+        flight. Returns the number of quotes now in the pool after a
+        successful fetch, otherwise None.
+        """
+        if not self.breaker.allow() or not self._refreshing.acquire(blocking=False):
+            return None
+        try:
+            response = http_client.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            quotes = _parse(response.json())
+            if not quotes:
+                raise ValueError('no quotes in response')
+        except (requests.RequestException, ValueError) as e:
+            self.breaker.record_failure()
+            logger.warning("Quote refresh failed (%s): %s", self.breaker.state, e)
+            return None
+        finally:
+            self._refreshing.release()
+
+        self.breaker.record_success()
+        with self._lock:
+            self._quotes = quotes
+            self._fetched_at = time.time()
+        self._save(quotes)
+        logger.info("Quote pool refreshed with %s quotes", len(quotes))
+        return len(quotes)
+
+    def is_stale(self):
+        return time.time() - self._fetched_at >= self.refresh_interval
+
+    def start(self):
+        """Start the refresh thread (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='quote-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.is_stale():
+                self.refresh()
+            if self.is_stale():
+                # Failed or skipped; try again when the breaker allows it
+                delay = min(self.refresh_interval, max(self.breaker.cooldown / 4, 1))
+            else:
+                delay = self._fetched_at + self.refresh_interval - time.time()
+            self._stop.wait(max(delay, 1))
+
+    def reset(self):
+        """Forget all quotes and breaker state (tests)"""
+        with self._lock:
+            self._quotes = []
+            self._fetched_at = 0.0
+        self.breaker = CircuitBreaker(self.breaker.threshold, self.breaker.cooldown)
+
+
+quotes = QuoteService()
+
+
+def init_app(app):
+    """Load persisted quotes and start the refresh thread on the first request"""
+    quotes.configure(app.config, app.instance_path)
+    started = []
+
+    @app.before_request
+    def start_quote_refresh():
+        if started or not app.config.get('QUOTE_SERVICE_ENABLED', True) or app.testing:
+            return
+        started.append(True)
+        quotes.load()
+        quotes.start()
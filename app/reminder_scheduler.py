@@ -0,0 +1,317 @@
+"""
+In-process reminder scheduler.
+
+Keeps a min-heap of ``(next_fire_at, todo_id)`` for every active reminder so
+"is anything due for user X" is a dictionary lookup instead of a query that
+loads and filters every enabled reminder. Entries move from the heap into a
+per-user "due" set when their time passes; follow-up notifications (30 and
+60 minutes after the first) are simply re-inserted with a later time once a
+notification is recorded, and a reminder that has fired three times or was
+closed drops out.
+
+The heap is kept current by session hooks: any flush that writes a todo's
+reminder fields (``set_reminder``, ``clear_reminder``, cancelling, edits in
+``/add``, ``mark_reminder_sent``) recomputes ``Todo.reminder_next_fire_at``
+and, once committed, reschedules that todo. The heap itself is not
+persisted; it is rebuilt from that column on first use after a restart.
+
+Each worker has its own heap, so writes made by another worker are picked
+up through the user's ``data_version``: callers pass the version they
+already hold and a mismatch reloads that user's reminders (one query).
+Without a version the caller must fall back to the database.
+
+A daemon thread sleeps until the earliest entry is due and then tells the
+registered listeners (the reminder stream hub) which users have something due.
+"""
+
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import pytz
+from sqlalchemy import event, inspect
+
+from app import db
+from app.models import Todo
+
+logger = logging.getLogger(__name__)
+
+FOLLOW_UP_INTERVAL = timedelta(minutes=30)
+MAX_NOTIFICATIONS = 3
+REMINDER_FIELDS = ('reminder_enabled', 'reminder_sent', 'reminder_time',
+                   'reminder_notification_count', 'reminder_first_notification_time')
+
+
+def _utc_naive(value):
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(pytz.UTC).replace(tzinfo=None)
+    return value
+
+
+def next_fire_time(reminder_time, notification_count, first_notification_time):
+    """Return when the next notification for a reminder is due (naive UTC)
+
+    The first notification is due at ``reminder_time``; the 2nd and 3rd follow
+    30 and 60 minutes after the first was shown. Returns None once all three
+    have been shown.
+    """
+    reminder_time = _utc_naive(reminder_time)
+    if reminder_time is None:
+        return None
+    notification_count = notification_count or 0
+    if notification_count == 0:
+        return reminder_time
+    first_notification_time = _utc_naive(first_notification_time)
+    if notification_count >= MAX_NOTIFICATIONS or first_notification_time is None:
+        return None
+    return max(reminder_time, first_notification_time + notification_count * FOLLOW_UP_INTERVAL)
+
+
+def _todo_fire_time(todo):
+    if not todo.reminder_enabled or todo.reminder_sent:
+        return None
+    return next_fire_time(todo.reminder_time, todo.reminder_notification_count,
+                          todo.reminder_first_notification_time)
+
+
+def _utcnow():
+    return datetime.now(pytz.UTC).replace(tzinfo=None)
+
+
+class ReminderScheduler:
+    """Min-heap of upcoming reminders with a per-user index of due ones"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._heap = []          # (fire_at, todo_id); stale rows are skipped lazily
+        self._entries = {}       # todo_id -> (fire_at, user_id)
+        self._user_todos = {}    # user_id -> set of scheduled todo ids
+        self._due = {}           # user_id -> set of todo ids whose time has passed
+        self._versions = {}      # user_id -> data_version the entries reflect
+        self._listeners = []
+        self._thread = None
+        self.loaded = False
+
+    # -- maintenance -------------------------------------------------------
+
+    def reset(self):
+        """Forget everything; the next use reloads from the database"""
+        with self._lock:
+            self._heap = []
+            self._entries.clear()
+            self._user_todos.clear()
+            self._due.clear()
+            self._versions.clear()
+            self.loaded = False
+            self._wakeup.notify_all()
+
+    def _rows(self, user_id=None):
+        query = db.session.query(  # type: ignore[attr-defined]
+            Todo.id, Todo.user_id, Todo.reminder_next_fire_at
+        ).filter(
+            Todo.reminder_enabled == True,
+            Todo.reminder_sent == False,
+            Todo.reminder_next_fire_at != None
+        )
+        if user_id is not None:
+            query = query.filter(Todo.user_id == user_id)
+        return query.all()
+
+    def load(self):
+        """Rebuild the heap from every active reminder in the database"""
+        rows = list(self._rows())
+        with self._lock:
+            self.reset()
+            for todo_id, user_id, fire_at in rows:
+                self._set(todo_id, user_id, fire_at)
+            heapq.heapify(self._heap)
+            self.loaded = True
+            self._wakeup.notify_all()
+        logger.info("Reminder scheduler loaded %s reminders", len(rows))
+
+    def sync_user(self, user_id, data_version=None):
+        """Reload one user's reminders from the database"""
+        rows = list(self._rows(user_id))
+        with self._lock:
+            for todo_id in list(self._user_todos.get(user_id, ())):
+                self._remove(todo_id)
+            for todo_id, owner_id, fire_at in rows:
+                self._set(todo_id, owner_id, fire_at)
+            self._versions[user_id] = data_version
+            self._wakeup.notify_all()
+
+    def _set(self, todo_id, user_id, fire_at):
+        self._remove(todo_id)
+        self._entries[todo_id] = (fire_at, user_id)
+        self._user_todos.setdefault(user_id, set()).add(todo_id)
+        heapq.heappush(self._heap, (fire_at, todo_id))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            # Drop rows left behind by rescheduling
+            self._heap = [(entry[0], key) for key, entry in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _remove(self, todo_id):
+        entry = self._entries.pop(todo_id, None)
+        if entry is None:
+            return
+        user_id = entry[1]
+        for index in (self._user_todos, self._due):
+            todos = index.get(user_id)
+            if todos is not None:
+                todos.discard(todo_id)
+                if not todos:
+                    del index[user_id]
+
+    def schedule(self, todo_id, user_id, fire_at):
+        """(Re)schedule a todo's next notification; ``fire_at=None`` removes it"""
+        with self._lock:
+            if fire_at is None:
+                self._remove(todo_id)
+            else:
+                self._set(todo_id, user_id, _utc_naive(fire_at))
+                if self._heap[0][1] == todo_id:
+                    self._wakeup.notify_all()
+
+    def _advance(self, now):
+        """Move entries whose time has passed into the due index; returns their users"""
+        users = set()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            fire_at, todo_id = heapq.heappop(heap)
+            entry = self._entries.get(todo_id)
+            if entry is None or entry[0] != fire_at:
+                continue  # rescheduled or removed since it was pushed
+            self._due.setdefault(entry[1], set()).add(todo_id)
+            users.add(entry[1])
+        return users
+
+    # -- queries -----------------------------------------------------------
+
+    def has_due(self, user_id, data_version=None):
+        """Return True if the user has a reminder notification due now
+
+        Args:
+            user_id: User ID
+            data_version: The user's current ``data_version``; when it differs
+                from the one the heap was built from, the user is reloaded
+        """
+        if not self.loaded:
+            self.load()
+        if user_id not in self._versions or self._versions[user_id] != data_version:
+            self.sync_user(user_id, data_version)
+        with self._lock:
+            self._advance(_utcnow())
+            return bool(self._due.get(user_id))
+
+    def next_fire_at(self):
+        """Earliest scheduled notification in this worker, or None"""
+        with self._lock:
+            while self._heap:
+                fire_at, todo_id = self._heap[0]
+                entry = self._entries.get(todo_id)
+                if entry is not None and entry[0] == fire_at:
+                    return fire_at
+                heapq.heappop(self._heap)
+            return None
+
+    # -- wake-ups ----------------------------------------------------------
+
+    def on_due(self, callback):
+        """Register ``callback(user_ids)`` to run when reminders fall due"""
+        self._listeners.append(callback)
+        return callback
+
+    def start(self):
+        """Start the daemon thread that fires listeners when reminders fall due"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                fire_at = self.next_fire_at()
+                timeout = None if fire_at is None else max((fire_at - _utcnow()).total_seconds(), 0)
+                self._wakeup.wait(timeout)
+                users = self._advance(_utcnow())
+            for callback in self._listeners:
+                try:
+                    callback(users)
+                except Exception as e:
+                    logger.error("Reminder scheduler listener failed: %s", e)
+
+
+scheduler = ReminderScheduler()
+
+
+def _reminder_changed(session_, obj):
+    if obj in session_.new:
+        return True
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in REMINDER_FIELDS)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _update_next_fire_at(session_, flush_context, instances):
+    # Keep Todo.reminder_next_fire_at in step with the fields it derives from
+    for obj in list(session_.new) + list(session_.dirty):
+        if isinstance(obj, Todo) and _reminder_changed(session_, obj):
+            fire_at = _todo_fire_time(obj)
+            if obj.reminder_next_fire_at != fire_at:
+                obj.reminder_next_fire_at = fire_at
+            if obj.reminder_emailed_at is not None and inspect(obj).attrs.reminder_time.history.has_changes():
+                # A rescheduled reminder is due to be emailed again
+                obj.reminder_emailed_at = None
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_reminder_changes(session_, flush_context):
+    changes = session_.info.setdefault('reminder_schedule_pending', {})
+    for obj in list(session_.new) + list(session_.dirty):
+        if isinstance(obj, Todo) and obj.id is not None and _reminder_changed(session_, obj):
+            changes[obj.id] = (obj.user_id, obj.reminder_next_fire_at)
+    for obj in session_.deleted:
+        if isinstance(obj, Todo) and obj.id is not None:
+            changes[obj.id] = (obj.user_id, None)
+    if not changes:
+        session_.info.pop('reminder_schedule_pending', None)
+
+
+def schedule_after_commit(changes):
+    """Queue ``{todo_id: (user_id, next_fire_at)}`` written by a bulk ``UPDATE``
+
+    Bulk updates bypass the flush hooks above; the heap picks these up when
+    the current transaction commits.
+    """
+    db.session.info.setdefault('reminder_schedule_pending', {}).update(changes)  # type: ignore[attr-defined]
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_reminder_changes(session_):
+    changes = session_.info.pop('reminder_schedule_pending', None)
+    if changes and scheduler.loaded:
+        for todo_id, (user_id, fire_at) in changes.items():
+            scheduler.schedule(todo_id, user_id, fire_at)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_reminder_changes(session_, previous_transaction):
+    session_.info.pop('reminder_schedule_pending', None)
+
+
+def init_app(app):
+    """Start the wake-up thread on the first request (after any worker fork)"""
+    started = []
+
+    @app.before_request
+    def start_reminder_scheduler():
+        if started or not app.config.get('REMINDER_SCHEDULER_ENABLED', True) or app.testing:
+            return
+        started.append(True)
+        if not scheduler.loaded:
+            scheduler.load()
+        scheduler.start()
@@ -3,73 +3,152 @@ Reminder service to handle scheduled reminders for todos.
 Checks for pending reminders and sends notifications.
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
+import json
 import logging
-from sqlalchemy import and_, not_
+from sqlalchemy import and_, func, not_, or_, update
 from app import db
+from app.data_version import bump_users
 from app.models import Todo, User
+from app.reminder_scheduler import next_fire_time, schedule_after_commit
 from flask import current_app
 
+logger = logging.getLogger(__name__)
+
+# Ids per IN (...) list; stays under SQLite's historical 999 bound-parameter limit
+BATCH_SIZE = 500
+
+# Stored on queued digests; the real subject names the todos and is rendered at send time
+DIGEST_SUBJECT = 'TodoBox reminders'
+
+
+def _chunks(ids, size=BATCH_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
 class ReminderService:
     """Service to manage todo reminders"""
     
     @staticmethod
-    def get_pending_reminders(user_id=None):
+    def get_pending_reminders(user_id=None, data_version=None):
         """Get all pending reminders for a user or all users
         
         Args:
             user_id: Optional user ID to filter reminders
+            data_version: The user's current data_version; lets the in-process
+                scheduler answer "nothing due" without querying
             
         Returns:
             List of Todo objects with pending reminders (excluding auto-closed ones)
         """
+        if user_id and data_version is not None and current_app.config.get('REMINDER_SCHEDULER_ENABLED', True):
+            from app.reminder_scheduler import scheduler
+            if not scheduler.has_due(user_id, data_version):
+                return []
+        
+        # Get current time in UTC for comparison (reminder times are stored in UTC)
+        now = datetime.now(pytz.UTC).replace(tzinfo=None)
+        
+        # reminder_next_fire_at already folds in the 30-minute follow-up spacing
+        # and is NULL once all three notifications were shown, so the due check
+        # is a range scan on ix_todo_reminder_due. Reminders that reach their
+        # third notification within 30 minutes are auto-closed by mark_reminder_sent.
         query = Todo.query.filter(
             and_(
                 Todo.reminder_enabled == True,
                 Todo.reminder_sent == False,
-                Todo.reminder_time != None
+                Todo.reminder_next_fire_at <= now
             )
         )
         
         if user_id:
             query = query.filter(Todo.user_id == user_id)
         
-        # Get current time in UTC for comparison (reminder_time is stored in UTC)
+        return query.order_by(Todo.reminder_next_fire_at).all()
+    
+    @staticmethod
+    def get_next_reminder_time(user_id):
+        """Get the next moment a reminder (or follow-up) becomes due for a user
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Naive UTC datetime of the earliest future notification, or None
+        """
         now = datetime.now(pytz.UTC).replace(tzinfo=None)
+        return db.session.query(func.min(Todo.reminder_next_fire_at)).filter(  # type: ignore[attr-defined]
+            Todo.user_id == user_id,
+            Todo.reminder_enabled == True,
+            Todo.reminder_sent == False,
+            Todo.reminder_next_fire_at > now
+        ).scalar()
+
+    @staticmethod
+    def get_poll_interval(next_reminder_time, has_pending=False):
+        """Seconds a polling client should wait before checking again
+        
+        Args:
+            next_reminder_time: Naive UTC datetime of the next notification, or None
+            has_pending: Whether reminders are due right now
+            
+        Returns:
+            Seconds, clamped to REMINDER_POLL_MIN_INTERVAL..REMINDER_POLL_MAX_INTERVAL
+        """
+        min_interval = current_app.config.get('REMINDER_POLL_MIN_INTERVAL', 5)
+        max_interval = current_app.config.get('REMINDER_POLL_MAX_INTERVAL', 300)
+        # Shown reminders are acknowledged by the client; re-check at the old pace
+        interval = 10 if has_pending else max_interval
+        if next_reminder_time is not None:
+            now = datetime.now(pytz.UTC).replace(tzinfo=None)
+            interval = min(interval, (next_reminder_time - now).total_seconds())
+        return int(max(min_interval, min(interval, max_interval)))
+    
+    @staticmethod
+    def serialize_reminder(todo, user_timezone='UTC'):
+        """Build the client payload for a pending reminder
+        
+        Args:
+            todo: Todo object with a pending reminder
+            user_timezone: Timezone the reminder time is displayed in
+            
+        Returns:
+            Dict as returned by /api/reminders/check and the reminder stream
+        """
+        return ReminderService.serialize_reminders([todo], user_timezone)[0]
+    
+    @staticmethod
+    def serialize_reminders(todos, user_timezone='UTC'):
+        """Build the client payloads for a list of pending reminders
+        
+        Reminder times are converted to the user's timezone in one batch.
         
-        # Filter by reminder time - only include reminders where time has passed
-        # reminder_time is stored as UTC, so we compare against UTC now
-        results = []
-        for todo in query.all():
-            if todo.reminder_time and todo.reminder_time < now:
-                # Check if this reminder should be auto-closed (3+ notifications in 30 minutes)
-                if todo.should_auto_close_reminder():
-                    # Auto-close the reminder
-                    todo.reminder_enabled = False
-                    todo.reminder_sent = True
-                    db.session.commit()  # type: ignore[attr-defined]
-                    logging.info(f"Auto-closed reminder for todo {todo.id} after 3 notifications in 30 minutes")
-                else:
-                    # Check if we should send another reminder (spaced 30 minutes apart)
-                    notification_count = todo.reminder_notification_count or 0
-                    
-                    if notification_count == 0:
-                        # First notification - always show
-                        results.append(todo)
-                    elif todo.reminder_first_notification_time:
-                        # For subsequent notifications, check if appropriate time has passed
-                        # 2nd reminder: needs 30 min elapsed
-                        # 3rd reminder: needs 60 min elapsed
-                        elapsed_time = now - todo.reminder_first_notification_time
-                        required_elapsed_seconds = notification_count * 30 * 60  # 1st=0, 2nd=1800, 3rd=3600, etc
-                        
-                        if elapsed_time.total_seconds() >= required_elapsed_seconds:
-                            # Only show up to 3 reminders total
-                            if notification_count < 3:
-                                results.append(todo)
-        
-        return results
+        Args:
+            todos: Todo objects with pending reminders
+            user_timezone: Timezone the reminder times are displayed in
+            
+        Returns:
+            List of dicts, see serialize_reminder
+        """
+        from app.timezone_utils import convert_many
+        
+        todos = list(todos)
+        reminder_times = convert_many([todo.reminder_time for todo in todos], user_timezone)
+        payloads = []
+        for todo, reminder_time in zip(todos, reminder_times):
+            # Check if this will be the last notification before auto-close
+            notification_count = todo.reminder_notification_count or 0
+            payloads.append({
+                'todo_id': todo.id,
+                'title': todo.name,
+                'details': todo.details,
+                'reminder_time': reminder_time.isoformat() if reminder_time else None,
+                'notification_count': notification_count,
+                'is_last_notification': notification_count >= 2  # This will be the 3rd notification
+            })
+        return payloads
     
     @staticmethod
     def mark_reminder_sent(todo_id):
@@ -78,28 +157,63 @@ class ReminderService:
         Args:
             todo_id: ID of the todo
         """
-        todo = Todo.query.get(todo_id)
-        if todo:
-            # Increment notification count
-            if todo.reminder_notification_count is None:
-                todo.reminder_notification_count = 0
-            todo.reminder_notification_count += 1
-            
-            # Track first notification time
-            if todo.reminder_first_notification_time is None:
-                todo.reminder_first_notification_time = datetime.now(pytz.UTC).replace(tzinfo=None)
-            
-            # Check if we should auto-close the reminder (3+ notifications in 30 minutes)
-            if todo.should_auto_close_reminder():
-                todo.reminder_enabled = False
-                todo.reminder_sent = True
-                logging.info(f"Auto-closed reminder for todo {todo_id} after 3 notifications in 30 minutes")
+        return bool(ReminderService.mark_reminders_sent([todo_id]))
+    
+    @staticmethod
+    def mark_reminders_sent(todo_ids):
+        """Record a shown notification for many reminders in one transaction
+        
+        Rows are grouped by the state they move to (new count, first
+        notification time, next fire time, auto-closed or not) and each group
+        is written with a single ``UPDATE ... WHERE id IN (...)``. A burst of
+        first notifications is therefore one statement per chunk of ids.
+        
+        Args:
+            todo_ids: Iterable of todo IDs
             
-            db.session.add(todo)  # type: ignore[attr-defined]
-            db.session.flush()  # type: ignore[attr-defined]
-            db.session.commit()  # type: ignore[attr-defined]
-            return True
-        return False
+        Returns:
+            Number of reminders updated
+        """
+        todo_ids = list(dict.fromkeys(todo_ids))
+        if not todo_ids:
+            return 0
+        
+        now = datetime.now(pytz.UTC).replace(tzinfo=None)
+        groups = {}
+        owners = {}
+        for chunk in _chunks(todo_ids):
+            rows = db.session.query(  # type: ignore[attr-defined]
+                Todo.id, Todo.user_id, Todo.reminder_time,
+                Todo.reminder_notification_count, Todo.reminder_first_notification_time
+            ).filter(Todo.id.in_(chunk)).all()
+            for todo_id, user_id, reminder_time, count, first_time in rows:
+                count = (count or 0) + 1
+                first_time = first_time or now
+                # Auto-close after 3 notifications within 30 minutes
+                closed = count >= 3 and (now - first_time).total_seconds() <= 30 * 60
+                fire_at = None if closed else next_fire_time(reminder_time, count, first_time)
+                groups.setdefault((count, first_time, fire_at, closed), []).append(todo_id)
+                owners[todo_id] = (user_id, fire_at)
+        
+        for (count, first_time, fire_at, closed), ids in groups.items():
+            values = {
+                'reminder_notification_count': count,
+                'reminder_first_notification_time': first_time,
+                'reminder_next_fire_at': fire_at,
+            }
+            if closed:
+                values.update(reminder_enabled=False, reminder_sent=True)
+                logger.info("Auto-closed %s reminder(s) after 3 notifications in 30 minutes", len(ids))
+            for chunk in _chunks(ids):
+                db.session.execute(  # type: ignore[attr-defined]
+                    update(Todo).where(Todo.id.in_(chunk)).values(**values)
+                    .execution_options(synchronize_session='evaluate')
+                )
+        
+        bump_users(user_id for user_id, _ in owners.values())
+        schedule_after_commit(owners)
+        db.session.commit()  # type: ignore[attr-defined]
+        return len(owners)
     
     @staticmethod
     def cancel_reminder(todo_id):
@@ -135,26 +249,148 @@ class ReminderService:
             'errors': []
         }
         
+        sent = []
         for todo in pending_reminders:
             try:
                 # Create notification
                 notification = ReminderService.create_notification(todo)
                 
                 if notification:
-                    # Mark reminder as sent
-                    ReminderService.mark_reminder_sent(todo.id)
-                    result['processed'] += 1
-                    
-                    logging.info(f"Reminder sent for todo {todo.id}: {todo.name}")
+                    sent.append(todo.id)
             except Exception as e:
                 result['errors'].append({
                     'todo_id': todo.id,
                     'error': str(e)
                 })
-                logging.error(f"Error processing reminder for todo {todo.id}: {str(e)}")
+                logger.error("Error processing reminder for todo %s: %s", todo.id, e)
+        
+        # Mark every sent reminder in one transaction
+        result['processed'] = ReminderService.mark_reminders_sent(sent)
+        logger.info("Reminders sent: %s", result['processed'])
         
         return result
     
+    @staticmethod
+    def queue_reminder_digests(now=None):
+        """Queue one digest email per user for reminders nobody has seen yet
+        
+        Due reminders that have not been shown in a browser (notification
+        count 0) or emailed are collected per user. A user's digest is queued
+        once their oldest such reminder has waited REMINDER_EMAIL_WINDOW
+        seconds, so reminders falling due close together share one email.
+        Users at REMINDER_EMAIL_MAX_PER_HOUR digests wait for a later run.
+        
+        Args:
+            now: Naive UTC datetime to treat as the current time
+            
+        Returns:
+            Number of digests queued
+        """
+        from app.email_service import enqueue_email
+        from app.models import EmailOutbox
+        
+        now = now or datetime.now(pytz.UTC).replace(tzinfo=None)
+        window = timedelta(seconds=current_app.config.get('REMINDER_EMAIL_WINDOW', 60))
+        hourly_cap = current_app.config.get('REMINDER_EMAIL_MAX_PER_HOUR', 4)
+        
+        todos = Todo.query.join(User, Todo.user_id == User.id).filter(
+            Todo.reminder_enabled == True,
+            Todo.reminder_sent == False,
+            Todo.reminder_next_fire_at <= now,
+            Todo.reminder_emailed_at == None,
+            or_(Todo.reminder_notification_count == 0, Todo.reminder_notification_count == None),
+            User.email != None,
+            User.email_verified == True
+        ).order_by(Todo.user_id, Todo.reminder_next_fire_at).all()
+        
+        by_user = {}
+        for todo in todos:
+            by_user.setdefault(todo.user_id, []).append(todo)
+        
+        emailed = []
+        queued = 0
+        for user_id, user_todos in by_user.items():
+            if user_todos[0].reminder_next_fire_at > now - window:
+                continue  # Still collecting
+            recent = EmailOutbox.query.filter(
+                EmailOutbox.user_id == user_id,
+                EmailOutbox.kind == 'reminder_digest',
+                EmailOutbox.created_at > now - timedelta(hours=1)
+            ).count()
+            if recent >= hourly_cap:
+                logger.info("Reminder digest for user %s deferred: %s sent in the last hour", user_id, recent)
+                continue
+            
+            user = db.session.get(User, user_id)  # type: ignore[attr-defined]
+            # Only the todo ids are stored; the digest is rendered when it is sent
+            payload = json.dumps({'todo_ids': [todo.id for todo in user_todos]})
+            enqueue_email(user.email, DIGEST_SUBJECT, '', kind='reminder_digest', user_id=user_id, payload=payload)
+            emailed.extend(todo.id for todo in user_todos)
+            queued += 1
+        
+        for chunk in _chunks(emailed):
+            db.session.execute(  # type: ignore[attr-defined]
+                update(Todo).where(Todo.id.in_(chunk)).values(reminder_emailed_at=now)
+                .execution_options(synchronize_session='evaluate')
+            )
+        db.session.commit()  # type: ignore[attr-defined]
+        if queued:
+            logger.info("Queued %s reminder digest(s) covering %s reminder(s)", queued, len(emailed))
+        return queued
+    
+    @staticmethod
+    def render_digest(entry):
+        """Render a queued reminder_digest outbox entry from its todo ids
+        
+        Todos deleted since the digest was queued are left out.
+        
+        Args:
+            entry: EmailOutbox entry with a ``{"todo_ids": [...]}`` payload
+            
+        Returns:
+            tuple: (subject, body_text, body_html), or None if nothing is left to send
+        """
+        user = db.session.get(User, entry.user_id) if entry.user_id else None  # type: ignore[attr-defined]
+        todo_ids = json.loads(entry.payload).get('todo_ids') or []
+        if user is None or not todo_ids:
+            return None
+        todos = Todo.query.filter(Todo.id.in_(todo_ids), Todo.user_id == user.id).order_by(
+            Todo.reminder_next_fire_at, Todo.id).all()
+        if not todos:
+            return None
+        return ReminderService.build_digest(user, todos)
+    
+    @staticmethod
+    def build_digest(user, todos):
+        """Render the subject, plain text and HTML body of a reminder digest
+        
+        Args:
+            user: Recipient User
+            todos: Todo objects with due reminders
+            
+        Returns:
+            tuple: (subject, body_text, body_html)
+        """
+        from html import escape
+        from app.timezone_utils import convert_many
+        
+        lines = []
+        items = []
+        reminder_times = convert_many([todo.reminder_time for todo in todos], user.timezone or 'UTC')
+        for todo, when in zip(todos, reminder_times):
+            when_str = when.strftime('%Y-%m-%d %H:%M') if when else ''
+            lines.append(f"- {todo.name} ({when_str})")
+            items.append(f"<li><strong>{escape(todo.name)}</strong> <small>{escape(when_str)}</small></li>")
+        
+        count = len(todos)
+        subject = f"TodoBox reminder: {todos[0].name}" if count == 1 else f"TodoBox: {count} reminders due"
+        greeting = user.fullname or user.email.split('@')[0]
+        body_text = "Hello {},\n\nThe following {} due:\n\n{}\n\nTodoBox".format(
+            greeting, 'reminder is' if count == 1 else f'{count} reminders are', '\n'.join(lines))
+        body_html = "<p>Hello {},</p><p>The following {} due:</p><ul>{}</ul><p>TodoBox</p>".format(
+            escape(greeting), 'reminder is' if count == 1 else f'{count} reminders are', ''.join(items))
+        return subject, body_text, body_html
+    
     @staticmethod
     def create_notification(todo):
         """Create a notification for a reminder
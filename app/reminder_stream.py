@@ -0,0 +1,175 @@
+"""
+Server-Sent Events stream for reminders.
+
+Instead of every tab polling ``/api/reminders/check`` every ten seconds, a
+tab holds one ``/api/reminders/stream`` connection. The stream sleeps until
+the user's next reminder falls due, their todos change (signalled in-process
+from the data version hooks, or noticed through ``data_version`` on the next
+heartbeat when another worker made the change), or a heartbeat is due.
+
+Event ids list the ``<todo_id>-<notification_count>`` pairs delivered, so a
+reconnecting ``EventSource`` sends them back as ``Last-Event-ID`` and the
+same notification is not shown twice. Each worker caps its concurrent
+streams; once full it answers 503 and the client falls back to polling.
+
+Streams hold a worker thread for their lifetime, so the stream is off unless
+``REMINDER_STREAM_ENABLED`` is set, which should only be done with threaded
+or gevent workers (e.g. ``gunicorn -k gthread --threads 16`` or ``-k gevent``).
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+import pytz
+from flask import Response, current_app, stream_with_context
+
+from app import db
+from app.data_version import on_data_change
+from app.models import User
+from app.reminder_scheduler import scheduler
+from app.reminder_service import ReminderService
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderStreamHub:
+    """Tracks open streams in this worker and wakes them on data changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = {}  # user_id -> set of threading.Event
+
+    @property
+    def active(self):
+        with self._lock:
+            return sum(len(events) for events in self._waiters.values())
+
+    def register(self, user_id, limit):
+        """Return a wake-up event for a new stream, or None if the worker is full"""
+        with self._lock:
+            if sum(len(events) for events in self._waiters.values()) >= limit:
+                return None
+            wake = threading.Event()
+            self._waiters.setdefault(user_id, set()).add(wake)
+            return wake
+
+    def unregister(self, user_id, wake):
+        """Release a stream's slot; safe to call more than once"""
+        with self._lock:
+            events = self._waiters.get(user_id)
+            if events:
+                events.discard(wake)
+                if not events:
+                    del self._waiters[user_id]
+
+    def notify(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                for wake in self._waiters.get(user_id, ()):
+                    wake.set()
+
+
+hub = ReminderStreamHub()
+on_data_change(hub.notify)
+scheduler.on_due(hub.notify)
+
+
+def _reminder_key(reminder):
+    return '{}-{}'.format(reminder['todo_id'], reminder['notification_count'])
+
+
+def parse_last_event_id(value):
+    """Return the reminder keys a reconnecting client has already received"""
+    if not value:
+        return set()
+    return {key for key in value.split('.') if key and len(key) <= 32}
+
+
+def _format_event(event, data, event_id=None, retry=None):
+    lines = []
+    if retry is not None:
+        lines.append(f'retry: {int(retry)}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+def _data_version(user_id):
+    return db.session.query(User.data_version).filter(User.id == user_id).scalar()  # type: ignore[attr-defined]
+
+
+def _stream(user_id, user_timezone, wake, delivered):
+    config = current_app.config
+    heartbeat = float(config.get('REMINDER_STREAM_HEARTBEAT', 15))
+    max_age = float(config.get('REMINDER_STREAM_MAX_AGE', 3600))
+    retry_ms = int(config.get('REMINDER_STREAM_RETRY_MS', 5000))
+
+    opened = time.monotonic()
+    version = None
+    check = True
+    try:
+        yield _format_event('ready', {'heartbeat': heartbeat}, retry=retry_ms)
+
+        while time.monotonic() - opened < max_age:
+            if check:
+                version = _data_version(user_id)
+                pending = ReminderService.get_pending_reminders(user_id, version)
+                fresh = ReminderService.serialize_reminders(pending, user_timezone)
+                fresh = [r for r in fresh if _reminder_key(r) not in delivered]
+                next_due = ReminderService.get_next_reminder_time(user_id)
+                # Return the pooled connection while the stream sleeps
+                db.session.close()  # type: ignore[attr-defined]
+
+                if fresh:
+                    keys = [_reminder_key(r) for r in fresh]
+                    delivered.update(keys)
+                    yield _format_event('reminders', {'count': len(fresh), 'reminders': fresh},
+                                        event_id='.'.join(keys))
+
+            timeout = heartbeat
+            if next_due is not None:
+                now = datetime.now(pytz.UTC).replace(tzinfo=None)
+                timeout = min(timeout, max((next_due - now).total_seconds(), 0) + 0.5)
+
+            woken = wake.wait(timeout)
+            wake.clear()
+            if woken:
+                check = True
+                continue
+
+            # Timed out: either a reminder fell due, or it is time for a heartbeat.
+            # A change made by another worker shows up as a new data_version.
+            due = next_due is not None and datetime.now(pytz.UTC).replace(tzinfo=None) >= next_due
+            current = _data_version(user_id)
+            db.session.close()  # type: ignore[attr-defined]
+            check = due or current != version
+            if not check:
+                yield ': heartbeat\n\n'
+    finally:
+        hub.unregister(user_id, wake)
+
+
+def stream_response(user, last_event_id=None):
+    """Open a reminder stream for ``user``, or return 503 when this worker is full"""
+    limit = int(current_app.config.get('REMINDER_STREAM_MAX_PER_WORKER', 50))
+    user_id = user.id
+    wake = hub.register(user_id, limit)
+    if wake is None:
+        logger.info("Reminder stream limit (%s) reached, client will fall back to polling", limit)
+        response = Response(json.dumps({'error': 'Too many reminder streams', 'fallback': 'poll'}),
+                            status=503, mimetype='application/json')
+        response.headers['Retry-After'] = '300'
+        return response
+
+    generator = _stream(user_id, user.timezone or 'UTC', wake, parse_last_event_id(last_event_id))
+    response = Response(stream_with_context(generator), mimetype='text/event-stream')
+    # Also release the slot if the client disconnects before the stream starts
+    response.call_on_close(lambda: hub.unregister(user_id, wake))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # disable nginx response buffering
+    return response
@@ -0,0 +1,187 @@
+"""
+Per-request timing instrumentation.
+
+For a sampled fraction of requests this records wall time, SQL statement
+count and time, template render time and time spent in the todo encryption
+helpers. Results are returned in a ``Server-Timing`` header (visible in the
+browser dev tools) and written as one JSON log line per request. Statements
+repeated more than ``N_PLUS_ONE_THRESHOLD`` times in one request are logged
+as likely N+1 queries.
+
+Configuration (app/config.py):
+    REQUEST_TIMING_ENABLED       - master switch
+    REQUEST_TIMING_SAMPLE_RATE   - fraction of requests to instrument (0.0-1.0)
+    SERVER_TIMING_HEADER         - who gets the Server-Timing header: 'admin'
+                                   (default; requests from sessions that logged
+                                   in as a system admin are always timed),
+                                   'all' or 'off'
+    N_PLUS_ONE_THRESHOLD         - repeats of one statement before warning
+"""
+
+import json
+import logging
+import random
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import g, has_app_context, request, session, template_rendered, before_render_template
+from flask_login import user_logged_in, user_logged_out
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Session flag set at login for system admins; admin requests are always timed
+ADMIN_SESSION_KEY = '_timing_admin'
+
+
+class RequestTimings:
+    """Counters collected for a single sampled request"""
+
+    __slots__ = ('start', 'sql_count', 'sql_time', 'statements',
+                 'template_time', 'template_depth', 'template_start', 'crypto_time', 'crypto_count')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.template_start = 0.0
+        self.crypto_time = 0.0
+        self.crypto_count = 0
+
+
+def current_timings():
+    """Return the timings of the current request, or None if it is not sampled"""
+    if not has_app_context():
+        return None
+    return g.get('_request_timings')
+
+
+def timed_crypto(f):
+    """Decorator adding the wrapped function's duration to the request's crypto time"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        timings = current_timings()
+        if timings is None:
+            return f(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            timings.crypto_time += time.perf_counter() - started
+            timings.crypto_count += 1
+    return wrapper
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_timings() is not None:
+        conn.info.setdefault('_request_timing_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = current_timings()
+    starts = conn.info.get('_request_timing_start')
+    if timings is None or not starts:
+        return
+    timings.sql_time += time.perf_counter() - starts.pop()
+    timings.sql_count += 1
+    timings.statements[statement] += 1
+
+
+def _before_render(sender, template, context, **extra):
+    timings = current_timings()
+    if timings is not None:
+        if timings.template_depth == 0:
+            timings.template_start = time.perf_counter()
+        timings.template_depth += 1
+
+
+def _after_render(sender, template, context, **extra):
+    timings = current_timings()
+    if timings is not None and timings.template_depth:
+        timings.template_depth -= 1
+        if timings.template_depth == 0:
+            timings.template_time += time.perf_counter() - timings.template_start
+
+
+def _server_timing_header(timings, wall):
+    return ', '.join([
+        'app;dur={:.1f}'.format(wall * 1000),
+        'db;dur={:.1f};desc="{} queries"'.format(timings.sql_time * 1000, timings.sql_count),
+        'tpl;dur={:.1f}'.format(timings.template_time * 1000),
+        'crypto;dur={:.1f};desc="{} calls"'.format(timings.crypto_time * 1000, timings.crypto_count),
+    ])
+
+
+def _header_mode(app):
+    value = str(app.config.get('SERVER_TIMING_HEADER', 'admin')).lower()
+    return {'true': 'all', 'false': 'off'}.get(value, value)
+
+
+def _viewer_is_admin():
+    # Set at login (see _remember_admin), so no request has to load the user just for this
+    return session.get(ADMIN_SESSION_KEY, False)
+
+
+def _remember_admin(sender, user, **extra):
+    session[ADMIN_SESSION_KEY] = bool(user.is_system_admin())
+
+
+def _forget_admin(sender, user, **extra):
+    session.pop(ADMIN_SESSION_KEY, None)
+
+
+def init_app(app):
+    """Register the timing hooks on the application"""
+    template_rendered.connect(_after_render, app)
+    before_render_template.connect(_before_render, app)
+    user_logged_in.connect(_remember_admin, app)
+    user_logged_out.connect(_forget_admin, app)
+
+    @app.before_request
+    def start_request_timing():
+        if not app.config.get('REQUEST_TIMING_ENABLED', True):
+            return
+        rate = app.config.get('REQUEST_TIMING_SAMPLE_RATE', 0.01)
+        if rate >= 1.0 or random.random() < rate:  # nosec - sampling only, not security
+            g._request_timings = RequestTimings()
+        elif request.endpoint != 'static' and _header_mode(app) == 'admin' and _viewer_is_admin():
+            g._request_timings = RequestTimings()
+
+    @app.after_request
+    def finish_request_timing(response):
+        timings = g.pop('_request_timings', None)
+        if timings is None:
+            return response
+        wall = time.perf_counter() - timings.start
+
+        mode = _header_mode(app)
+        if mode == 'all' or (mode == 'admin' and _viewer_is_admin()):
+            response.headers['Server-Timing'] = _server_timing_header(timings, wall)
+
+        logger.info(json.dumps({
+            'event': 'request_timing',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'wall_ms': round(wall * 1000, 2),
+            'sql_count': timings.sql_count,
+            'sql_ms': round(timings.sql_time * 1000, 2),
+            'template_ms': round(timings.template_time * 1000, 2),
+            'crypto_ms': round(timings.crypto_time * 1000, 2),
+            'crypto_calls': timings.crypto_count,
+        }))
+
+        threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 20)
+        for statement, count in timings.statements.items():
+            if count > threshold:
+                logger.warning("Possible N+1 query on %s %s: statement executed %s times: %s",
+                               request.method, request.path, count, ' '.join(statement.split())[:200])
+        return response
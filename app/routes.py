@@ -7,28 +7,32 @@ from app.forms import (
     ShareInvitationForm, SharingSettingsForm, DeleteAccountForm, RegistrationForm
 )
 from app.oauth import generate_google_auth_url, process_google_callback
+from app.data_version import conditional_get
+from app.db_routing import use_primary
+from app.unit_of_work import unit_of_work
+from app.html_policy import DETAILS_TAGS, DETAILS_ATTRIBUTES
+from app.markdown_render import render_markdown
+from app import metrics
+from app import quote_service
 from app.email_service import (
-    send_sharing_invitation, get_invitation_link, is_email_configured,
-    SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_FROM_EMAIL
+    send_sharing_invitation, get_invitation_link, is_email_configured, enqueue_email
 )
 from urllib.parse import urlparse as url_parse
 from datetime import datetime, date, timedelta
 from sqlalchemy import asc, desc, or_
 from functools import wraps
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import random
 import json
-import urllib.request
-import urllib.error
-import smtplib
+import calendar
 import secrets
-import markdown
-from bleach import clean
 from wtforms.csrf.core import CSRF
-import requests
 import logging
 
+logger = logging.getLogger(__name__)
+# Logged on every reminder poll; sampled through LOG_SAMPLE_RATES (see app/log_pipeline.py)
+poll_logger = logging.getLogger('app.reminders.poll')
+
+
 # API Token Authentication Decorator
 def require_api_token(f):
     """Decorator to require API token authentication for API endpoints"""
@@ -48,9 +52,9 @@ def require_api_token(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Allowed HTML tags for sanitized Markdown output
-ALLOWED_TAGS = ['p', 'br', 'strong', 'em', 'u', 'h1', 'h2', 'h3', 'code', 'pre', 'blockquote', 'ul', 'ol', 'li', 'a', 'del', 's']
-ALLOWED_ATTRIBUTES = {'a': ['href', 'title']}
+# Allowed HTML tags for sanitized Markdown output (see app/html_policy.py)
+ALLOWED_TAGS = DETAILS_TAGS
+ALLOWED_ATTRIBUTES = DETAILS_ATTRIBUTES
 
 # CSRF Error Handler - only for web routes
 @app.errorhandler(400)
@@ -73,76 +77,11 @@ def csrf_validation_error(e):
     flash('Session expired. Please login again.', 'warning')
     return redirect(url_for('login'))
 
-# Fallback local quotes (expanded for higher variety)
-LOCAL_QUOTES = [
-    "Stay focused",
-    "Keep it simple",
-    "Progress over perfection",
-    "One step at a time",
-    "You got this",
-    "Be present",
-    "Make it count",
-    "Dream big",
-    "Start now",
-    "Stay curious",
-    "Do better",
-    "Be kind",
-    "Never stop learning",
-    "Create value",
-    "Think different",
-    "Small steps, big gains",
-    "Consistency beats intensity",
-    "Prioritize what matters",
-    "One task at a time",
-    "Momentum starts small",
-    "Plan, then execute",
-    "Trim distractions",
-    "Keep moving forward",
-    "Progress is a process",
-    "Make today count",
-    "Focus on what’s next",
-    "Done is better than perfect",
-    "Clarity drives action",
-    "Build it, then refine it",
-    "Simplify to amplify",
-    "Intent before effort",
-    "Less noise, more work",
-    "Start where you are",
-    "Show up consistently",
-    "Ship, learn, improve",
-    "Think long-term, act today",
-    "Seek momentum, not motivation",
-    "Direction over speed",
-    "Tiny wins, big outcomes",
-    "Focus. Execute. Iterate.",
-]
-
 @app.route('/api/quote')
 @csrf.exempt
 def get_quote():
-    """Return a local quote without external API calls"""
-    import random
-    # Try external API first (ZenQuotes), fall back to LOCAL_QUOTES on any error
-    api_url = 'https://zenquotes.io/api/random'
-    try:
-        response = requests.get(api_url, headers={'User-Agent': 'TodoBox/1.0'}, timeout=3)
-        response.raise_for_status()
-        parsed = response.json()
-        # ZenQuotes returns a list with objects containing 'q' (quote) and 'a' (author)
-        if parsed and type(parsed) == list and len(parsed) > 0:
-            item = parsed[0]
-            if type(item) == dict:
-                quote = item.get('q')
-                author = item.get('a')
-                if quote:
-                    # Include author if present
-                    return jsonify({'quote': quote, 'author': author})
-    except (requests.RequestException, ValueError, TypeError):
-        pass
-
-    # Fallback
-    fallback_quote = random.choice(LOCAL_QUOTES)
-    return jsonify({'quote': fallback_quote})
+    """Return a quote from the background-refreshed pool (see app/quote_service.py)"""
+    return jsonify(quote_service.quotes.get_quote())
 
 @app.route('/manifest.json')
 @csrf.exempt
@@ -202,62 +141,57 @@ def get_manifest():
 
 @app.route('/api/reminders/check', methods=['GET'])
 @login_required
+@metrics.counted(metrics.REMINDER_POLLS)
+@conditional_get('reminders')
 def check_reminders():
     """Check for pending reminders for the current user"""
     from app.reminder_service import ReminderService
-    from app.timezone_utils import convert_to_user_timezone
     
-    reminders = ReminderService.get_pending_reminders(current_user.id)
+    reminders = ReminderService.get_pending_reminders(current_user.id, current_user.data_version)
+    # The response only changes on a data write or when the next reminder falls due
+    next_reminder = ReminderService.get_next_reminder_time(current_user.id)
+    g.etag_valid_until = next_reminder
     
-    reminders_data = []
-    for todo in reminders:
-        # Convert reminder time to user's timezone
-        reminder_time = todo.reminder_time
-        if reminder_time:
-            reminder_time = convert_to_user_timezone(reminder_time, current_user.timezone)
-            reminder_time_str = reminder_time.isoformat() if reminder_time else None
-        else:
-            reminder_time_str = None
-        
-        # Check if this will be the last notification before auto-close
-        notification_count = todo.reminder_notification_count or 0
-        is_last_notification = (notification_count >= 2)  # This will be the 3rd notification
-            
-        reminders_data.append({
-            'todo_id': todo.id,
-            'title': todo.name,
-            'details': todo.details,
-            'reminder_time': reminder_time_str,
-            'notification_count': notification_count,
-            'is_last_notification': is_last_notification
-        })
+    reminders_data = ReminderService.serialize_reminders(reminders, current_user.timezone)
+    # Polling hints: idle users check rarely, imminent reminders are checked at fire time
+    next_check_after = ReminderService.get_poll_interval(next_reminder, bool(reminders_data))
+    poll_logger.info('Reminder poll: %d pending', len(reminders_data),
+                     extra={'user_id': current_user.id, 'next_check_after': next_check_after})
     
     return jsonify({
         'count': len(reminders_data),
-        'reminders': reminders_data
+        'reminders': reminders_data,
+        'next_check_after': next_check_after,
+        'next_reminder_at': calendar.timegm(next_reminder.utctimetuple()) if next_reminder else None
     })
 
+@app.route('/api/reminders/stream', methods=['GET'])
+@login_required
+def stream_reminders():
+    """Push pending reminders to the browser as Server-Sent Events"""
+    from app.reminder_stream import stream_response
+    
+    if not app.config.get('REMINDER_STREAM_ENABLED', False):
+        return jsonify({'error': 'Reminder stream disabled', 'fallback': 'poll'}), 404
+    
+    return stream_response(current_user, request.headers.get('Last-Event-ID'))
+
 @app.route('/api/reminders/process', methods=['POST'])
 @login_required
 def process_reminders():
     """Process and send reminders for the current user"""
     from app.reminder_service import ReminderService
-    from app.timezone_utils import convert_to_user_timezone
+    from app.timezone_utils import convert_many
     
-    reminders = ReminderService.get_pending_reminders(current_user.id)
+    reminders = ReminderService.get_pending_reminders(current_user.id, current_user.data_version)
+    # Reminder times in the user's timezone for display
+    reminder_times = convert_many([todo.reminder_time for todo in reminders], current_user.timezone)
     
     notifications = []
-    for todo in reminders:
+    for todo, reminder_time in zip(reminders, reminder_times):
         # Get current notification count (before incrementing)
         notification_count = (todo.reminder_notification_count or 0) + 1
-        
-        # Convert reminder time to user's timezone for display
-        reminder_time = todo.reminder_time
-        if reminder_time:
-            reminder_time = convert_to_user_timezone(reminder_time, current_user.timezone)
-            reminder_time_str = reminder_time.isoformat() if reminder_time else None
-        else:
-            reminder_time_str = None
+        reminder_time_str = reminder_time.isoformat() if reminder_time else None
         
         # Determine if this is the last notification (3rd notification)
         is_last_notification = (notification_count >= 3)
@@ -281,7 +215,8 @@ def process_reminders():
             'is_last_notification': is_last_notification
         }
         notifications.append(notification)
-        ReminderService.mark_reminder_sent(todo.id)
+    
+    ReminderService.mark_reminders_sent([n['todo_id'] for n in notifications])
     
     return jsonify({
         'count': len(notifications),
@@ -328,6 +263,7 @@ def generate_api_token():
 @app.route('/api/todo', methods=['GET'])
 @csrf.exempt
 @require_api_token
+@conditional_get('api-todo', user_getter=lambda: g.user)
 def get_todos():
     """Get all todos for the authenticated user"""
     user = g.user
@@ -359,6 +295,7 @@ def get_todos():
 @app.route('/api/todo', methods=['POST'])
 @csrf.exempt
 @require_api_token
+@unit_of_work
 def create_todo():
     """Create a new todo for the authenticated user"""
     user = g.user
@@ -374,12 +311,11 @@ def create_todo():
         return jsonify({'error': 'Title cannot be empty'}), 400
     
     # Create todo
-    details_html = clean(markdown.markdown(details, extensions=['fenced_code', 'pymdownx.tilde']), 
-                        tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+    details_html = render_markdown(details)
     
     todo = Todo(name=title, details=details, details_html=details_html, user_id=user.id)
     db.session.add(todo)  # type: ignore[attr-defined]
-    db.session.commit()  # type: ignore[attr-defined]
+    db.session.flush()  # type: ignore[attr-defined]  # Assigns todo.id for the tracker row
     
     # Add tracker entry
     Tracker.add(todo.id, 5, todo.timestamp)  # Status 5 = new
@@ -476,6 +412,7 @@ def get_todo(todo_id):
 @app.route('/api/todo/<int:todo_id>', methods=['PUT'])
 @csrf.exempt
 @require_api_token
+@unit_of_work
 def update_todo(todo_id):
     """Update a todo for the authenticated user"""
     user = g.user
@@ -498,8 +435,7 @@ def update_todo(todo_id):
     if 'details' in data:
         details = data['details'].strip()
         todo.details = details
-        todo.details_html = clean(markdown.markdown(details, extensions=['fenced_code', 'pymdownx.tilde']), 
-                                 tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+        todo.details_html = render_markdown(details)
     
     if 'status' in data:
         status_name = data['status']
@@ -508,8 +444,6 @@ def update_todo(todo_id):
             todo.modified = datetime.now()
             Tracker.add(todo.id, status.id, todo.modified)
     
-    db.session.commit()  # type: ignore[attr-defined]
-    
     # Get current status
     latest_tracker = Tracker.query.filter_by(todo_id=todo.id).order_by(desc(Tracker.timestamp)).first()
     current_status = 'pending'
@@ -567,7 +501,7 @@ def init_default_data():
                 Status.seed()
                 db.session.commit()  # type: ignore[attr-defined]
     except Exception:
-        logging.exception("Failed to initialize default data")
+        logger.exception("Failed to initialize default data")
         # Don't let this crash the app, but log the error
 
 # Initialize data once when app starts
@@ -576,6 +510,7 @@ def init_default_data():
 
 @app.route('/dashboard')
 @login_required
+@conditional_get('dashboard')
 def dashboard():
     def _categorize_todos_by_period(todos, now):
         """Categorize todos by time period and status for dashboard charts"""
@@ -781,7 +716,7 @@ def login():
     except Exception as db_error:
         # If database error occurs, log it but continue to login page
         # Don't assume no users - this could be a connection issue with existing users
-        app.logger.warning(f"Database error checking user count: {str(db_error)}")
+        app.logger.warning("Database error checking user count: %s", db_error)
         # Continue to login page instead of redirecting to setup
     
     if current_user.is_authenticated:
@@ -886,14 +821,14 @@ def register():
                 return redirect(url_for('verification_sent', email=user.email))
             except Exception as e:
                 # If email fails to send, still allow registration but warn user
-                app.logger.error(f'Failed to send verification email to {user.email}: {str(e)}')
+                app.logger.error('Failed to send verification email to %s: %s', user.email, e)
                 flash('Registration successful, but verification email could not be sent. Please contact support.', 'warning')
                 return redirect(url_for('login'))
     
     except Exception as e:
         db.session.rollback()
         error_msg = str(e)
-        app.logger.error(f'Registration error: {error_msg}', exc_info=True)
+        app.logger.error('Registration error: %s', error_msg, exc_info=True)
         
         if 'csrf' in error_msg.lower():
             flash('Session expired. Please try again.', 'warning')
@@ -912,37 +847,33 @@ def register():
     return render_template('register.html', title='Register', form=form, terms_and_disclaimer=terms_and_disclaimer)
 
 @app.route('/verify-email/<token>', methods=['GET'])
+@use_primary
 def verify_email(token):
     """Verify email with token from verification link"""
     from app.verification import VerificationToken
     
     try:
-        # Find user and verify token
-        # Token format: random_urlsafe_part_email_hash
-        # We need to verify the token matches the email
-        
-        # Search for unverified users and check if token is valid for them
-        unverified_users = User.query.filter_by(email_verified=False).all()
-        verified_user = None
-        
-        for user in unverified_users:
-            if VerificationToken.verify_email_token(token, user.email):
-                verified_user = user
-                break
+        # Tokens are stored hashed; one indexed lookup finds the user
+        verified_user = VerificationToken.find_user(token)
         
         if not verified_user:
             flash('Invalid or expired verification link. Please request a new one.', 'error')
             return redirect(url_for('request_verification_email'))
         
-        # Mark email as verified
+        if verified_user.email_verified:
+            flash('Your email is already verified. You can log in.', 'info')
+            return redirect(url_for('login'))
+        
+        # Mark email as verified; the link and any other outstanding links stop working
         verified_user.email_verified = True
+        VerificationToken.consume(verified_user)
         
         # Cancel pending deletion if account was marked for deletion
         if verified_user.pending_deletion:
             verified_user.pending_deletion = False
             verified_user.deletion_requested_at = None
             flash('Email verified successfully! Account deletion cancelled. You can now log in.', 'success')
-            app.logger.info(f'Account deletion cancelled during email verification for: {verified_user.email}')
+            app.logger.info('Account deletion cancelled during email verification for: %s', verified_user.email)
         else:
             flash('Email verified successfully! You can now log in.', 'success')
         
@@ -951,7 +882,7 @@ def verify_email(token):
         return redirect(url_for('login'))
     
     except Exception as e:
-        app.logger.error(f'Email verification error: {str(e)}')
+        app.logger.error('Email verification error: %s', e)
         flash('An error occurred during verification. Please try again.', 'error')
         return redirect(url_for('register'))
 
@@ -990,7 +921,7 @@ def request_verification_email():
             return redirect(url_for('verification_sent', email=user.email))
         
         except Exception as e:
-            app.logger.error(f'Error resending verification email: {str(e)}')
+            app.logger.error('Error resending verification email: %s', e)
             flash('Failed to resend verification email. Please try again.', 'error')
     
     email = request.args.get('email', '')
@@ -1031,7 +962,7 @@ def email_exists():
                 return redirect(url_for('verification_sent', email=user.email))
             
             except Exception as e:
-                app.logger.error(f'Error resending verification email: {str(e)}')
+                app.logger.error('Error resending verification email: %s', e)
                 flash('Failed to resend verification email. Please try again.', 'error')
         
         elif action == 'delete':
@@ -1043,11 +974,11 @@ def email_exists():
                 db.session.commit()
                 
                 flash('Your account has been marked for deletion. It will be permanently removed in 1 hour. You can cancel this by verifying your email.', 'warning')
-                app.logger.info(f'Account deletion requested for: {email}')
+                app.logger.info('Account deletion requested for: %s', email)
                 return redirect(url_for('login'))
             
             except Exception as e:
-                app.logger.error(f'Error requesting account deletion: {str(e)}')
+                app.logger.error('Error requesting account deletion: %s', e)
                 flash('Failed to process deletion request. Please try again.', 'error')
     
     return render_template('email_exists.html', email=email, is_verified=user.email_verified)
@@ -1073,14 +1004,14 @@ def cancel_deletion(email):
             user.deletion_requested_at = None
             db.session.commit()
             flash('Account deletion cancelled! You can now log in.', 'success')
-            app.logger.info(f'Account deletion cancelled for: {email}')
+            app.logger.info('Account deletion cancelled for: %s', email)
             return redirect(url_for('login'))
         else:
             flash('Please verify your email first to cancel deletion.', 'warning')
             return redirect(url_for('email_exists', email=email))
     
     except Exception as e:
-        app.logger.error(f'Error cancelling deletion: {str(e)}')
+        app.logger.error('Error cancelling deletion: %s', e)
         flash('Failed to cancel deletion. Please try again.', 'error')
         return redirect(url_for('email_exists', email=email))
 
@@ -1132,7 +1063,7 @@ def accept_terms_oauth():
                           user_email=user.email)
 
 def send_verification_email(user: User, token: str) -> None:
-    """Send email verification link to user"""
+    """Queue the email verification link for the outbox worker"""
     try:
         verification_link = url_for('verify_email', token=token, _external=True)
         
@@ -1195,61 +1126,15 @@ TodoBox Team"""
 </html>
         """
         
-        # Create email message with proper headers to avoid spam
-        msg = MIMEMultipart('alternative')
-        
-        # Critical headers for deliverability
-        msg['Subject'] = 'Verify Your TodoBox Email Address'
-        msg['From'] = SMTP_FROM_EMAIL
-        msg['To'] = user.email
-        msg['Reply-To'] = SMTP_FROM_EMAIL
-        msg['X-Priority'] = '3'  # Normal priority
-        msg['X-Mailer'] = 'TodoBox/1.0'
-        msg['Importance'] = 'high'
-        msg['X-MSMail-Priority'] = 'Normal'
-        
-        # Add List-Unsubscribe header (optional but helps deliverability)
-        # This is mainly for marketing emails, but helps with legitimacy
-        msg['List-Unsubscribe-Post'] = 'List-Unsubscribe=One-Click'
-        
-        # Add Content headers for better formatting
-        msg['MIME-Version'] = '1.0'
-        msg['Content-Type'] = 'multipart/alternative'
-        
-        part1 = MIMEText(text_content, 'plain', 'utf-8')
-        part2 = MIMEText(html_content, 'html', 'utf-8')
-        
-        # Attach in correct order (plain text first, HTML second)
-        msg.attach(part1)
-        msg.attach(part2)
-        
-        # Send email with proper SMTP settings
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            # Set proper timeout
-            server.timeout = 10
-            
-            # Enable security only if not using localhost (e.g., MailHog for development)
-            # MailHog doesn't support STARTTLS, so skip it for local development
-            if SMTP_SERVER not in ['localhost', '127.0.0.1']:
-                try:
-                    server.starttls()
-                except smtplib.SMTPNotSupportedError:
-                    app.logger.warning(f'STARTTLS not supported by {SMTP_SERVER}, proceeding without encryption')
-            
-            # Login if credentials provided
-            if SMTP_USERNAME and SMTP_PASSWORD:
-                server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            
-            # Send with proper sender info
-            server.sendmail(SMTP_FROM_EMAIL, [user.email], msg.as_string())
-            
-            app.logger.info(f'Verification email sent successfully to {user.email}')
-    
-    except smtplib.SMTPException as e:
-        app.logger.error(f'SMTP Error sending verification email to {user.email}: {str(e)}', exc_info=True)
-        raise
+        # Queue for the outbox worker; Reply-To and X-Mailer headers are added on delivery
+        enqueue_email(user.email, 'Verify Your TodoBox Email Address', text_content, html_content,
+                      kind='verification', user_id=user.id)
+        db.session.commit()  # type: ignore[attr-defined]
+        app.logger.info('Verification email queued for %s', user.email)
+    
     except Exception as e:
-        app.logger.error(f'Error sending verification email to {user.email}: {str(e)}', exc_info=True)
+        db.session.rollback()  # type: ignore[attr-defined]
+        app.logger.error('Error queueing verification email to %s: %s', user.email, e, exc_info=True)
         raise
 
 @app.route('/setup')
@@ -1336,7 +1221,7 @@ def setup_account():
             return redirect(url_for('setup_account'))
         else:
             flash('An error occurred while creating your account. Please try again.', 'danger')
-            app.logger.error(f"Account creation error: {error_msg}")
+            app.logger.error("Account creation error: %s", error_msg)
     
     return render_template('setup_account.html', title='Create Account', form=form, db_error=db_error)
 
@@ -1412,11 +1297,12 @@ def oauth_login_google():
         auth_url = generate_google_auth_url()
         return redirect(auth_url)
     except Exception as e:
-        app.logger.error(f"Error generating Google OAuth URL: {str(e)}")
+        app.logger.error("Error generating Google OAuth URL: %s", e)
         flash('Google OAuth is not properly configured. Please try password login instead.', 'danger')
         return redirect(url_for('login'))
 
 @app.route('/auth/callback/google')
+@use_primary
 def oauth_callback_google():
     """Handle Google OAuth callback"""
     code = request.args.get("code")
@@ -1600,12 +1486,7 @@ def delete_account():
         code = str(secrets.randbelow(1000000)).zfill(6)
         session['delete_account_code'] = code
         
-        # Prepare and send nicely formatted HTML email with verification code
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = '🔐 TodoBox Account Deletion Verification Code'
-        msg['From'] = SMTP_FROM_EMAIL
-        msg['To'] = current_user.email
-        
+        # Prepare a nicely formatted HTML email with verification code
         # Create plain text version
         text_content = f'''TodoBox Account Deletion Request
 
@@ -1672,33 +1553,21 @@ TodoBox Team'''
 </body>
 </html>'''
         
-        # Attach both versions
-        part1 = MIMEText(text_content, 'plain')
-        part2 = MIMEText(html_content, 'html')
-        msg.attach(part1)
-        msg.attach(part2)
-        
         try:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                # Enable security only if not using localhost (e.g., MailHog for development)
-                # MailHog doesn't support STARTTLS, so skip it for local development
-                if SMTP_USERNAME and SMTP_PASSWORD:
-                    if SMTP_SERVER not in ['localhost', '127.0.0.1']:
-                        try:
-                            server.starttls()
-                        except smtplib.SMTPNotSupportedError:
-                            app.logger.warning(f'STARTTLS not supported by {SMTP_SERVER}, proceeding without encryption')
-                    server.login(SMTP_USERNAME, SMTP_PASSWORD)
-                server.sendmail(SMTP_FROM_EMAIL, [current_user.email], msg.as_string())
+            enqueue_email(current_user.email, '🔐 TodoBox Account Deletion Verification Code',
+                          text_content, html_content, kind='account_deletion', user_id=current_user.id)
+            db.session.commit()  # type: ignore[attr-defined]
             flash(f'A verification code has been sent to {current_user.email}. Check your inbox and enter it below to confirm account deletion.', 'info')
         except Exception as e:
+            db.session.rollback()  # type: ignore[attr-defined]
             flash('Failed to send email. Please contact support.', 'error')
-            logging.error(f'Email error during account deletion: {str(e)}')
+            logger.error('Email error during account deletion: %s', e)
         
         return redirect(url_for('account'))
 
 @app.route('/undone')
 @login_required
+@conditional_get('undone')
 def undone():
     """Show all uncompleted todos EXCLUDING today and tomorrow (those are in pending view)"""
     # Get todos that are:
@@ -1745,13 +1614,13 @@ def undone():
 
 @app.route('/<path:todo_id>/done', methods=['POST'])
 @login_required
+@unit_of_work
 def mark_done(todo_id):
     """Mark a todo as done from any page"""
     todo = Todo.query.filter_by(id=todo_id, user_id=current_user.id).first()
     if todo:
         date_entry = datetime.now()
         todo.modified = date_entry
-        db.session.commit()  # type: ignore[attr-defined]
         Tracker.add(todo.id, 6, date_entry)  # Status 6 = Done
 
         return jsonify({
@@ -1766,13 +1635,13 @@ def mark_done(todo_id):
 
 @app.route('/<path:todo_id>/kiv', methods=['POST'])
 @login_required
+@unit_of_work
 def mark_kiv(todo_id):
     """Mark a todo as kiv from any page"""
     todo = Todo.query.filter_by(id=todo_id, user_id=current_user.id).first()
     if todo:
         date_entry = datetime.now()
         todo.modified = date_entry
-        db.session.commit()  # type: ignore[attr-defined]
         
         # Add to KIV table (source of truth for KIV status)
         KIV.add(todo.id, current_user.id)
@@ -1819,6 +1688,7 @@ def view(todo):
 
 @app.route('/<path:todo_id>/delete', methods=['POST'])
 @login_required
+@unit_of_work
 def delete(todo_id):
     # Verify todo belongs to current user before deleting
     todo = Todo.query.filter_by(id=todo_id, user_id=current_user.id).first()
@@ -1831,10 +1701,11 @@ def delete(todo_id):
 
 @app.route('/add', methods=['POST'])
 @login_required
+@unit_of_work
 def add():
     if request.method == "POST":
         # DEBUG: Log all form data received
-        logging.debug(f"[REMINDER DEBUG] Form data received: {dict(request.form)}")
+        logger.debug("[REMINDER DEBUG] Form data received: %s", request.form)
         
         # Input validation and sanitization
         from html import escape
@@ -1846,8 +1717,7 @@ def add():
             getTitle = getTitle[:255]
         if len(getActivities) > 10000:
             getActivities = getActivities[:10000]
-        getActivities_html = clean(markdown.markdown(getActivities, extensions=['fenced_code', 'pymdownx.tilde']), 
-                                   tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+        getActivities_html = render_markdown(getActivities)
         
         # Handle new schedule_day parameter
         schedule_day = request.form.get("schedule_day", "today")
@@ -1861,12 +1731,12 @@ def add():
         reminder_before_unit = request.form.get("reminder_before_unit")
         
         # DEBUG: Log reminder data parsing
-        logging.debug(f"[REMINDER DEBUG] Parsed reminder data:")
-        logging.debug(f"  - reminder_enabled: {reminder_enabled} (raw: '{request.form.get('reminder_enabled')}')")
-        logging.debug(f"  - reminder_type: {reminder_type}")
-        logging.debug(f"  - reminder_datetime: {reminder_datetime}")
-        logging.debug(f"  - reminder_before_minutes: {reminder_before_minutes}")
-        logging.debug(f"  - reminder_before_unit: {reminder_before_unit}")
+        logger.debug("[REMINDER DEBUG] Parsed reminder data:")
+        logger.debug("  - reminder_enabled: %s (raw: '%s')", reminder_enabled, request.form.get('reminder_enabled'))
+        logger.debug("  - reminder_type: %s", reminder_type)
+        logger.debug("  - reminder_datetime: %s", reminder_datetime)
+        logger.debug("  - reminder_before_minutes: %s", reminder_before_minutes)
+        logger.debug("  - reminder_before_unit: %s", reminder_before_unit)
         
         # Calculate target date based on schedule selection
         if schedule_day == "tomorrow":
@@ -1930,7 +1800,7 @@ def add():
                         t.reminder_notification_count = 0
                         t.reminder_first_notification_time = None
                     except ValueError as e:
-                        logging.debug(f"Invalid reminder datetime format: {reminder_datetime} - {str(e)}")
+                        logger.debug("Invalid reminder datetime format: %s - %s", reminder_datetime, e)
                 elif reminder_type == "before" and reminder_before_minutes and reminder_before_unit:
                     try:
                         minutes = int(reminder_before_minutes)
@@ -1951,9 +1821,9 @@ def add():
                         t.reminder_notification_count = 0
                         t.reminder_first_notification_time = None
                     except (ValueError, TypeError):
-                        logging.debug("Invalid reminder before parameters")
+                        logger.debug("Invalid reminder before parameters")
 
-            db.session.commit()  # type: ignore[attr-defined]
+            db.session.flush()  # type: ignore[attr-defined]  # Assigns t.id for the tracker row
             
             # Add tracker entry with appropriate date
             if schedule_day == "today" and getTomorrow == 0:
@@ -1978,19 +1848,19 @@ def add():
 
             # Handle reminder updates
             if reminder_enabled and reminder_type:
-                logging.debug(f"[REMINDER DEBUG] Processing reminder update for todo {todo_id}")
-                logging.debug(f"  - reminder_enabled: {reminder_enabled}")
-                logging.debug(f"  - reminder_type: {reminder_type}")
+                logger.debug("[REMINDER DEBUG] Processing reminder update for todo %s", todo_id)
+                logger.debug("  - reminder_enabled: %s", reminder_enabled)
+                logger.debug("  - reminder_type: %s", reminder_type)
                 
                 if reminder_type == "custom" and reminder_datetime:
                     try:
-                        logging.debug(f"  - Processing custom reminder_datetime: {reminder_datetime}")
+                        logger.debug("  - Processing custom reminder_datetime: %s", reminder_datetime)
                         from app.timezone_utils import convert_from_user_timezone
                         reminder_dt = datetime.fromisoformat(reminder_datetime)
-                        logging.debug(f"  - Parsed datetime: {reminder_dt}")
+                        logger.debug("  - Parsed datetime: %s", reminder_dt)
                         # Convert from user's timezone to UTC
                         reminder_dt_utc = convert_from_user_timezone(reminder_dt, current_user.timezone)
-                        logging.debug(f"  - Converted to UTC: {reminder_dt_utc}")
+                        logger.debug("  - Converted to UTC: %s", reminder_dt_utc)
                         
                         # Store old values for comparison
                         old_time = t.reminder_time
@@ -2003,12 +1873,12 @@ def add():
                         t.reminder_notification_count = 0
                         t.reminder_first_notification_time = None
                         
-                        logging.debug(f"  - Updated reminder_time: {old_time} -> {reminder_dt_utc}")
-                        logging.debug(f"  - Updated reminder_enabled: {old_enabled} -> True")
-                        logging.debug(f"  - Reset reminder tracking fields")
+                        logger.debug("  - Updated reminder_time: %s -> %s", old_time, reminder_dt_utc)
+                        logger.debug("  - Updated reminder_enabled: %s -> True", old_enabled)
+                        logger.debug("  - Reset reminder tracking fields")
                         
                     except ValueError as e:
-                        logging.debug(f"Failed to parse reminder datetime: {reminder_datetime} - {str(e)}")
+                        logger.debug("Failed to parse reminder datetime: %s - %s", reminder_datetime, e)
                 elif reminder_type == "before" and reminder_before_minutes and reminder_before_unit:
                     try:
                         minutes = int(reminder_before_minutes)
@@ -2028,7 +1898,7 @@ def add():
                         t.reminder_notification_count = 0
                         t.reminder_first_notification_time = None
                     except (ValueError, TypeError):
-                        logging.debug("Failed to parse reminder before parameters")
+                        logger.debug("Failed to parse reminder before parameters")
             else:
                 # Clear reminder if disabled
                 t.reminder_enabled = False
@@ -2041,7 +1911,6 @@ def add():
                 if schedule_day != "today" or getTomorrow == '1':
                     # For tomorrow or custom date, use target_date
                     t.modified = target_date
-                    db.session.commit()  # type: ignore[attr-defined]
                     
                     # Check if todo is currently KIV and exit it since it's being scheduled
                     if KIV.is_kiv(todo_id):
@@ -2060,10 +1929,8 @@ def add():
                             'exitedKIV': False
                         }), 200
                 elif byPass == '1':
-                    logging.debug(f"[REMINDER DEBUG] Taking byPass path for todo {todo_id}")
+                    logger.debug("[REMINDER DEBUG] Taking byPass path for todo %s", todo_id)
                     t.modified = datetime.now()
-                    db.session.commit()  # type: ignore[attr-defined]
-                    logging.debug(f"[REMINDER DEBUG] byPass commit successful for todo {todo_id}")
                 else:
                     # When scheduling to today and title/content didn't change,
                     # check if we need to exit KIV status
@@ -2071,9 +1938,8 @@ def add():
                     
                     # Check if todo's current date is different from today or if it's KIV
                     if t.modified.date() != datetime.now().date():
-                        logging.debug(f"[REMINDER DEBUG] Date mismatch path for todo {todo_id}")
+                        logger.debug("[REMINDER DEBUG] Date mismatch path for todo %s", todo_id)
                         t.modified = datetime.now()
-                        db.session.commit()  # type: ignore[attr-defined]
                         
                         # Check if we should exit KIV when rescheduling to today
                         if KIV.is_kiv(todo_id):
@@ -2093,9 +1959,8 @@ def add():
                         # Same date - check if it's KIV and needs to exit
                         if KIV.is_kiv(todo_id):
                             # This is a KIV todo being moved to today - exit KIV status
-                            logging.debug(f"[REMINDER DEBUG] Exiting KIV status for todo {todo_id} when scheduling to today")
+                            logger.debug("[REMINDER DEBUG] Exiting KIV status for todo %s when scheduling to today", todo_id)
                             t.modified = datetime.now()
-                            db.session.commit()  # type: ignore[attr-defined]
                             KIV.remove(todo_id)
                             Tracker.add(todo_id, 5, datetime.now())  # Exit KIV with status 5 (new)
                             return jsonify({
@@ -2103,10 +1968,8 @@ def add():
                                 'exitedKIV': True
                             }), 200
                         else:
-                            # Even if title/content didn't change, we still need to save reminder changes
-                            logging.debug(f"[REMINDER DEBUG] Same date path for todo {todo_id} - committing reminder changes")
-                            db.session.commit()  # type: ignore[attr-defined]
-                            logging.debug(f"[REMINDER DEBUG] Reminder-only commit successful, returning success")
+                            # Even if title/content didn't change, the reminder changes are saved with the request
+                            logger.debug("[REMINDER DEBUG] Same date path for todo %s - saving reminder changes", todo_id)
                             return jsonify({
                                 'status': 'success',
                                 'exitedKIV': False
@@ -2118,7 +1981,6 @@ def add():
                 if schedule_day != "today" or getTomorrow == '1':
                     # For tomorrow or custom date, use target_date
                     t.modified = target_date
-                    db.session.commit()  # type: ignore[attr-defined]
                     
                     # Check if todo is currently KIV and exit it since it's being scheduled
                     if KIV.is_kiv(todo_id):
@@ -2138,7 +2000,6 @@ def add():
                         }), 200
                 else:
                     t.modified = datetime.now()
-                    db.session.commit()  # type: ignore[attr-defined]
                     Tracker.add(todo_id, 5, datetime.now())  # Status 5 = new
                     
                     return jsonify({
@@ -2215,6 +2076,7 @@ def getTodo(id):
 
 @app.route('/<path:id>/list')
 @login_required
+@conditional_get('list')
 def list(id):
    
     if id == 'today':
@@ -2232,6 +2094,7 @@ def list(id):
 
 @app.route('/<path:id>/<path:todo_id>/done', methods=['POST'])
 @login_required
+@unit_of_work
 def done(id, todo_id):
     # Filter by user_id to ensure user can only mark their own todos as done
     todo = Todo.query.filter_by(id=todo_id, user_id=current_user.id).first()
@@ -2260,6 +2123,7 @@ def done(id, todo_id):
 
 @app.route('/<path:id>/<path:todo_id>/kiv', methods=['POST'])
 @login_required
+@unit_of_work
 def kiv(id, todo_id):
     # Filter by user_id to ensure user can only mark their own todos as kiv
     todo = Todo.query.filter_by(id=todo_id, user_id=current_user.id).first()
@@ -2471,6 +2335,7 @@ def sharing():
 
 
 @app.route('/share/accept/<token>')
+@use_primary
 def accept_share_invitation(token):
     """Accept a sharing invitation"""
     invitation = ShareInvitation.get_by_token(token)
@@ -2540,6 +2405,7 @@ def accept_share_invitation(token):
 
 
 @app.route('/share/decline/<token>')
+@use_primary
 def decline_share_invitation(token):
     """Decline a sharing invitation"""
     invitation = ShareInvitation.get_by_token(token)
@@ -2660,6 +2526,29 @@ def shared_todos():
 
 # ==================== Admin Routes ====================
 
+def _is_metrics_token(token):
+    """Accept the configured METRICS_TOKEN or an admin user's API token"""
+    expected = app.config.get('METRICS_TOKEN')
+    if expected and secrets.compare_digest(token, expected):
+        return True
+    user = User.get_user_by_api_token(token)
+    return bool(user and user.is_system_admin() and not user.is_blocked)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of application metrics (admin token required)"""
+    auth_header = request.headers.get('Authorization', '')
+    token = auth_header[7:].strip() if auth_header.startswith('Bearer ') else ''
+    if not token or not _is_metrics_token(token):
+        return jsonify({'error': 'Missing or invalid metrics token'}), 401
+
+    metrics.flush()
+    response = make_response(metrics.render_text())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
+
 def require_admin(f):
     """Decorator to require admin privileges for a route"""
     @wraps(f)
@@ -2956,6 +2845,83 @@ def admin_cleanup_expired_blocks():
     flash(f'Cleaned up {count} expired cooldown records.', 'success')
     return redirect(url_for('admin_blocked_accounts'))
 
+# ==================== Request Profiler Routes ====================
+
+@app.route('/admin/profiler')
+@login_required
+@require_admin
+def admin_profiler():
+    """Arm the request profiler and list captured profiles"""
+    from app import profiler
+    
+    return render_template('admin/profiler.html',
+                          title='Request Profiler',
+                          arm_state=profiler.get_arm_state(app),
+                          profiles=profiler.list_profiles(app),
+                          max_count=app.config.get('PROFILER_MAX_REQUESTS', 50))
+
+
+@app.route('/admin/profiler/arm', methods=['POST'])
+@login_required
+@require_admin
+def admin_profiler_arm():
+    """Profile the next N requests matching a path prefix and/or user"""
+    from app import profiler
+    
+    max_count = app.config.get('PROFILER_MAX_REQUESTS', 50)
+    try:
+        count = int(request.form.get('count', 5))
+    except ValueError:
+        count = 0
+    if count < 1 or count > max_count:
+        flash(f'Number of requests must be between 1 and {max_count}.', 'error')
+        return redirect(url_for('admin_profiler'))
+    
+    path_prefix = request.form.get('path_prefix', '').strip()
+    user_email = request.form.get('user_email', '').strip()
+    profiler.arm(app, count, path_prefix=path_prefix, user_email=user_email)
+    logger.info('Admin %s armed profiler: count=%s path=%r user=%r', current_user.email, count, path_prefix, user_email)
+    flash(f'Profiler armed for the next {count} matching request(s).', 'success')
+    return redirect(url_for('admin_profiler'))
+
+
+@app.route('/admin/profiler/disarm', methods=['POST'])
+@login_required
+@require_admin
+def admin_profiler_disarm():
+    """Stop profiling requests"""
+    from app import profiler
+    
+    profiler.disarm(app)
+    flash('Profiler disarmed.', 'success')
+    return redirect(url_for('admin_profiler'))
+
+
+@app.route('/admin/profiler/clear', methods=['POST'])
+@login_required
+@require_admin
+def admin_profiler_clear():
+    """Delete all captured profiles"""
+    from app import profiler
+    
+    removed = profiler.clear_profiles(app)
+    flash(f'Deleted {removed} profile file(s).', 'success')
+    return redirect(url_for('admin_profiler'))
+
+
+@app.route('/admin/profiler/<path:filename>')
+@login_required
+@require_admin
+def admin_profiler_download(filename):
+    """Download a captured profile (.prof) or view its summary (.txt)"""
+    from app import profiler
+    
+    if not profiler.is_profile_name(filename):
+        abort(404)
+    return send_from_directory(profiler.profile_dir(app), filename,
+                               as_attachment=filename.endswith('.prof'),
+                               mimetype='text/plain' if filename.endswith('.txt') else 'application/octet-stream')
+
 # ==================== Terms and Disclaimer Routes ====================
 
 @app.route('/admin/terms', methods=['GET', 'POST'])
@@ -2999,7 +2965,7 @@ def admin_manage_terms():
         
         except Exception as e:
             db.session.rollback()  # type: ignore[attr-defined]
-            app.logger.error(f'Error updating terms: {str(e)}', exc_info=True)
+            app.logger.error('Error updating terms: %s', e, exc_info=True)
             flash(f'Error updating terms: {str(e)}', 'error')
     
     # Get all versions for history
@@ -3096,11 +3062,11 @@ def backup_todos():
             response.headers['Content-Disposition'] = f'attachment; filename={filename}'
             response.headers['Content-Type'] = 'application/json; charset=utf-8'
         
-        app.logger.info(f'Backup created for user {current_user.email}: {len(todos)} todos ({backup_format.upper()} format)')
+        app.logger.info('Backup created for user %s: %s todos (%s format)', current_user.email, len(todos), backup_format.upper())
         
         return response
     
     except Exception as e:
-        app.logger.error(f'Error creating backup for user {current_user.email}: {str(e)}', exc_info=True)
+        app.logger.error('Error creating backup for user %s: %s', current_user.email, e, exc_info=True)
         flash('Error creating backup. Please try again later.', 'error')
         return redirect(url_for('dashboard'))
\ No newline at end of file
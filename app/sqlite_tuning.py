@@ -0,0 +1,138 @@
+"""
+SQLite production profile.
+
+Every new SQLite connection gets the SQLITE_* pragmas:
+- WAL journal: readers and the single writer no longer block each other.
+- synchronous=NORMAL: fsync at checkpoints rather than on every commit. This
+  is still safe against corruption in WAL mode.
+- busy_timeout: a writer waits for the lock instead of failing with
+  "database is locked".
+- Larger page cache, memory-mapped reads and in-memory temp tables.
+
+Writes are serialized by SQLite's own write lock. pysqlite only issues BEGIN
+just before the first INSERT/UPDATE/DELETE, so the lock is held for the
+write part of a request only. Waits shorter than busy_timeout queue instead
+of raising.
+
+A daemon thread runs ``PRAGMA wal_checkpoint`` and ``PRAGMA optimize`` every
+SQLITE_MAINTENANCE_INTERVAL seconds, so the WAL file does not keep growing
+while readers are busy. ``flask sqlite-maintenance`` runs the same job once.
+"""
+
+import logging
+import threading
+
+from sqlalchemy import event, text
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+_KEYWORDS = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA'},
+    'temp_store': {'DEFAULT', 'FILE', 'MEMORY'},
+}
+CHECKPOINT_MODES = {'PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'}
+
+
+def pragmas_from_config(config):
+    """Ordered (pragma, value) pairs from SQLITE_* settings; raises ValueError on bad values"""
+    pragmas = [
+        ('journal_mode', str(config.get('SQLITE_JOURNAL_MODE', 'WAL')).upper()),
+        ('synchronous', str(config.get('SQLITE_SYNCHRONOUS', 'NORMAL')).upper()),
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT', 5000))),
+        ('cache_size', int(config.get('SQLITE_CACHE_SIZE', -16000))),
+        ('mmap_size', int(config.get('SQLITE_MMAP_SIZE', 134217728))),
+        ('temp_store', str(config.get('SQLITE_TEMP_STORE', 'MEMORY')).upper()),
+    ]
+    for name, value in pragmas:
+        if name in _KEYWORDS and value not in _KEYWORDS[name]:
+            raise ValueError(f'Invalid SQLITE_{name.upper()}: {value}')
+    return pragmas
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Run the pragmas on a raw sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def checkpoint(engine, mode='TRUNCATE'):
+    """
+    Checkpoint the WAL and refresh query planner statistics
+
+    Returns SQLite's (busy, wal_pages, checkpointed_pages) for the checkpoint;
+    busy is 1 when readers kept it from finishing, which the next run retries.
+    """
+    mode = mode.upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f'Invalid checkpoint mode: {mode}')
+    with metrics.track_job('sqlite_maintenance'):
+        with engine.connect() as connection:
+            result = tuple(connection.execute(text(f'PRAGMA wal_checkpoint({mode})')).one())
+            connection.execute(text('PRAGMA optimize'))
+            connection.commit()
+    if result[0]:
+        logger.info("WAL checkpoint incomplete, readers busy (%s/%s pages)", result[2], result[1])
+    return result
+
+
+class MaintenanceThread:
+    """Runs checkpoint() on an interval"""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, engine, interval, mode='TRUNCATE'):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(engine, interval, mode),
+                                        name='sqlite-maintenance', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, engine, interval, mode):
+        while not self._stop.wait(interval):
+            try:
+                checkpoint(engine, mode)
+            except Exception as e:
+                logger.warning("SQLite maintenance failed: %s", e)
+
+
+maintenance = MaintenanceThread()
+
+
+def init_app(app, db):
+    """Apply the pragmas to every SQLite connection and schedule WAL maintenance"""
+    if not app.config.get('SQLITE_TUNING_ENABLED', True):
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.url.drivername != 'sqlite':
+        return
+
+    pragmas = pragmas_from_config(app.config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+    interval = float(app.config.get('SQLITE_MAINTENANCE_INTERVAL', 600))
+    mode = app.config.get('SQLITE_CHECKPOINT_MODE', 'TRUNCATE')
+    started = []
+
+    @app.before_request
+    def start_sqlite_maintenance():
+        if started or not interval or app.testing:
+            return
+        started.append(True)
+        maintenance.start(engine, interval, mode)
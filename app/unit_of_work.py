@@ -0,0 +1,50 @@
+"""
+Request-scoped unit of work.
+
+Views decorated with ``@unit_of_work`` commit once, after the view returns,
+and roll back if it raises. The model helpers (``Tracker.add``, ``KIV.add``,
+``Todo.set_reminder`` ...) call :func:`commit` instead of
+``db.session.commit()``: inside a unit of work that only stages the change,
+so a todo update that touches the todo, its tracker history and KIV row is
+written in a single transaction. Outside one (CLI commands, background jobs,
+scripts) :func:`commit` commits straight away as the helpers always did.
+"""
+
+from functools import wraps
+
+from flask import g, has_app_context
+
+from app import db
+
+_ACTIVE_KEY = '_unit_of_work'
+
+
+def active():
+    """True while a ``@unit_of_work`` view is running"""
+    return has_app_context() and g.get(_ACTIVE_KEY, False)
+
+
+def commit():
+    """Commit now, or leave the staged changes to the enclosing unit of work"""
+    if active():
+        return
+    db.session.commit()  # type: ignore[attr-defined]
+
+
+def unit_of_work(view):
+    """Commit the view's changes once when it returns, roll back if it raises"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if active():
+            return view(*args, **kwargs)
+        setattr(g, _ACTIVE_KEY, True)
+        try:
+            response = view(*args, **kwargs)
+            db.session.commit()  # type: ignore[attr-defined]
+            return response
+        except BaseException:
+            db.session.rollback()  # type: ignore[attr-defined]
+            raise
+        finally:
+            g.pop(_ACTIVE_KEY, None)
+    return wrapper
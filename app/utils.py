@@ -1,136 +1,241 @@
-#from jinja2 import Markup
-# from markupsafe import Markup
+"""
+Server-side date formatting for templates.
+
+The ``calendar``, ``fromnow`` and ``fmt`` Jinja filters format datetimes.
+Everything that is the same for every row of a page ("now", today and
+tomorrow) is worked out once per request in a :class:`DateContext`, and
+moment.js style format strings are translated once per process, so
+rendering a long list only pays for the ``strftime`` calls.
+
+Naive datetimes are stored in server local time (``datetime.now()``) and are
+shown as stored, so "Today" and "Tomorrow" match the server-date buckets the
+list routes use; aware ones are converted to server local time. Strings are
+parsed as ISO 8601 or ``%Y-%m-%d %H:%M:%S``.
+
+    {{ todo.modified|calendar }}          Today at 09:30 AM
+    {{ todo.modified|fromnow }}           2 hours ago
+    {{ todo.timestamp|fmt('MMM D') }}     Dec 05
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from flask import g, has_request_context
+
+# Formats the templates used before token translation; kept verbatim for identical output
+FORMAT_MAP = {
+    'MMMM Do, YYYY': '%B %d, %Y',  # December 05, 2025
+    'MMMM Do': '%B %d',             # December 05
+    'MMM D': '%b %d',               # Dec 05
+    'YYYY-MM-DD': '%Y-%m-%d',
+    'DD/MM/YYYY': '%d/%m/%Y',
+    'MM/DD/YYYY': '%m/%d/%Y',
+}
+
+# moment.js tokens with a strftime equivalent
+_STRFTIME_TOKENS = {
+    'YYYY': '%Y', 'YY': '%y', 'MMMM': '%B', 'MMM': '%b', 'MM': '%m', 'DD': '%d',
+    'dddd': '%A', 'ddd': '%a', 'HH': '%H', 'hh': '%I', 'mm': '%M', 'ss': '%S', 'A': '%p',
+}
+
+
+def _ordinal(day):
+    if 10 <= day % 100 <= 20:
+        return f'{day}th'
+    return f"{day}{ {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')}"
+
+
+# moment.js tokens strftime cannot produce (unpadded numbers, ordinals, lower-case am/pm)
+_COMPUTED_TOKENS = {
+    'Do': lambda dt: _ordinal(dt.day),
+    'D': lambda dt: str(dt.day),
+    'M': lambda dt: str(dt.month),
+    'H': lambda dt: str(dt.hour),
+    'h': lambda dt: str(dt.hour % 12 or 12),
+    'm': lambda dt: str(dt.minute),
+    's': lambda dt: str(dt.second),
+    'a': lambda dt: 'am' if dt.hour < 12 else 'pm',
+}
+
+_TOKEN_RE = re.compile(r'\[[^\]]*\]|YYYY|YY|MMMM|MMM|MM|Do|DD|dddd|ddd|HH|hh|mm|ss|[MDHhmsAa]')
+
+
+@lru_cache(maxsize=256)
+def compile_format(fmt):
+    """
+    Translate a moment.js format string into a function of a datetime.
+
+    Strings containing ``%`` are taken to be strftime formats already.
+    Text in ``[brackets]`` is copied literally, as in moment.js.
+    """
+    if fmt in FORMAT_MAP or '%' in fmt:
+        pattern = FORMAT_MAP.get(fmt, fmt)
+        return lambda dt: dt.strftime(pattern)
+
+    parts = []  # strftime patterns and callables, in order
+    pattern = ''
+    position = 0
+    for match in _TOKEN_RE.finditer(fmt):
+        pattern += fmt[position:match.start()].replace('%', '%%')
+        token = match.group()
+        if token.startswith('['):
+            pattern += token[1:-1].replace('%', '%%')
+        elif token in _STRFTIME_TOKENS:
+            pattern += _STRFTIME_TOKENS[token]
+        else:
+            if pattern:
+                parts.append(pattern)
+                pattern = ''
+            parts.append(_COMPUTED_TOKENS[token])
+        position = match.end()
+    pattern += fmt[position:].replace('%', '%%')
+    if pattern:
+        parts.append(pattern)
+
+    if len(parts) == 1 and isinstance(parts[0], str):
+        only = parts[0]
+        return lambda dt: dt.strftime(only)
+    parts = [part if callable(part) else (lambda dt, p=part: dt.strftime(p)) for part in parts]
+    return lambda dt: ''.join(part(dt) for part in parts)
+
+
+class DateContext:
+    """Per-request values shared by every formatted date on a page"""
+
+    __slots__ = ('now', 'today', 'tomorrow')
+
+    def __init__(self, now=None):
+        self.now = now or datetime.now()
+        self.today = self.now.date()
+        self.tomorrow = self.today + timedelta(days=1)
+
+    def localize(self, dt):
+        """Return ``dt`` as naive server local time (naive values already are)"""
+        if dt.tzinfo is not None:
+            return dt.astimezone().replace(tzinfo=None)
+        return dt
+
+
+def date_context():
+    """The current request's DateContext, built on first use"""
+    if not has_request_context():
+        return DateContext()
+    context = g.get('_date_context')
+    if context is None:
+        context = g._date_context = DateContext()
+    return context
+
+
+def _to_datetime(value):
+    if value.__class__ is datetime:
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except (ValueError, AttributeError):
+            try:
+                return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+            except (ValueError, TypeError):
+                return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return None
+
+
+def fmt(value, format, context=None):
+    """Format a date with a moment.js (or strftime) format string"""
+    if value is None:
+        return ''
+    dt = _to_datetime(value)
+    if dt is None:
+        return ''
+    if dt.tzinfo is not None or isinstance(value, datetime):
+        dt = (context or date_context()).localize(dt)
+    try:
+        return compile_format(format)(dt)
+    except (ValueError, TypeError):
+        return ''
+
+
+def calendar(value, context=None):
+    """'Today at 09:30 AM', 'Tomorrow at ...' or 'December 05, 2025 at ...'"""
+    if value is None:
+        return ''
+    dt = _to_datetime(value)
+    if dt is None:
+        return ''
+    context = context or date_context()
+    dt = context.localize(dt)
+    day = dt.date()
+    if day == context.today:
+        return dt.strftime('Today at %I:%M %p')
+    if day == context.tomorrow:
+        return dt.strftime('Tomorrow at %I:%M %p')
+    return dt.strftime('%B %d, %Y at %I:%M %p')
+
+
+def _plural(count, unit):
+    return f"{count} {unit}{'s' if count > 1 else ''}"
+
+
+def fromnow(value, context=None):
+    """Relative time: '2 hours ago', 'in 3 days'"""
+    if value is None:
+        return ''
+    dt = _to_datetime(value)
+    if dt is None:
+        return ''
+    context = context or date_context()
+    total_seconds = int((context.localize(dt) - context.now).total_seconds())
+
+    if total_seconds < 0:
+        # Past
+        abs_seconds = -total_seconds
+        if abs_seconds < 60:
+            return "just now"
+        elif abs_seconds < 3600:
+            return f"{_plural(abs_seconds // 60, 'minute')} ago"
+        elif abs_seconds < 86400:
+            return f"{_plural(abs_seconds // 3600, 'hour')} ago"
+        return f"{_plural(abs_seconds // 86400, 'day')} ago"
+    # Future
+    if total_seconds < 60:
+        return "in a few seconds"
+    elif total_seconds < 3600:
+        return f"in {_plural(total_seconds // 60, 'minute')}"
+    elif total_seconds < 86400:
+        return f"in {_plural(total_seconds // 3600, 'hour')}"
+    return f"in {_plural(total_seconds // 86400, 'day')}"
+
+
+def init_app(app):
+    """Register the date filters"""
+    app.jinja_env.filters['calendar'] = calendar
+    app.jinja_env.filters['fromnow'] = fromnow
+    app.jinja_env.filters['fmt'] = fmt
 
-from datetime import datetime
 
 class momentjs:
+    """Template helper kept for ``momentjs(ts).calendar()`` callers; use the filters instead"""
+
     def __init__(self, timestamp):
         self.timestamp = timestamp
 
     def render(self, format):
         """Render date on server-side using Python datetime instead of client-side JavaScript"""
-        if self.timestamp is None:
-            return ""
-        
-        # Ensure timestamp is a datetime object
-        if isinstance(self.timestamp, str):
-            try:
-                # Try parsing ISO format first
-                dt = datetime.fromisoformat(self.timestamp.replace('Z', '+00:00'))
-            except (ValueError, AttributeError):
-                try:
-                    # Fallback to strptime for other formats
-                    dt = datetime.strptime(self.timestamp, '%Y-%m-%d %H:%M:%S')
-                except (ValueError, TypeError):
-                    return ""
-        else:
-            dt = self.timestamp
-        
-        # Python datetime format to strftime equivalent
-        # Convert moment.js format strings to Python strftime format
-        format_map = {
-            'MMMM Do, YYYY': '%B %d, %Y',  # December 5, 2025
-            'MMMM Do': '%B %d',             # December 5
-            'MMM D': '%b %d',               # Dec 5
-            'YYYY-MM-DD': '%Y-%m-%d',
-            'DD/MM/YYYY': '%d/%m/%Y',
-            'MM/DD/YYYY': '%m/%d/%Y',
-        }
-        
-        # Get the format or use as-is if not mapped
-        python_format = format_map.get(format, format)
-        
-        try:
-            return dt.strftime(python_format)
-        except (ValueError, TypeError):
-            return ""
-    
+        return fmt(self.timestamp, format)
+
     # Format time
     def format(self, fmt):
         return self.render(fmt)
 
     def calendar(self):
         """Calendar format: today/tomorrow at time, etc"""
-        if self.timestamp is None:
-            return ""
-        
-        if isinstance(self.timestamp, str):
-            try:
-                dt = datetime.fromisoformat(self.timestamp.replace('Z', '+00:00'))
-            except (ValueError, AttributeError):
-                try:
-                    dt = datetime.strptime(self.timestamp, '%Y-%m-%d %H:%M:%S')
-                except (ValueError, TypeError):
-                    return ""
-        else:
-            dt = self.timestamp
-        
-        today = datetime.now().date()
-        # Safely compute tomorrow's date, handling month and year rollover
-        try:
-            tomorrow = today.replace(day=today.day + 1)
-        except ValueError:
-            # If day+1 is invalid, roll over to next month or year
-            if today.month == 12:
-                tomorrow = today.replace(year=today.year + 1, month=1, day=1)
-            else:
-                tomorrow = today.replace(month=today.month + 1, day=1)
-        
-        if dt.date() == today:
-            return f"Today at {dt.strftime('%I:%M %p')}"
-        elif dt.date() == tomorrow:
-            return f"Tomorrow at {dt.strftime('%I:%M %p')}"
-        else:
-            return dt.strftime('%B %d, %Y at %I:%M %p')
+        return calendar(self.timestamp)
 
     def fromNow(self):
         """Relative time: 2 hours ago, in 3 days, etc"""
-        if self.timestamp is None:
-            return ""
-        
-        if isinstance(self.timestamp, str):
-            try:
-                dt = datetime.fromisoformat(self.timestamp.replace('Z', '+00:00'))
-            except (ValueError, AttributeError):
-                try:
-                    dt = datetime.strptime(self.timestamp, '%Y-%m-%d %H:%M:%S')
-                except (ValueError, TypeError):
-                    return ""
-        else:
-            dt = self.timestamp
-        
-        now = datetime.now()
-        diff = dt - now
-        
-        total_seconds = int(diff.total_seconds())
-        
-        if total_seconds < 0:
-            # Past
-            abs_seconds = abs(total_seconds)
-            if abs_seconds < 60:
-                return "just now"
-            elif abs_seconds < 3600:
-                minutes = abs_seconds // 60
-                return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-            elif abs_seconds < 86400:
-                hours = abs_seconds // 3600
-                return f"{hours} hour{'s' if hours > 1 else ''} ago"
-            else:
-                days = abs_seconds // 86400
-                return f"{days} day{'s' if days > 1 else ''} ago"
-        else:
-            # Future
-            if total_seconds < 60:
-                return "in a few seconds"
-            elif total_seconds < 3600:
-                minutes = total_seconds // 60
-                return f"in {minutes} minute{'s' if minutes > 1 else ''}"
-            elif total_seconds < 86400:
-                hours = total_seconds // 3600
-                return f"in {hours} hour{'s' if hours > 1 else ''}"
-            else:
-                days = total_seconds // 86400
-                return f"in {days} day{'s' if days > 1 else ''}"
-
- 
-        
+        return fromnow(self.timestamp)
@@ -1,9 +1,15 @@
-"""Email verification token generation and validation utilities"""
+"""Email verification token generation and validation utilities
+
+Issued tokens are stored as SHA-256 hashes in ``UserToken`` so a verification
+link is resolved with one indexed lookup instead of hashing every unverified
+user's email.
+"""
 import secrets
 import hashlib
 from datetime import datetime, timedelta
+from typing import Optional
 from app import db
-from app.models import User
+from app.models import User, UserToken
 
 
 class VerificationToken:
@@ -59,6 +65,8 @@ class VerificationToken:
         """
         Create and store a verification token for a user.
         
+        Only the token's hash is stored; the token itself goes in the email.
+        
         Args:
             user: User object
             
@@ -66,4 +74,67 @@ class VerificationToken:
             Tuple of (token, expires_at_iso_string)
         """
         token = VerificationToken.generate_token(user.email)
-        return token, (datetime.utcnow() + timedelta(hours=VerificationToken.EXPIRATION_HOURS)).isoformat()
+        expires_at = datetime.utcnow() + timedelta(hours=VerificationToken.EXPIRATION_HOURS)
+        # Only saved users can be looked up by token
+        if user.id is not None:
+            db.session.add(UserToken(  # type: ignore[attr-defined]
+                user_id=user.id,
+                purpose='email_verification',
+                token_hash=VerificationToken.hash_token(token),
+                expires_at=expires_at
+            ))
+            db.session.commit()  # type: ignore[attr-defined]
+        return token, expires_at.isoformat()
+    
+    @staticmethod
+    def hash_token(token: str) -> str:
+        """SHA-256 hex digest under which a token is stored"""
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    @staticmethod
+    def find_user(token: str, purpose: str = 'email_verification') -> Optional[User]:
+        """
+        Look up the user a token was issued to.
+        
+        Args:
+            token: Token from the link
+            purpose: Purpose the token must have been issued for
+            
+        Returns:
+            User if the token exists, has not expired and still matches the
+            user's email, otherwise None
+        """
+        if not token:
+            return None
+        
+        record = UserToken.query.filter_by(
+            token_hash=VerificationToken.hash_token(token),
+            purpose=purpose
+        ).first()
+        if record is None or record.expires_at <= datetime.utcnow():
+            return None
+        
+        user = db.session.get(User, record.user_id)  # type: ignore[attr-defined]
+        # A token sent before an email change is no longer valid
+        if user is None or not VerificationToken.verify_email_token(token, user.email):
+            return None
+        return user
+    
+    @staticmethod
+    def consume(user: User, purpose: str = 'email_verification') -> None:
+        """Invalidate all of a user's tokens for ``purpose`` (caller commits)"""
+        UserToken.query.filter_by(user_id=user.id, purpose=purpose).delete(synchronize_session=False)
+    
+    @staticmethod
+    def purge_expired(now: Optional[datetime] = None) -> int:
+        """
+        Delete expired tokens.
+        
+        Returns:
+            Number of tokens deleted
+        """
+        deleted = UserToken.query.filter(
+            UserToken.expires_at <= (now or datetime.utcnow())
+        ).delete(synchronize_session=False)
+        db.session.commit()  # type: ignore[attr-defined]
+        return deleted
@@ -3,26 +3,133 @@ import urllib.parse
 from dotenv import load_dotenv
 load_dotenv('.flaskenv')
 
-def connect_db(type, app):
-    
-    DB_URL = os.environ.get('DB_URL')
-    DB_USER = os.environ.get('DB_USER')
+# Engine presets per backend. Connections are checked with a cheap ping before
+# use and recycled before common server/proxy idle timeouts close them.
+POOL_PRESETS = {
+    'mysql': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 280,  # below the 300s idle timeout of most proxies and MariaDB setups
+        'pool_pre_ping': True,
+    },
+    'postgres': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+    },
+}
+
+# .flaskenv variable -> (engine option, type)
+POOL_ENV = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', float),
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+    'DB_POOL_PRE_PING': ('pool_pre_ping', lambda value: value.lower() == 'true'),
+}
+
+
+def engine_options(type, env=None):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for a mysql or postgres database
+
+    Starts from POOL_PRESETS and applies the DB_POOL_* overrides, the
+    connect/statement timeouts and, with DB_FAST_EXECUTEMANY=true, the
+    driver's batched executemany mode.
+    """
+    env = os.environ if env is None else env
+    if type not in POOL_PRESETS:
+        raise ValueError(f'Unknown database type: {type}')
+
+    options = dict(POOL_PRESETS[type])
+    for name, (option, convert) in POOL_ENV.items():
+        if env.get(name):
+            options[option] = convert(env[name])
+
+    connect_timeout = int(env.get('DB_CONNECT_TIMEOUT', '10'))
+    statement_timeout = int(env.get('DB_STATEMENT_TIMEOUT', '0'))  # Milliseconds, 0 = server default
+    fast_executemany = env.get('DB_FAST_EXECUTEMANY', 'false').lower() == 'true'
+    page_size = int(env.get('DB_EXECUTEMANY_PAGE_SIZE', '1000'))
+
+    if type == 'mysql':
+        connect_args = {'connect_timeout': connect_timeout}
+        if statement_timeout:
+            # MariaDB and MySQL name the per-session limit differently (seconds vs milliseconds)
+            if env.get('DB_MYSQL_VARIANT', 'mariadb').lower() == 'mariadb':
+                connect_args['init_command'] = f'SET SESSION max_statement_time={statement_timeout / 1000:g}'
+            else:
+                connect_args['init_command'] = f'SET SESSION max_execution_time={statement_timeout}'
+        if fast_executemany:
+            # mysqlclient rewrites executemany() INSERTs into multi-row statements; send bigger pages
+            options['insertmanyvalues_page_size'] = page_size
+    else:
+        connect_args = {'connect_timeout': connect_timeout}
+        if statement_timeout:
+            connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+        if fast_executemany:
+            # psycopg2: multi-row VALUES for INSERT, execute_batch() for UPDATE/DELETE executemany()
+            options['executemany_mode'] = 'values_plus_batch'
+            options['insertmanyvalues_page_size'] = page_size
+            options['executemany_batch_page_size'] = page_size
+    options['connect_args'] = connect_args
+    return options
+
+
+def _credentials(env):
+    DB_USER = env.get('DB_USER')
     # Support both DB_PW and DB_PASSWORD
-    DB_PW = os.environ.get('DB_PASSWORD') or os.environ.get('DB_PW')
-    DB_NAME = os.environ.get('DB_NAME')
-    
-    if not all([DB_URL, DB_USER, DB_PW, DB_NAME]):
-        raise ValueError('Missing required database environment variables: DB_URL, DB_USER, DB_PASSWORD, DB_NAME')
-    
-    DB_PW = urllib.parse.quote(DB_PW)
+    DB_PW = env.get('DB_PASSWORD') or env.get('DB_PW')
+    DB_NAME = env.get('DB_NAME')
+    return DB_USER, DB_PW, DB_NAME
+
 
+def _build_url(type, host, user, pw, name):
+    pw = urllib.parse.quote(pw)
     if type == 'mysql':
         # Use 127.0.0.1 instead of localhost to force TCP connection
-        url = DB_URL.replace('localhost', '127.0.0.1') if 'localhost' in DB_URL else DB_URL
-        DB_URL = 'mysql://{user}:{pw}@{url}/{db}'.format(user=DB_USER, pw=DB_PW, url=url, db=DB_NAME)
+        host = host.replace('localhost', '127.0.0.1') if 'localhost' in host else host
+        return 'mysql://{user}:{pw}@{url}/{db}'.format(user=user, pw=pw, url=host, db=name)
     elif type == 'postgres':
-        DB_URL = 'postgresql://{user}:{pw}@{url}/{db}'.format(user=DB_USER, pw=DB_PW, url=DB_URL, db=DB_NAME)
-    else:
-        raise ValueError(f'Unknown database type: {type}')
+        return 'postgresql://{user}:{pw}@{url}/{db}'.format(user=user, pw=pw, url=host, db=name)
+    raise ValueError(f'Unknown database type: {type}')
+
+
+def replica_urls(type, env=None):
+    """
+    SQLAlchemy URLs of the read replicas listed in DB_REPLICA_URLS (comma separated)
+
+    Entries with a scheme are used as given (e.g. sqlite:////srv/replica.db);
+    host[:port] entries, like DB_URL, reuse the primary's DB_USER, DB_PASSWORD
+    and DB_NAME.
+    """
+    env = os.environ if env is None else env
+    urls = []
+    for entry in env.get('DB_REPLICA_URLS', '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if '://' in entry:
+            urls.append(entry)
+            continue
+        user, pw, name = _credentials(env)
+        if type not in ('mysql', 'postgres') or not all([user, pw, name]):
+            raise ValueError(f'DB_REPLICA_URLS entry {entry!r} needs a full URL for {type}')
+        urls.append(_build_url(type, entry, user, pw, name))
+    return urls
+
+
+def connect_db(type, app):
+
+    DB_URL = os.environ.get('DB_URL')
+    DB_USER, DB_PW, DB_NAME = _credentials(os.environ)
+
+    if not all([DB_URL, DB_USER, DB_PW, DB_NAME]):
+        raise ValueError('Missing required database environment variables: DB_URL, DB_USER, DB_PASSWORD, DB_NAME')
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = DB_URL
\ No newline at end of file
+    app.config['SQLALCHEMY_DATABASE_URI'] = _build_url(type, DB_URL, DB_USER, DB_PW, DB_NAME)
+    # Options from instance/config.py win over the presets
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**engine_options(type),
+                                               **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
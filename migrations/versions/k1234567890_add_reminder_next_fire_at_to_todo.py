@@ -0,0 +1,62 @@
+"""Add reminder_next_fire_at to Todo with a composite due-reminder index.
+
+Revision ID: k1234567890
+Revises: j1234567890
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from datetime import timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'k1234567890'
+down_revision = 'j1234567890'
+branch_labels = None
+depends_on = None
+
+
+def _next_fire_at(reminder_time, notification_count, first_notification_time):
+    # Mirrors app.reminder_scheduler.next_fire_time at the time of this migration
+    notification_count = notification_count or 0
+    if notification_count == 0:
+        return reminder_time
+    if notification_count >= 3 or first_notification_time is None:
+        return None
+    return max(reminder_time, first_notification_time + timedelta(minutes=30 * notification_count))
+
+
+def upgrade():
+    with op.batch_alter_table('todo', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reminder_next_fire_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_todo_reminder_due',
+                              ['reminder_enabled', 'reminder_sent', 'user_id', 'reminder_next_fire_at'])
+
+    # Backfill active reminders
+    todo = sa.table('todo',
+                    sa.column('id', sa.Integer),
+                    sa.column('reminder_enabled', sa.Boolean),
+                    sa.column('reminder_sent', sa.Boolean),
+                    sa.column('reminder_time', sa.DateTime),
+                    sa.column('reminder_notification_count', sa.Integer),
+                    sa.column('reminder_first_notification_time', sa.DateTime),
+                    sa.column('reminder_next_fire_at', sa.DateTime))
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(todo.c.id, todo.c.reminder_time, todo.c.reminder_notification_count,
+                  todo.c.reminder_first_notification_time)
+        .where(todo.c.reminder_enabled == sa.true(), todo.c.reminder_sent == sa.false(),
+               todo.c.reminder_time.isnot(None))
+    ).fetchall()
+    for todo_id, reminder_time, count, first_time in rows:
+        fire_at = _next_fire_at(reminder_time, count, first_time)
+        if fire_at is not None:
+            bind.execute(todo.update().where(todo.c.id == todo_id).values(reminder_next_fire_at=fire_at))
+
+
+def downgrade():
+    with op.batch_alter_table('todo', schema=None) as batch_op:
+        batch_op.drop_index('ix_todo_reminder_due')
+        batch_op.drop_column('reminder_next_fire_at')
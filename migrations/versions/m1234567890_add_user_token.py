@@ -0,0 +1,42 @@
+"""Add UserToken table for indexed email verification lookups.
+
+Revision ID: m1234567890
+Revises: l1234567890
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'm1234567890'
+down_revision = 'l1234567890'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_token',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('purpose', sa.String(length=32), nullable=False),
+        sa.Column('token_hash', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('user_token', schema=None) as batch_op:
+        batch_op.create_index('ix_user_token_token_hash', ['token_hash'], unique=True)
+        batch_op.create_index('ix_user_token_user_id', ['user_id'])
+        batch_op.create_index('ix_user_token_expires_at', ['expires_at'])
+
+
+def downgrade():
+    with op.batch_alter_table('user_token', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_token_expires_at')
+        batch_op.drop_index('ix_user_token_user_id')
+        batch_op.drop_index('ix_user_token_token_hash')
+    op.drop_table('user_token')
@@ -0,0 +1,26 @@
+"""Add User.db_primary_until for read-your-writes replica routing.
+
+Revision ID: n1234567890
+Revises: m1234567890
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'n1234567890'
+down_revision = 'm1234567890'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('db_primary_until', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('db_primary_until')
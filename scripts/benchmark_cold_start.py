@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Measure cold-start cost: importing the app (what every Gunicorn worker does
+on spawn) and running a CLI command end to end.
+
+Each sample is a fresh interpreter. Also lists the slowest imports from
+``python -X importtime``.
+
+    python scripts/benchmark_cold_start.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = dict(os.environ, FLASK_APP='todobox.py')
+
+
+def _wall(command, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, env=ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def import_times():
+    """{module: cumulative microseconds} from python -X importtime -c 'import app'"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, env=ENV, capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per measurement')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports listed')
+    args = parser.parse_args()
+
+    for label, command in (('python -c "import app"', [sys.executable, '-c', 'import app']),
+                           ('flask list-users', [sys.executable, '-m', 'flask', 'list-users'])):
+        print(f'{label:<28} {_wall(command, args.runs):8.1f} ms')
+
+    times = import_times()
+    print(f"\n'import app' under -X importtime: {times.get('app', 0) / 1000:.1f} ms cumulative")
+    for name, micros in sorted(times.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'  {micros / 1000:8.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmark rendering dates in a long list.
+
+Renders the same rows with the old ``momentjs(ts).calendar()`` helper (a
+new object per value, today/tomorrow recomputed and the format map rebuilt
+on every call) and with the ``calendar`` / ``fmt`` / ``fromnow`` filters,
+which share one per-request DateContext and cached format translations.
+
+    python scripts/benchmark_date_filters.py --rows 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from jinja2 import Environment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import utils  # noqa: E402
+
+OLD_TEMPLATE = """{% for ts in rows %}
+<li>{{ momentjs(ts).calendar() }} {{ momentjs(ts).format('MMM D') }} {{ momentjs(ts).fromNow() }}</li>
+{% endfor %}"""
+
+NEW_TEMPLATE = """{% for ts in rows %}
+<li>{{ ts|calendar }} {{ ts|fmt('MMM D') }} {{ ts|fromnow }}</li>
+{% endfor %}"""
+
+
+class _old_momentjs:
+    # momentjs before the filters, datetime inputs only
+    def __init__(self, timestamp):
+        self.timestamp = timestamp
+
+    def format(self, format):
+        format_map = {
+            'MMMM Do, YYYY': '%B %d, %Y', 'MMMM Do': '%B %d', 'MMM D': '%b %d',
+            'YYYY-MM-DD': '%Y-%m-%d', 'DD/MM/YYYY': '%d/%m/%Y', 'MM/DD/YYYY': '%m/%d/%Y',
+        }
+        return self.timestamp.strftime(format_map.get(format, format))
+
+    def calendar(self):
+        dt = self.timestamp
+        today = datetime.now().date()
+        try:
+            tomorrow = today.replace(day=today.day + 1)
+        except ValueError:
+            tomorrow = today + timedelta(days=1)
+        if dt.date() == today:
+            return f"Today at {dt.strftime('%I:%M %p')}"
+        elif dt.date() == tomorrow:
+            return f"Tomorrow at {dt.strftime('%I:%M %p')}"
+        return dt.strftime('%B %d, %Y at %I:%M %p')
+
+    def fromNow(self):
+        seconds = int((self.timestamp - datetime.now()).total_seconds())
+        if seconds < 0:
+            return f"{-seconds // 3600} hours ago"
+        return f"in {seconds // 3600} hours"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1000, help='Rows per page')
+    parser.add_argument('--repeat', type=int, default=50, help='Pages rendered')
+    args = parser.parse_args()
+
+    now = datetime.now()
+    rows = [now + timedelta(minutes=random.randint(-20000, 3000)) for _ in range(args.rows)]
+
+    env = Environment()
+    env.globals['momentjs'] = _old_momentjs
+    old = env.from_string(OLD_TEMPLATE)
+
+    env = Environment()
+    env.filters.update(calendar=utils.calendar, fmt=utils.fmt, fromnow=utils.fromnow)
+    new = env.from_string(NEW_TEMPLATE)
+    context = utils.DateContext()
+    # Outside a request each filter call would build its own context; pin one like a request does
+    utils.date_context, original = (lambda: context), utils.date_context
+
+    try:
+        old_seconds = timeit.timeit(lambda: old.render(rows=rows), number=args.repeat)
+        new_seconds = timeit.timeit(lambda: new.render(rows=rows), number=args.repeat)
+    finally:
+        utils.date_context = original
+
+    print(f'momentjs(ts) helper   {old_seconds / args.repeat * 1000:7.2f} ms/page')
+    print(f'date filters          {new_seconds / args.repeat * 1000:7.2f} ms/page'
+          f'  ({old_seconds / new_seconds:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
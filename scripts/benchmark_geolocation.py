@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Benchmark timezone detection with and without the geolocation cache.
+
+Replays lookups for a set of client IPs (several per /24, as real traffic
+has) against a local stand-in for ip-api.com that adds --latency ms per
+call, first through an uncached resolver and then through the cached one
+the app builds. With --mmdb, the offline MaxMind backend is timed as well
+(needs: pip install maxminddb).
+
+    python scripts/benchmark_geolocation.py --lookups 2000 --networks 100
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.geolocation import GeoResolver, IpApiBackend, MMDBBackend, TTLCache  # noqa: E402
+
+
+def _stand_in(latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            body = json.dumps({'status': 'success', 'timezone': 'Europe/Paris', 'countryCode': 'FR'}).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/json/{{ip}}'
+
+
+def _time(label, resolver, ips):
+    started = time.perf_counter()
+    for ip in ips:
+        resolver.lookup(ip)
+    elapsed = time.perf_counter() - started
+    print(f'{label:<24} {len(ips)} lookups in {elapsed:.3f}s ({elapsed / len(ips) * 1e6:.1f} us/lookup)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--networks', type=int, default=100, help='Distinct /24 networks in the replay')
+    parser.add_argument('--latency', type=float, default=20, help='Simulated ip-api round trip (ms)')
+    parser.add_argument('--mmdb', help='Path to a GeoLite2-City .mmdb to time the offline backend')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    networks = [f'{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}' for _ in range(args.networks)]
+    ips = [f'{rng.choice(networks)}.{rng.randint(1, 254)}' for _ in range(args.lookups)]
+
+    server, url = _stand_in(args.latency / 1000)
+    try:
+        # A few hundred uncached calls are enough to show the per-call cost
+        _time('ip-api, uncached', GeoResolver([IpApiBackend(url=url)]), ips[:200])
+        cached = GeoResolver([IpApiBackend(url=url)], cache=TTLCache())
+        _time('ip-api, LRU+TTL cold', cached, ips)
+        _time('ip-api, LRU+TTL warm', cached, ips)
+    finally:
+        server.shutdown()
+
+    if args.mmdb:
+        _time('mmdb, uncached', GeoResolver([MMDBBackend(args.mmdb)]), ips)
+        cached = GeoResolver([MMDBBackend(args.mmdb)], cache=TTLCache())
+        _time('mmdb, LRU+TTL cold', cached, ips)
+        _time('mmdb, LRU+TTL warm', cached, ips)
+
+
+if __name__ == '__main__':
+    main()
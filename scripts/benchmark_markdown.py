@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Benchmark markdown rendering for a page of todo details.
+
+Compares the old per-call path (markdown.markdown() and bleach.clean(),
+which build a converter and a cleaner every time) with
+app.markdown_render: reused converter/cleaner with the cache off (first
+render of new text), and with the cache warm (the same page shown again).
+
+    python scripts/benchmark_markdown.py --items 50
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import markdown
+from bleach import clean
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import markdown_render  # noqa: E402
+from app.html_policy import DETAILS_ATTRIBUTES, DETAILS_TAGS  # noqa: E402
+
+SAMPLE = """Call **supplier** about order #{n}
+
+- check the ~~old~~ new price
+- confirm delivery [window](https://example.com/orders/{n})
+
+```
+ref: {n}
+```
+"""
+
+
+def _old_render(text):
+    # routes.py before markdown_render
+    return clean(markdown.markdown(text, extensions=['fenced_code', 'pymdownx.tilde']),
+                 tags=DETAILS_TAGS, attributes=DETAILS_ATTRIBUTES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--items', type=int, default=50, help='Todo details on the page')
+    parser.add_argument('--repeat', type=int, default=20, help='Pages rendered')
+    args = parser.parse_args()
+
+    page = [SAMPLE.format(n=n) for n in range(args.items)]
+    assert [_old_render(text) for text in page] == [markdown_render.render_markdown(text) for text in page]
+
+    old = timeit.timeit(lambda: [_old_render(text) for text in page], number=args.repeat)
+    markdown_render.configure(0)
+    reused = timeit.timeit(lambda: [markdown_render.render_markdown(text) for text in page], number=args.repeat)
+    markdown_render.configure(1024)
+    [markdown_render.render_markdown(text) for text in page]
+    cached = timeit.timeit(lambda: [markdown_render.render_markdown(text) for text in page], number=args.repeat)
+
+    for label, seconds in (('markdown() + clean() per call', old),
+                           ('reused converter and cleaner', reused),
+                           ('rendered-HTML cache hit', cached)):
+        print(f'{label:<32} {seconds / args.repeat * 1000:8.2f} ms/page  ({old / seconds:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Benchmark marking a burst of due reminders as sent.
+
+Compares the old per-todo path (fetch, update, commit for every reminder)
+with ReminderService.mark_reminders_sent, which groups rows by target state
+and writes each group with one UPDATE ... WHERE id IN (...).
+
+Runs against a throwaway SQLite database:
+
+    python scripts/benchmark_reminders.py --count 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _seed(db, Todo, User, count):
+    user = User(email=f'bench-{time.time_ns()}@example.com')
+    db.session.add(user)
+    db.session.commit()
+
+    due = datetime.utcnow() - timedelta(minutes=1)
+    db.session.execute(Todo.__table__.insert(), [{
+        'name': f'Reminder {i}', 'user_id': user.id, 'reminder_enabled': True, 'reminder_sent': False,
+        'reminder_time': due, 'reminder_notification_count': 0, 'reminder_next_fire_at': due,
+    } for i in range(count)])
+    db.session.commit()
+    return [row[0] for row in db.session.query(Todo.id).filter(Todo.user_id == user.id)]
+
+
+def _per_todo(db, Todo, todo_ids):
+    # The pre-batching mark_reminder_sent, one transaction per reminder
+    for todo_id in todo_ids:
+        todo = db.session.get(Todo, todo_id)
+        todo.reminder_notification_count = (todo.reminder_notification_count or 0) + 1
+        if todo.reminder_first_notification_time is None:
+            todo.reminder_first_notification_time = datetime.utcnow()
+        db.session.add(todo)
+        db.session.flush()
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=10000, help='Due reminders in the burst')
+    parser.add_argument('--skip-per-todo', action='store_true', help='Only time the batched path')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='todobox-bench-')
+    os.environ['DATABASE_DEFAULT'] = 'sqlite'
+    os.environ['DATABASE_NAME'] = os.path.join(workdir, 'bench.db')
+
+    from app import app, db
+    from app.models import Todo, User
+    from app.reminder_service import ReminderService
+
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+
+        if not args.skip_per_todo:
+            todo_ids = _seed(db, Todo, User, args.count)
+            started = time.perf_counter()
+            _per_todo(db, Todo, todo_ids)
+            print(f'per-todo commits: {args.count} reminders in {time.perf_counter() - started:.2f}s')
+
+        todo_ids = _seed(db, Todo, User, args.count)
+        db.session.expunge_all()
+        started = time.perf_counter()
+        ReminderService.mark_reminders_sent(todo_ids)
+        print(f'batched update:   {args.count} reminders in {time.perf_counter() - started:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
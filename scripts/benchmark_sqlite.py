@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Benchmark concurrent SQLite writes with stock settings and the production profile.
+
+Starts --writers processes that each commit --writes small transactions the
+way a request does (read the user row, insert a tracker row, commit), while
+--readers processes keep running the dashboard-style aggregate query. The
+run is done once with SQLite's defaults (rollback journal, synchronous=FULL)
+and once with the pragmas from app/sqlite_tuning.py.
+
+    python scripts/benchmark_sqlite.py --writers 4 --readers 2 --writes 300
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app.sqlite_tuning import apply_pragmas, pragmas_from_config  # noqa: E402
+
+
+def _engine(path, tuned, busy_timeout):
+    # Stock pysqlite waits 5s for locks by default; use the same wait in both runs
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': busy_timeout / 1000})
+    if tuned:
+        pragmas = pragmas_from_config({'SQLITE_BUSY_TIMEOUT': busy_timeout})
+        event.listen(engine, 'connect', lambda conn, record: apply_pragmas(conn, pragmas))
+    return engine
+
+
+def _setup(path, tuned, busy_timeout):
+    engine = _engine(path, tuned, busy_timeout)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE user (id INTEGER PRIMARY KEY, email TEXT)'))
+        conn.execute(text('CREATE TABLE tracker (id INTEGER PRIMARY KEY, todo_id INTEGER, '
+                          'status_id INTEGER, timestamp REAL)'))
+        conn.execute(text("INSERT INTO user (id, email) VALUES (1, 'bench@example.com')"))
+    engine.dispose()
+
+
+def _writer(path, tuned, busy_timeout, writes, start, results):
+    engine = _engine(path, tuned, busy_timeout)
+    start.wait()
+    ok = locked = 0
+    for i in range(writes):
+        try:
+            with engine.connect() as conn:
+                conn.execute(text('SELECT email FROM user WHERE id = 1')).all()
+                conn.execute(text('INSERT INTO tracker (todo_id, status_id, timestamp) VALUES (:t, 1, :ts)'),
+                             {'t': i, 'ts': time.time()})
+                conn.commit()
+            ok += 1
+        except OperationalError:
+            locked += 1
+    results.put((ok, locked))
+    engine.dispose()
+
+
+def _reader(path, tuned, busy_timeout, start, stop):
+    engine = _engine(path, tuned, busy_timeout)
+    start.wait()
+    while not stop.is_set():
+        try:
+            with engine.connect() as conn:
+                conn.execute(text('SELECT status_id, count(*), max(timestamp) FROM tracker GROUP BY status_id')).all()
+        except OperationalError:
+            pass
+    engine.dispose()
+
+
+def run(label, tuned, args):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.db')
+    _setup(path, tuned, args.busy_timeout)
+
+    start, stop = multiprocessing.Event(), multiprocessing.Event()
+    results = multiprocessing.Queue()
+    writers = [multiprocessing.Process(target=_writer, args=(path, tuned, args.busy_timeout, args.writes, start, results))
+               for _ in range(args.writers)]
+    readers = [multiprocessing.Process(target=_reader, args=(path, tuned, args.busy_timeout, start, stop))
+               for _ in range(args.readers)]
+    for process in writers + readers:
+        process.start()
+    time.sleep(0.5)  # let every process open its engine
+
+    started = time.perf_counter()
+    start.set()
+    totals = [results.get() for _ in writers]
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for process in writers + readers:
+        process.join()
+
+    ok = sum(t[0] for t in totals)
+    locked = sum(t[1] for t in totals)
+    print(f'{label:<10} {ok} commits in {elapsed:.2f}s ({ok / elapsed:.0f} commits/s), '
+          f'{locked} "database is locked" errors')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--writes', type=int, default=300, help='Transactions per writer')
+    parser.add_argument('--busy-timeout', type=int, default=1000, help='Lock wait in ms (both runs)')
+    args = parser.parse_args()
+
+    run('stock', False, args)
+    run('profile', True, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark timezone lookups and UTC -> local conversion.
+
+Compares the old per-call path (pytz.timezone() on every conversion, name
+validation against the pytz.all_timezones list) with the cached timezone
+objects, the frozenset check and convert_many().
+
+    python scripts/benchmark_timezones.py --count 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.timezone_utils import convert_many, convert_to_user_timezone, is_valid_timezone  # noqa: E402
+
+TIMEZONE = 'America/New_York'
+
+
+def _old_convert(dt, user_timezone='UTC'):
+    # convert_to_user_timezone before the tz cache
+    dt = pytz.UTC.localize(dt)
+    return dt.astimezone(pytz.timezone(user_timezone))
+
+
+def _report(label, seconds, count, baseline=None):
+    per_item = seconds / count * 1e6
+    speedup = f'  ({baseline / seconds:.1f}x)' if baseline else ''
+    print(f'{label:<38} {per_item:8.3f} us/item{speedup}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=500, help='Datetimes per batch (e.g. reminders on a page)')
+    parser.add_argument('--repeat', type=int, default=200, help='Batches timed')
+    args = parser.parse_args()
+
+    start = datetime(2025, 1, 1)
+    batch = [start + timedelta(minutes=random.randint(0, 525600)) for _ in range(args.count)]
+    items = args.count * args.repeat
+
+    old = timeit.timeit(lambda: [_old_convert(dt, TIMEZONE) for dt in batch], number=args.repeat)
+    _report('pytz.timezone() per item', old, items)
+    cached = timeit.timeit(lambda: [convert_to_user_timezone(dt, TIMEZONE) for dt in batch], number=args.repeat)
+    _report('convert_to_user_timezone (cached zone)', cached, items, old)
+    many = timeit.timeit(lambda: convert_many(batch, TIMEZONE), number=args.repeat)
+    _report('convert_many', many, items, old)
+
+    names = random.choices(pytz.all_timezones, k=args.count)
+    scan = timeit.timeit(lambda: [name in pytz.all_timezones for name in names], number=args.repeat)
+    _report('name in pytz.all_timezones', scan, items)
+    lookup = timeit.timeit(lambda: [is_valid_timezone(name) for name in names], number=args.repeat)
+    _report('is_valid_timezone (frozenset)', lookup, items, scan)
+
+
+if __name__ == '__main__':
+    main()
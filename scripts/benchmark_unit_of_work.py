@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Benchmark /add, /done and /kiv with one commit per request.
+
+Drives the endpoints through Flask's test client against a throwaway SQLite
+database, once with the model helpers committing as they go (the behaviour
+before app/unit_of_work.py, one commit per helper call) and once with the
+request-scoped unit of work. Prints commits per request and latency.
+
+    python scripts/benchmark_unit_of_work.py --requests 300
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = ('/add (new)', '/add (update)', '/<id>/done', '/<id>/kiv')
+
+
+def _client(app, db, User):
+    email = f'bench-{time.time_ns()}@example.com'
+    user = User(email=email)
+    user.set_password('BenchPass123!')
+    user.email_verified = True
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': 'BenchPass123!'})
+    return client
+
+
+def _timed(client, method, url, data, commits):
+    before = commits[0]
+    started = time.perf_counter()
+    response = getattr(client, method)(url, data=data)
+    elapsed = time.perf_counter() - started
+    assert response.status_code < 400, (url, response.status_code)
+    return elapsed, commits[0] - before
+
+
+def run(label, app, db, User, Todo, args):
+    from sqlalchemy import event
+
+    commits = [0]
+
+    def count(session):
+        commits[0] += 1
+
+    event.listen(db.session, 'after_commit', count)
+    client = _client(app, db, User)
+    results = {name: [] for name in ENDPOINTS}
+    for i in range(args.requests):
+        results['/add (new)'].append(_timed(client, 'post', '/add', {'title': f'Bench {i}', 'activities': 'x'}, commits))
+        todo_id = db.session.query(Todo.id).order_by(Todo.id.desc()).limit(1).scalar()
+        # Schedule to tomorrow while in KIV: updates the todo, exits KIV and adds a tracker row
+        client.post(f'/{todo_id}/kiv')
+        results['/add (update)'].append(_timed(client, 'post', '/add', {
+            'todo_id': todo_id, 'title': f'Bench {i}', 'activities': 'x', 'schedule_day': 'tomorrow'}, commits))
+        results['/<id>/done'].append(_timed(client, 'post', f'/{todo_id}/done', {}, commits))
+        results['/<id>/kiv'].append(_timed(client, 'post', f'/{todo_id}/kiv', {}, commits))
+    event.remove(db.session, 'after_commit', count)
+
+    for name, samples in results.items():
+        times = sorted(t for t, _ in samples)
+        p95 = times[int(len(times) * 0.95) - 1] if len(times) >= 20 else times[-1]
+        print(f'{label:<16} {name:<14} {statistics.mean(c for _, c in samples):.1f} commits/request  '
+              f'median {statistics.median(times) * 1000:.2f}ms  p95 {p95 * 1000:.2f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=300, help='Requests per endpoint and mode')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='todobox-bench-')
+    os.environ['DATABASE_DEFAULT'] = 'sqlite'
+    os.environ['DATABASE_NAME'] = os.path.join(workdir, 'bench.db')
+
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import app, db
+    from app.models import Status, Todo, User
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        if Status.query.count() == 0:
+            Status.seed()
+
+        with mock.patch('app.unit_of_work.active', return_value=False):
+            run('per-helper', app, db, User, Todo, args)
+        run('unit of work', app, db, User, Todo, args)
+
+
+if __name__ == '__main__':
+    main()
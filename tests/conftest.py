@@ -2,12 +2,22 @@
 Pytest configuration and shared fixtures for all tests
 """
 import pytest
+import atexit
 import os
+import shutil
+import socketserver
 import sys
+import tempfile
+import threading
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Worker metrics files written by test requests go to a throwaway directory, not instance/metrics
+if 'METRICS_DIR' not in os.environ:
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='todobox-test-metrics-')
+    atexit.register(shutil.rmtree, os.environ['METRICS_DIR'], True)
+
 
 @pytest.fixture(scope="function")
 def app():
@@ -71,3 +81,66 @@ def db_session(app):
             self.session = session
     
     return DBSession(db.session)
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def _reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        sink = self.server.sink
+        sink['connections'] += 1
+        self._reply('220 localhost test SMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode(errors='replace').rstrip('\r\n')
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in ('EHLO', 'HELO'):
+                self._reply('250 localhost')
+            elif command == 'MAIL':
+                recipients = []
+                self._reply('250 OK')
+            elif command == 'RCPT':
+                if 'refused' in line:
+                    self._reply('550 No such user')
+                else:
+                    recipients.append(line.split(':', 1)[1].strip(' <>'))
+                    self._reply('250 OK')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    chunk = self.rfile.readline().decode(errors='replace')
+                    if chunk in ('.\r\n', '.\n', ''):
+                        break
+                    data.append(chunk)
+                sink['messages'].append((recipients, ''.join(data)))
+                self._reply('250 Queued')
+            elif command in ('RSET', 'NOOP'):
+                self._reply('250 OK')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Not implemented')
+
+
+@pytest.fixture
+def smtp_sink():
+    """Run a local SMTP server; yields its port and what it received
+
+    A real server rather than a mock, so connection reuse and failure handling
+    go through actual smtplib sessions.
+    """
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.sink = {'connections': 0, 'messages': []}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1], server.sink
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,198 @@
+"""
+Tests for per-user data versions and ETag / conditional GET handling.
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client for the application."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    """Create a verified user."""
+    from app import db
+    from app.models import User
+
+    user = User(email='etag@example.com', fullname='ETag User')
+    user.set_password('EtagPass123!')
+    user.email_verified = True
+    user.terms_accepted_version = '1.0'
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_client(client, user):
+    """Log the test user in."""
+    client.post('/login', data={'email': 'etag@example.com', 'password': 'EtagPass123!'})
+    return client
+
+
+def _add_todo(user, name='Todo'):
+    from app import db
+    from app.models import Todo, Tracker
+
+    todo = Todo(name=name, details='details', details_html='<p>details</p>', user_id=user.id)
+    db.session.add(todo)
+    db.session.commit()
+    Tracker.add(todo.id, 5, todo.timestamp)
+    return todo
+
+
+class TestDataVersion:
+    """The per-user version is bumped by todo data writes."""
+
+    def test_todo_write_bumps_version(self, app, user):
+        from app import db
+        from app.models import User
+
+        before = User.query.get(user.id).data_version
+        _add_todo(user)
+        db.session.expire_all()
+        assert User.query.get(user.id).data_version > before
+
+    def test_tracker_and_kiv_writes_bump_version(self, app, user):
+        from app import db
+        from app.models import User, Tracker, KIV
+
+        todo = _add_todo(user)
+        db.session.expire_all()
+        before = User.query.get(user.id).data_version
+
+        Tracker.add(todo.id, 6)
+        db.session.expire_all()
+        after_tracker = User.query.get(user.id).data_version
+        assert after_tracker > before
+
+        KIV.add(todo.id, user.id)
+        db.session.expire_all()
+        assert User.query.get(user.id).data_version > after_tracker
+
+    def test_bulk_delete_bumps_version(self, app, user):
+        from app import db
+        from app.models import User, Tracker
+
+        todo = _add_todo(user)
+        db.session.expire_all()
+        before = User.query.get(user.id).data_version
+
+        Tracker.delete(todo.id)
+        db.session.expire_all()
+        assert User.query.get(user.id).data_version > before
+
+    def test_other_users_version_untouched(self, app, user):
+        from app import db
+        from app.models import User
+
+        other = User(email='other@example.com')
+        db.session.add(other)
+        db.session.commit()
+        before = User.query.get(other.id).data_version
+
+        _add_todo(user)
+        db.session.expire_all()
+        assert User.query.get(other.id).data_version == before
+
+
+class TestConditionalGet:
+    """List pages and JSON endpoints answer 304 while nothing changed."""
+
+    @pytest.mark.parametrize('path', ['/today/list', '/undone', '/dashboard', '/api/reminders/check'])
+    def test_unchanged_page_returns_304(self, auth_client, user, path):
+        _add_todo(user)
+
+        first = auth_client.get(path)
+        assert first.status_code == 200
+        etag = first.headers.get('ETag')
+        assert etag and etag.startswith('W/')
+        assert 'no-store' not in first.headers['Cache-Control']
+
+        second = auth_client.get(path, headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.data == b''
+
+    def test_write_invalidates_etag(self, auth_client, user):
+        todo = _add_todo(user, 'First')
+        etag = auth_client.get('/today/list').headers['ETag']
+
+        auth_client.post(f'/today/{todo.id}/done')
+
+        response = auth_client.get('/today/list', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_etag_is_per_path(self, auth_client, user):
+        _add_todo(user)
+        etag = auth_client.get('/today/list').headers['ETag']
+
+        response = auth_client.get('/tomorrow/list', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+
+    def test_reminder_etag_expires_when_reminder_falls_due(self, app, auth_client, user):
+        from app import db
+
+        todo = _add_todo(user)
+        todo.reminder_enabled = True
+        todo.reminder_time = datetime.utcnow() + timedelta(hours=1)
+        db.session.commit()
+
+        response = auth_client.get('/api/reminders/check')
+        etag = response.headers['ETag']
+        assert '~' in etag
+        assert response.get_json()['count'] == 0
+
+        # Same data, but pretend the embedded due time has already passed
+        base, _, _ = etag.partition('~')
+        expired = '{}~{}"'.format(base, int(datetime.utcnow().timestamp()) - 10)
+        response = auth_client.get('/api/reminders/check', headers={'If-None-Match': expired})
+        assert response.status_code == 200
+
+    def test_api_todo_conditional_get(self, client, user):
+        from app import db
+
+        user.api_token = 'etag-token'
+        db.session.commit()
+        _add_todo(user)
+        headers = {'Authorization': 'Bearer etag-token'}
+
+        first = client.get('/api/todo', headers=headers)
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+
+        second = client.get('/api/todo', headers={**headers, 'If-None-Match': etag})
+        assert second.status_code == 304
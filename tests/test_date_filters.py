@@ -0,0 +1,151 @@
+"""
+Tests for the calendar / fromnow / fmt template filters.
+"""
+import pytest
+import os
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+
+
+NOW = datetime(2025, 12, 5, 9, 30)
+
+
+@pytest.fixture
+def context():
+    from app.utils import DateContext
+    return DateContext(now=NOW)
+
+
+class TestFormat:
+    """fmt filter and format string translation"""
+
+    @pytest.mark.parametrize('format, expected', [
+        ('MMMM Do, YYYY', 'December 05, 2025'),
+        ('MMM D', 'Dec 05'),
+        ('YYYY-MM-DD', '2025-12-05'),
+        ('DD/MM/YY h:mm a', '05/12/25 9:30 am'),
+        ('dddd, MMMM Do [at] HH:mm', 'Friday, December 5th at 09:30'),
+        ('%d %b %Y', '05 Dec 2025'),
+        ('D [of] MMMM', '5 of December'),
+    ])
+    def test_formats(self, context, format, expected):
+        from app.utils import fmt
+        assert fmt(NOW, format, context) == expected
+
+    def test_compiled_once(self):
+        from app.utils import compile_format
+        assert compile_format('DD/MM/YY h:mm a') is compile_format('DD/MM/YY h:mm a')
+
+    def test_inputs(self, context):
+        from app.utils import fmt
+        assert fmt('2025-12-05T09:30:00', 'YYYY-MM-DD', context) == '2025-12-05'
+        assert fmt(date(2025, 12, 5), 'MMM D', context) == 'Dec 05'
+        assert fmt(None, 'MMM D', context) == ''
+        assert fmt('not a date', 'MMM D', context) == ''
+
+
+class TestCalendar:
+    """calendar filter"""
+
+    def test_today_tomorrow_other(self, context):
+        from app.utils import calendar
+        assert calendar(NOW.replace(hour=14), context) == 'Today at 02:30 PM'
+        assert calendar(NOW + timedelta(days=1), context) == 'Tomorrow at 09:30 AM'
+        assert calendar(NOW - timedelta(days=1), context) == 'December 04, 2025 at 09:30 AM'
+
+    def test_aware_input_shown_in_server_time(self, context):
+        from app.utils import calendar
+        aware = NOW.astimezone().astimezone(timezone(timedelta(hours=8)))
+        assert calendar(aware, context) == 'Today at 09:30 AM'
+
+
+class TestFromNow:
+    """fromnow filter"""
+
+    def test_relative(self, context):
+        from app.utils import fromnow
+        assert fromnow(NOW - timedelta(seconds=10), context) == 'just now'
+        assert fromnow(NOW - timedelta(hours=2), context) == '2 hours ago'
+        assert fromnow(NOW + timedelta(minutes=1), context) == 'in 1 minute'
+        assert fromnow(NOW + timedelta(days=3), context) == 'in 3 days'
+
+    def test_aware_input_with_naive_context(self, context):
+        from app.utils import fromnow
+        assert fromnow(datetime(2020, 1, 1, tzinfo=timezone.utc), context).endswith('days ago')
+
+
+class TestTemplates:
+    """Filters in templates"""
+
+    def test_context_built_once_per_request(self, app):
+        from flask import g
+        from app.utils import date_context
+
+        with app.test_request_context('/'):
+            first = date_context()
+            assert date_context() is first and g._date_context is first
+
+    def test_filters_and_legacy_helper_agree(self, app):
+        from flask import render_template_string
+
+        with app.test_request_context('/'):
+            html = render_template_string(
+                "{{ ts|calendar }}|{{ momentjs(ts).calendar() }}|{{ ts|fmt('MMM D') }}|{{ ts|fromnow }}",
+                ts=datetime.now() - timedelta(hours=3))
+        new, old, short, relative = html.split('|')
+        assert new == old and short and relative == '3 hours ago'
+
+    def test_non_utc_user_sees_route_buckets(self, app):
+        """A todo the dashboard files under Tomorrow shows tomorrow's date for a KL user"""
+        from flask_login import login_user
+        from app import db
+        from app.models import Todo, User
+        from app.utils import calendar
+
+        user = User(email='kl@example.com')
+        user.timezone = 'Asia/Kuala_Lumpur'
+        user.email_verified = True
+        user.set_password('KualaLumpur123!')
+        db.session.add(user)
+        db.session.commit()
+        tomorrow = date.today() + timedelta(days=1)
+        target = datetime.combine(tomorrow, time(20, 0))
+        db.session.add(Todo(name='Evening call', details='', details_html='', user_id=user.id, target_date=target))
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/login', data={'email': 'kl@example.com', 'password': 'KualaLumpur123!'})
+        html = client.get('/dashboard').get_data(as_text=True)
+        assert 'badge-light ml-2">Tomorrow</span>' in html
+        assert tomorrow.strftime('%B %d, %Y') in html
+
+        with app.test_request_context('/'):
+            login_user(user)
+            assert calendar(target) == 'Tomorrow at 08:00 PM'
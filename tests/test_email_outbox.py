@@ -0,0 +1,214 @@
+"""
+Tests for the email outbox worker: claiming, connection reuse and enqueue-only routes.
+"""
+import pytest
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(smtp_sink):
+    """Create and configure a test application instance."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import app, db
+
+    saved = {key: app.config.get(key) for key in ('SMTP_SERVER', 'SMTP_PORT', 'SMTP_USERNAME',
+                                                  'SMTP_PASSWORD', 'SMTP_FROM_EMAIL', 'EMAIL_OUTBOX_POLL_INTERVAL')}
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+    app.config.update(SMTP_SERVER='127.0.0.1', SMTP_PORT=smtp_sink[0], SMTP_USERNAME='', SMTP_PASSWORD='',
+                      SMTP_FROM_EMAIL='noreply@todobox.local')
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+    app.config.update(saved)
+
+
+@pytest.fixture
+def user(app):
+    """Create a verified user with sharing enabled."""
+    from app import db
+    from app.models import User
+
+    user = User(email='outbox@example.com')
+    user.set_password('OutboxPass123!')
+    user.email_verified = True
+    user.sharing_enabled = True
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _queue(*recipients):
+    from app import db
+    from app.email_service import enqueue_email
+
+    entries = [enqueue_email(r, 'Subject', 'Body', kind='test') for r in recipients]
+    db.session.commit()
+    return entries
+
+
+class TestClaiming:
+    """Rows are claimed by exactly one sender"""
+
+    def test_claimed_rows_are_not_claimed_again(self, app):
+        from app.email_service import OutboxSender
+
+        _queue('a@example.com', 'b@example.com')
+        first = OutboxSender().claim(10)
+        assert [e.status for e in first] == ['sending', 'sending']
+        assert OutboxSender().claim(10) == []
+
+    def test_expired_lease_is_reclaimed(self, app):
+        from app import db
+        from app.email_service import OutboxSender
+
+        entry = _queue('a@example.com')[0]
+        OutboxSender().claim(10)
+        # The worker holding the lease died
+        entry.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        assert [e.id for e in OutboxSender().claim(10)] == [entry.id]
+
+
+class TestOutboxSender:
+    """One SMTP session across batches"""
+
+    def test_connection_kept_between_batches(self, app, smtp_sink):
+        from app.email_service import OutboxSender
+
+        sender = OutboxSender()
+        try:
+            _queue('a@example.com')
+            assert sender.send_batch() == (1, 0)
+            _queue('b@example.com')
+            assert sender.send_batch() == (1, 0)
+            assert sender.connected
+        finally:
+            sender.close()
+        assert smtp_sink[1]['connections'] == 1
+        assert len(smtp_sink[1]['messages']) == 2
+
+    def test_idle_connection_is_reopened(self, app, smtp_sink):
+        from app.email_service import OutboxSender
+
+        sender = OutboxSender(idle_timeout=0)
+        try:
+            _queue('a@example.com')
+            sender.send_batch()
+            time.sleep(0.01)
+            _queue('b@example.com')
+            sender.send_batch()
+        finally:
+            sender.close()
+        assert smtp_sink[1]['connections'] == 2
+
+
+class TestOutboxWorker:
+    """Background delivery"""
+
+    def test_commit_wakes_worker(self, app, smtp_sink):
+        from app.email_service import OutboxWorker, outbox_worker
+        import app.email_service as email_service
+
+        app.config['EMAIL_OUTBOX_POLL_INTERVAL'] = 30
+        worker = OutboxWorker()
+        email_service.outbox_worker = worker
+        try:
+            worker.start(app)
+            time.sleep(0.1)  # let the first (empty) batch run
+            _queue('a@example.com')
+
+            deadline = time.time() + 5
+            while not smtp_sink[1]['messages'] and time.time() < deadline:
+                time.sleep(0.02)
+            assert smtp_sink[1]['messages'][0][0] == ['a@example.com']
+        finally:
+            worker.stop()
+            worker._thread.join(5)
+            email_service.outbox_worker = outbox_worker
+
+
+class TestRoutesEnqueue:
+    """Requests queue mail instead of talking to SMTP"""
+
+    def test_resend_verification_queues(self, app, smtp_sink):
+        from app import db
+        from app.models import EmailOutbox, User
+
+        pending = User(email='pending@example.com')
+        pending.set_password('PendingPass123!')
+        db.session.add(pending)
+        db.session.commit()
+
+        response = app.test_client().post('/resend-verification', data={'email': 'pending@example.com'})
+        assert response.status_code == 302
+
+        entry = EmailOutbox.query.one()
+        assert entry.kind == 'verification' and entry.status == 'pending'
+        assert entry.recipient == 'pending@example.com'
+        assert entry.subject == 'Verify Your TodoBox Email Address'
+        assert smtp_sink[1]['connections'] == 0
+
+    def test_sharing_invitation_queues(self, app, user, smtp_sink):
+        from app.models import EmailOutbox
+
+        client = app.test_client()
+        client.post('/login', data={'email': 'outbox@example.com', 'password': 'OutboxPass123!'})
+        client.post('/sharing', data={'send_invitation': '1', 'email': 'friend@example.com'})
+
+        entry = EmailOutbox.query.one()
+        assert entry.kind == 'invitation' and entry.recipient == 'friend@example.com'
+        assert entry.user_id == user.id
+        assert smtp_sink[1]['connections'] == 0
+
+
+class TestRetention:
+    """Delivered mail does not keep its body around"""
+
+    def test_sent_body_is_cleared(self, app, smtp_sink):
+        from app.email_service import send_outbox
+
+        entry, = _queue('a@example.com')
+        assert send_outbox() == (1, 0)
+        assert entry.status == 'sent'
+        assert entry.body_text == '' and entry.body_html is None
+        assert len(smtp_sink[1]['messages']) == 1
+
+    def test_failed_body_is_cleared(self, app):
+        from app.email_service import _record_failure
+
+        entry, = _queue('a@example.com')
+        _record_failure(entry, 'refused', permanent=True)
+        assert entry.status == 'failed' and entry.body_text == ''
+
+    def test_cleanup_outbox_cli(self, app):
+        from app import db
+        from app.models import EmailOutbox
+
+        old, recent, pending = _queue('a@example.com', 'b@example.com', 'c@example.com')
+        old.status = recent.status = 'sent'
+        old.created_at = pending.created_at = datetime.utcnow() - timedelta(days=30)
+        db.session.commit()
+
+        result = app.test_cli_runner().invoke(args=['cleanup-outbox'])
+        assert 'Deleted 1 outbox email(s) older than 7 day(s)' in result.output
+        assert {e.recipient for e in EmailOutbox.query} == {'b@example.com', 'c@example.com'}
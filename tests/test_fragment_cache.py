@@ -0,0 +1,179 @@
+"""
+Tests for the rendered todo card cache.
+"""
+import pytest
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.fragment_cache import LRUFragmentCache, FileFragmentCache
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    from app import app, db
+    from app.fragment_cache import reset_fragment_cache
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+    reset_fragment_cache()
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+    reset_fragment_cache()
+
+
+@pytest.fixture
+def auth_client(app):
+    """Create a verified user and log them in."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import db
+    from app.models import User
+
+    user = User(email='cards@example.com', fullname='Cards User')
+    user.set_password('CardsPass123!')
+    user.email_verified = True
+    db.session.add(user)
+    db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'cards@example.com', 'password': 'CardsPass123!'})
+    client.user = user
+    return client
+
+
+def _add_todo(user, name, modified=None):
+    from datetime import datetime
+    from app import db
+    from app.models import Todo, Tracker
+
+    modified = modified or datetime.now()
+    todo = Todo(name=name, details=name, details_html=f'<p>{name} details</p>',
+                user_id=user.id, modified=modified, target_date=modified)
+    db.session.add(todo)
+    db.session.commit()
+    Tracker.add(todo.id, 5, modified)
+    return todo
+
+
+class TestBackends:
+    """Backend storage behaviour"""
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = LRUFragmentCache(maxsize=2)
+        cache.set('a', '1')
+        cache.set('b', '2')
+        cache.get('a')
+        cache.set('c', '3')
+
+        assert cache.get('a') == '1'
+        assert cache.get('b') is None
+        assert cache.get('c') == '3'
+
+    def test_file_backend_round_trip(self, tmp_path):
+        cache = FileFragmentCache(str(tmp_path))
+        assert cache.get('missing') is None
+
+        cache.set('card', '<div>card</div>')
+        assert cache.get('card') == '<div>card</div>'
+
+        # A second instance (another worker) sees the same card
+        assert FileFragmentCache(str(tmp_path)).get('card') == '<div>card</div>'
+
+        cache.clear()
+        assert cache.get('card') is None
+
+    def test_file_backend_prunes_when_full(self, tmp_path):
+        cache = FileFragmentCache(str(tmp_path), max_files=4)
+        for i in range(6):
+            cache.set(f'card{i}', str(i))
+        assert len(os.listdir(tmp_path)) <= 4
+
+
+class TestCardCaching:
+    """Cards are served from cache and refreshed on modification"""
+
+    def test_cached_card_skips_rendering_on_hit(self, app, auth_client):
+        from flask_login import login_user
+        from app.fragment_cache import cached_card
+
+        todo = _add_todo(auth_client.user, 'Cached')
+        calls = []
+
+        def caller():
+            calls.append(1)
+            return '<div>card</div>'
+
+        with app.test_request_context():
+            login_user(auth_client.user)
+            first = cached_card('list', todo, None, 'today', caller=caller)
+            second = cached_card('list', todo, None, 'today', caller=caller)
+
+        assert first == second == '<div>card</div>'
+        assert len(calls) == 1
+
+    def test_edit_invalidates_card(self, app, auth_client):
+        from app import db
+
+        todo = _add_todo(auth_client.user, 'Original')
+        assert b'Original' in auth_client.get('/today/list').data
+
+        todo.name = 'Renamed'
+        todo.details_html = '<p>Renamed details</p>'
+        db.session.commit()
+
+        body = auth_client.get('/today/list').data
+        assert b'Renamed' in body
+        assert b'Renamed details' in body
+        assert b'Original' not in body
+
+    def test_status_change_invalidates_undone_card(self, app, auth_client):
+        from datetime import datetime, timedelta
+        from app.models import Tracker
+
+        todo = _add_todo(auth_client.user, 'Stale', datetime.now() - timedelta(days=5))
+
+        assert b'Stale' in auth_client.get('/undone').data
+
+        Tracker.add(todo.id, 6, todo.modified + timedelta(minutes=1))
+        assert b'Stale' not in auth_client.get('/undone').data
+
+    def test_disabled_backend_renders_directly(self, app, auth_client):
+        from app.fragment_cache import reset_fragment_cache, get_fragment_cache
+
+        app.config['FRAGMENT_CACHE_BACKEND'] = 'none'
+        reset_fragment_cache()
+        try:
+            assert get_fragment_cache() is None
+            _add_todo(auth_client.user, 'Uncached')
+            assert b'Uncached' in auth_client.get('/today/list').data
+        finally:
+            app.config['FRAGMENT_CACHE_BACKEND'] = 'memory'
+
+    def test_file_backend_refused_with_encryption(self, app, tmp_path):
+        from app.fragment_cache import reset_fragment_cache, get_fragment_cache, LRUFragmentCache
+
+        app.config.update(FRAGMENT_CACHE_BACKEND='file', FRAGMENT_CACHE_DIR=str(tmp_path / 'cards'),
+                          TODO_ENCRYPTION_ENABLED=True)
+        reset_fragment_cache()
+        try:
+            assert isinstance(get_fragment_cache(), LRUFragmentCache)
+            assert not (tmp_path / 'cards').exists()
+        finally:
+            app.config.update(FRAGMENT_CACHE_BACKEND='memory', TODO_ENCRYPTION_ENABLED=False)
+            reset_fragment_cache()
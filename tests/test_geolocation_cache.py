@@ -0,0 +1,213 @@
+"""
+Tests for cached timezone detection and the geolocation backends.
+"""
+import pytest
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class CountingBackend:
+    """Backend answering from a dict and counting lookups"""
+    name = 'counting'
+
+    def __init__(self, answers=None, answered=True):
+        self.answers = answers or {}
+        self.answered = answered
+        self.calls = []
+
+    def lookup(self, ip):
+        self.calls.append(ip)
+        return self.answered, self.answers.get(ip)
+
+
+class DictReader:
+    """Stands in for a maxminddb.Reader over a handful of records"""
+
+    def __init__(self, records):
+        self.records = records
+
+    def get(self, ip):
+        return self.records.get(ip)
+
+
+class _IpApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        upstream = self.server.upstream
+        upstream['calls'] += 1
+        body = json.dumps({'status': 'success', 'timezone': 'Europe/Paris', 'countryCode': 'FR'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('X-Rl', str(upstream['remaining']))
+        self.send_header('X-Ttl', '30')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def ip_api():
+    """Local stand-in for ip-api.com"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _IpApiHandler)
+    server.daemon_threads = True
+    server.upstream = {'calls': 0, 'remaining': 44,
+                       'url': f'http://127.0.0.1:{server.server_address[1]}/json/{{ip}}'}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.upstream
+    server.shutdown()
+    server.server_close()
+
+
+class TestTTLCache:
+    """In-memory tier"""
+
+    def test_lru_eviction_and_expiry(self):
+        from app.geolocation import TTLCache
+
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 'UTC', 60)
+        cache.set('b', None, 60)
+        cache.get('a')
+        cache.set('c', 'UTC', 60)
+        assert cache.get('b') == (False, None)  # least recently used
+        assert cache.get('a') == (True, 'UTC')
+
+        cache.set('d', 'UTC', 0)
+        assert cache.get('d') == (False, None)
+
+    def test_network_key(self):
+        from app.geolocation import network_key
+
+        assert network_key('8.8.8.8') == network_key('8.8.8.200') == '8.8.8.0/24'
+        assert network_key('2001:db8:1:2::1') == '2001:db8:1::/48'
+
+
+class TestGeoResolver:
+    """Cache tiers and backend order"""
+
+    def test_same_network_served_from_memory(self):
+        from app.geolocation import GeoResolver, TTLCache
+
+        backend = CountingBackend({'8.8.8.8': 'America/New_York'})
+        resolver = GeoResolver([backend], cache=TTLCache())
+        assert resolver.lookup('8.8.8.8') == 'America/New_York'
+        assert resolver.lookup('8.8.8.9') == 'America/New_York'
+        assert backend.calls == ['8.8.8.8']
+
+    def test_falls_through_to_next_backend(self):
+        from app.geolocation import GeoResolver, TTLCache
+
+        offline = CountingBackend(answered=False)
+        online = CountingBackend({'1.1.1.1': 'Australia/Sydney'})
+        resolver = GeoResolver([offline, online], cache=TTLCache())
+        assert resolver.lookup('1.1.1.1') == 'Australia/Sydney'
+        assert offline.calls == online.calls == ['1.1.1.1']
+
+    def test_unanswered_lookups_not_cached_but_unknown_is(self):
+        from app.geolocation import GeoResolver, TTLCache
+
+        failing = CountingBackend(answered=False)
+        resolver = GeoResolver([failing], cache=TTLCache())
+        resolver.lookup('9.9.9.9')
+        resolver.lookup('9.9.9.9')
+        assert len(failing.calls) == 2
+
+        unknown = CountingBackend()
+        resolver = GeoResolver([unknown], cache=TTLCache())
+        assert resolver.lookup('9.9.9.9') is None
+        assert resolver.lookup('9.9.9.9') is None
+        assert len(unknown.calls) == 1
+
+    def test_sqlite_tier_shared_between_workers(self, tmp_path):
+        from app.geolocation import GeoResolver, SQLiteGeoCache, TTLCache
+
+        path = str(tmp_path / 'geo.sqlite')
+        first = CountingBackend({'8.8.8.8': 'America/New_York'})
+        GeoResolver([first], cache=TTLCache(), store=SQLiteGeoCache(path)).lookup('8.8.8.8')
+
+        second = CountingBackend()
+        resolver = GeoResolver([second], cache=TTLCache(), store=SQLiteGeoCache(path))
+        assert resolver.lookup('8.8.8.8') == 'America/New_York'
+        assert second.calls == []
+
+    def test_build_resolver_order(self, tmp_path):
+        from app.geolocation import build_resolver, IpApiBackend, MMDBBackend
+
+        resolver = build_resolver({'GEOIP_BACKENDS': 'ip-api, mmdb', 'GEOIP_MMDB_PATH': '/data/City.mmdb'})
+        assert [type(b) for b in resolver.backends] == [IpApiBackend, MMDBBackend]
+
+        # mmdb without a database path is left out
+        resolver = build_resolver({'GEOIP_BACKENDS': 'mmdb,ip-api', 'GEOIP_CACHE_FILE': 'geo.sqlite'}, str(tmp_path))
+        assert [type(b) for b in resolver.backends] == [IpApiBackend]
+        assert resolver.store.path == str(tmp_path / 'geo.sqlite')
+
+
+class TestBackends:
+    """MaxMind database and ip-api.com"""
+
+    def test_mmdb_record_mapping(self):
+        from app.geolocation import MMDBBackend
+
+        backend = MMDBBackend('City.mmdb', reader=DictReader({
+            '81.2.69.142': {'location': {'time_zone': 'Europe/London'}, 'country': {'iso_code': 'GB'}},
+            '175.16.199.1': {'country': {'iso_code': 'MY'}},
+        }))
+        assert backend.lookup('81.2.69.142') == (True, 'Europe/London')
+        assert backend.lookup('175.16.199.1') == (True, 'Asia/Kuala_Lumpur')
+        assert backend.lookup('8.8.8.8') == (True, None)
+
+    def test_mmdb_unavailable_passes(self, tmp_path):
+        from app.geolocation import MMDBBackend
+
+        assert MMDBBackend(str(tmp_path / 'missing.mmdb')).lookup('8.8.8.8') == (False, None)
+
+    def test_mmdb_real_reader(self):
+        pytest.importorskip('maxminddb')
+        path = os.environ.get('GEOIP_TEST_MMDB')
+        if not path:
+            pytest.skip('GEOIP_TEST_MMDB not set')
+        from app.geolocation import MMDBBackend
+
+        answered, _ = MMDBBackend(path).lookup('8.8.8.8')
+        assert answered
+
+    def test_ip_api_rate_limit_header_backs_off(self, ip_api):
+        from app.geolocation import IpApiBackend
+
+        backend = IpApiBackend(url=ip_api['url'])
+        assert backend.lookup('8.8.8.8') == (True, 'Europe/Paris')
+
+        ip_api['remaining'] = 0
+        backend.lookup('8.8.4.4')
+        assert backend.lookup('1.1.1.1') == (False, None)
+        assert ip_api['calls'] == 2
+
+
+class TestDetectTimezone:
+    """detect_timezone_from_ip uses the app's resolver"""
+
+    def test_app_resolver_used_and_cached(self):
+        from app import app
+        from app.geolocation import GeoResolver, TTLCache, detect_timezone_from_ip
+
+        backend = CountingBackend({'8.8.8.8': 'America/New_York'})
+        saved = app.extensions['geolocation']
+        app.extensions['geolocation'] = GeoResolver([backend], cache=TTLCache())
+        try:
+            for _ in range(3):
+                with app.test_request_context(environ_base={'REMOTE_ADDR': '8.8.8.8'}):
+                    assert detect_timezone_from_ip() == 'America/New_York'
+            with app.test_request_context(environ_base={'REMOTE_ADDR': '172.16.0.5'}):
+                assert detect_timezone_from_ip() is None
+        finally:
+            app.extensions['geolocation'] = saved
+        assert backend.calls == ['8.8.8.8']
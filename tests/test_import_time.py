@@ -0,0 +1,69 @@
+"""
+Import-time budget: ``import app`` is what every worker and CLI command pays
+on start, so heavy optional modules must stay out of it.
+
+The budget can be raised on slow machines with IMPORT_TIME_BUDGET_MS.
+"""
+import pytest
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative 'import app' time under -X importtime (about 550 ms on a dev laptop)
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', '1200'))
+
+# Imported on first use by the code paths that need them
+DEFERRED_MODULES = [
+    'alembic', 'flask_migrate',        # `flask db` only
+    'requests', 'google.auth.jwt',     # outbound HTTP, Google sign-in
+    'markdown', 'bleach',              # first markdown render
+    'smtplib', 'email.mime.text',      # outbox delivery
+    'cProfile', 'pstats',              # armed profiler
+]
+
+
+def _import_app():
+    """{module: cumulative microseconds} for a fresh ``import app``"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and 'cumulative' not in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.fixture(scope='module')
+def import_times():
+    # Best of two runs, so a busy machine does not fail the budget
+    runs = [_import_app() for _ in range(2)]
+    return min(runs, key=lambda times: times['app'])
+
+
+def test_heavy_modules_deferred(import_times):
+    assert [name for name in DEFERRED_MODULES if name in import_times] == []
+
+
+def test_import_budget(import_times):
+    elapsed_ms = import_times['app'] / 1000
+    slowest = sorted(import_times.items(), key=lambda item: -item[1])[1:8]
+    assert elapsed_ms <= IMPORT_TIME_BUDGET_MS, (
+        f'import app took {elapsed_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms); slowest: '
+        + ', '.join(f'{name} {micros / 1000:.0f} ms' for name, micros in slowest))
+
+
+def test_deferred_modules_load_on_use():
+    code = ('import sys, app\n'
+            'from app.markdown_render import render_markdown\n'
+            'from app import http_client\n'
+            'assert "markdown" not in sys.modules\n'
+            'assert render_markdown("**x**") == "<p><strong>x</strong></p>"\n'
+            'assert http_client.session.headers["User-Agent"] == "TodoBox/1.0"\n'
+            'assert "requests" in sys.modules and "markdown" in sys.modules\n')
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
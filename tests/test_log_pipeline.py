@@ -0,0 +1,186 @@
+"""
+Tests for the queue-backed JSON logging pipeline and request-id correlation.
+"""
+import pytest
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """A second pipeline writing JSON lines to a file; returns a reader for them"""
+    from app.log_pipeline import LogPipeline
+
+    path = tmp_path / 'app.log'
+    pipeline = LogPipeline()
+    pipeline.configure(level=logging.getLogger().level, filename=str(path), sample_rates={'test.sampled': 0.0})
+
+    def read():
+        pipeline.stop()  # flushes the queue
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    yield read
+    pipeline.stop()
+
+
+def _record(name='test', level=logging.INFO, msg='hello %s', args=('world',)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class TestRequestIds:
+    """X-Request-ID assignment and correlation"""
+
+    def test_lines_carry_request_id(self, app, log_file):
+        with app.test_request_context('/today/list', headers={'X-Request-ID': 'abc-123'}):
+            app.preprocess_request()
+            logging.getLogger('test.view').warning('Handled %s', 'thing', extra={'todo_id': 7})
+            response = app.process_response(app.make_response('ok'))
+        assert response.headers['X-Request-ID'] == 'abc-123'
+
+        lines = [line for line in log_file() if line['logger'] == 'test.view']
+        assert lines == [{**lines[0], 'level': 'WARNING', 'message': 'Handled thing',
+                          'request_id': 'abc-123', 'todo_id': 7}]
+
+    def test_invalid_header_replaced(self, app):
+        response = app.test_client().get('/login', headers={'X-Request-ID': 'bad id <script>'})
+        request_id = response.headers['X-Request-ID']
+        assert len(request_id) == 32 and request_id.isalnum()
+
+    def test_outside_request(self, log_file):
+        logging.getLogger('test.worker').warning('Background job done')
+        assert [line['request_id'] for line in log_file() if line['logger'] == 'test.worker'] == [None]
+
+
+class TestSampling:
+    """Per-logger sampling"""
+
+    def test_rates_apply_to_children_and_spare_warnings(self):
+        from app.log_pipeline import SamplingFilter
+
+        sampler = SamplingFilter({'app.reminders.poll': 0.0, 'app.reminders': 1.0})
+        assert not sampler.filter(_record('app.reminders.poll'))
+        assert not sampler.filter(_record('app.reminders.poll.user'))
+        assert sampler.filter(_record('app.reminders.poll', logging.WARNING))
+        assert sampler.filter(_record('app.reminders'))
+        assert sampler.filter(_record('app.routes'))
+
+    def test_kept_records_note_rate(self, monkeypatch):
+        from app import log_pipeline
+
+        monkeypatch.setattr(log_pipeline.random, 'random', lambda: 0.001)
+        record = _record('app.reminders.poll')
+        assert log_pipeline.SamplingFilter({'app.reminders.poll': 0.01}).filter(record)
+        assert record.sample_rate == 0.01
+
+    def test_parse(self):
+        from app.log_pipeline import parse_sample_rates
+
+        assert parse_sample_rates(' app.reminders.poll=0.01, app.request_timing=0.5') == {
+            'app.reminders.poll': 0.01, 'app.request_timing': 0.5}
+        assert parse_sample_rates('') == {}
+        with pytest.raises(ValueError):
+            parse_sample_rates('app.routes=2')
+
+    def test_sampled_logger_dropped_end_to_end(self, log_file):
+        logging.getLogger('test.sampled').info('Poll')
+        logging.getLogger('test.kept').warning('Kept')
+        assert {line['logger'] for line in log_file()} & {'test.sampled', 'test.kept'} == {'test.kept'}
+
+
+class TestNonBlocking:
+    """Hot paths never wait on the log output"""
+
+    def test_full_queue_drops(self):
+        from app.log_pipeline import AsyncQueueHandler
+
+        handler = AsyncQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(_record())
+        handler.handle(_record())
+        assert handler.dropped == 1
+
+    def test_record_prepared_for_other_thread(self):
+        from app.log_pipeline import AsyncQueueHandler
+
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = logging.LogRecord('test', logging.ERROR, __file__, 1, 'Failed %s', ('job',), sys.exc_info())
+        record.todo_id = 7
+        prepared = AsyncQueueHandler(queue.Queue()).prepare(record)
+        assert (prepared.msg, prepared.args, prepared.exc_info) == ('Failed job', None, None)
+        assert 'ValueError: boom' in prepared.exc_text and prepared.todo_id == 7
+
+    def test_disabled_level_is_not_formatted(self):
+        class Expensive:
+            def __str__(self):
+                raise AssertionError('formatted a disabled debug message')
+
+        logger = logging.getLogger('test.lazy')
+        logger.setLevel(logging.INFO)
+        try:
+            logger.debug('Form data: %s', Expensive())
+        finally:
+            logger.setLevel(logging.NOTSET)
+
+
+class TestInstall:
+    """Only a serving app takes over root logging"""
+
+    def test_import_leaves_root_logging_alone(self):
+        code = ('import logging, logging.handlers, app\n'
+                'root = logging.getLogger()\n'
+                'assert root.level == logging.WARNING, root.level\n'
+                'assert not any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers)\n')
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr[-2000:]
+
+    def test_first_request_installs_pipeline(self, app, tmp_path, monkeypatch):
+        from app.log_pipeline import pipeline
+
+        hook = next(f for f in app.before_request_funcs[None] if f.__name__ == 'install_log_pipeline')
+        with app.test_request_context('/'):
+            hook()
+            assert not pipeline.installed  # tests keep pytest's logging
+
+            monkeypatch.setitem(app.config, 'TESTING', False)
+            monkeypatch.setitem(app.config, 'LOG_FILE', str(tmp_path / 'app.log'))
+            level = logging.getLogger().level
+            try:
+                hook()
+                assert pipeline.handler in logging.getLogger().handlers
+            finally:
+                pipeline.stop()
+                logging.getLogger().setLevel(level)
@@ -0,0 +1,88 @@
+"""
+Tests for cached markdown rendering and the shared HTML policies.
+"""
+import pytest
+import os
+import sys
+import threading
+
+import markdown
+from bleach import clean
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def renderer():
+    """markdown_render with an empty cache"""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import markdown_render
+
+    markdown_render.configure(64)
+    yield markdown_render
+    markdown_render.configure(1024)
+
+
+class TestRendering:
+    """Output matches the old markdown() + clean() path"""
+
+    @pytest.mark.parametrize('text', [
+        '**bold** and ~~gone~~',
+        '```\ncode <b>\n```',
+        '<script>alert(1)</script>',
+        '[x](javascript:alert(1)) ![img](/a.png)',
+    ])
+    def test_details_policy(self, renderer, text):
+        from app.html_policy import DETAILS_ATTRIBUTES, DETAILS_TAGS
+
+        expected = clean(markdown.markdown(text, extensions=['fenced_code', 'pymdownx.tilde']),
+                         tags=DETAILS_TAGS, attributes=DETAILS_ATTRIBUTES)
+        assert renderer.render_markdown(text) == expected
+        assert '<script>' not in expected and 'javascript:' not in expected
+
+    def test_page_policy_allows_tables_and_images(self, renderer):
+        text = '| a |\n|---|\n| b |\n\n![logo](/logo.png)'
+        html = renderer.render_markdown(text, policy='page')
+        assert '<table>' in html and '<img alt="logo" src="/logo.png">' in html
+        assert '<img' not in renderer.render_markdown(text)
+
+    def test_converter_reset_between_documents(self, renderer):
+        renderer.render_markdown('[ref]: https://example.com\n\nfirst')
+        assert 'href' not in renderer.render_markdown('[link][ref]')
+
+    def test_empty(self, renderer):
+        assert renderer.render_markdown('') == ''
+        assert renderer.render_markdown(None) == ''
+
+
+class TestCache:
+    """Rendered HTML is reused"""
+
+    def test_hit_skips_rendering(self, renderer, monkeypatch):
+        calls = []
+        real = renderer._render
+        monkeypatch.setattr(renderer, '_render', lambda text, policy: calls.append(text) or real(text, policy))
+
+        first = renderer.render_markdown('*same*')
+        assert renderer.render_markdown('*same*') == first
+        renderer.render_markdown('*same*', policy='page')
+        assert calls == ['*same*', '*same*']
+
+    def test_disabled(self, renderer, monkeypatch):
+        renderer.configure(0)
+        calls = []
+        monkeypatch.setattr(renderer, '_render', lambda text, policy: calls.append(text) or '')
+        renderer.render_markdown('x')
+        renderer.render_markdown('x')
+        assert len(calls) == 2
+
+    def test_converters_per_thread(self, renderer):
+        mine = renderer._renderer('details')
+        other = []
+        thread = threading.Thread(target=lambda: other.append(renderer._renderer('details')))
+        thread.start()
+        thread.join()
+        assert renderer._renderer('details') is mine and other[0][0] is not mine[0]
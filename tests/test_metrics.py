@@ -0,0 +1,190 @@
+"""
+Tests for the /metrics endpoint and multiprocess metric aggregation.
+"""
+import pytest
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['METRICS_TOKEN'] = 'scrape-token'
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+    app.config['METRICS_TOKEN'] = ''
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client for the application."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    return app.test_client()
+
+
+@pytest.fixture
+def metrics_dir(tmp_path):
+    """Point the registry at an isolated shared directory"""
+    from app.metrics import REGISTRY
+
+    previous = REGISTRY.directory
+    REGISTRY.directory = str(tmp_path)
+    yield tmp_path
+    REGISTRY.directory = previous
+
+
+def _scrape(client, token='scrape-token'):
+    return client.get('/metrics', headers={'Authorization': f'Bearer {token}'})
+
+
+class TestMetricsEndpoint:
+    """Authentication and exposition format"""
+
+    def test_requires_token(self, client):
+        assert client.get('/metrics').status_code == 401
+        assert _scrape(client, 'wrong').status_code == 401
+
+    def test_text_exposition(self, client, metrics_dir):
+        client.get('/healthz')
+        response = _scrape(client)
+
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        body = response.get_data(as_text=True)
+        assert '# TYPE todobox_request_duration_seconds histogram' in body
+        assert 'todobox_request_duration_seconds_bucket{endpoint="healthz",method="GET",le="+Inf"}' in body
+        assert '# TYPE todobox_reminders_pending gauge' in body
+        assert 'todobox_reminders_pending 0' in body
+
+    def test_admin_api_token_accepted(self, app, client, metrics_dir):
+        from app import db
+        from app.models import User
+
+        admin = User(email='admin@example.com')
+        admin.is_admin = True
+        admin.api_token = 'admin-token'
+        regular = User(email='user@example.com')
+        regular.api_token = 'user-token'
+        db.session.add_all([admin, regular])
+        db.session.commit()
+
+        assert _scrape(client, 'admin-token').status_code == 200
+        assert _scrape(client, 'user-token').status_code == 401
+
+
+class TestAggregation:
+    """Values from other workers are merged into the scrape"""
+
+    def _write_worker(self, directory, pid, values=(), histograms=()):
+        with open(os.path.join(directory, f'metrics_{pid}.json'), 'w') as fh:
+            json.dump({'pid': pid, 'values': list(values), 'histograms': list(histograms)}, fh)
+
+    def test_counters_and_histograms_sum_across_workers(self, metrics_dir):
+        from app import metrics
+
+        metrics.ENCRYPTION_OPS.inc(op='test-op')
+        local = metrics.REGISTRY.values[('todobox_encryption_operations_total', ('test-op',))]
+        buckets = len(metrics.JOB_DURATION.buckets)
+        self._write_worker(
+            metrics_dir, 999999,
+            values=[['todobox_encryption_operations_total', ['test-op'], 5]],
+            histograms=[['todobox_job_duration_seconds', ['test-job'], [1] * buckets + [0.5, 1]]],
+        )
+
+        values, histograms = metrics.collect()
+        assert values[('todobox_encryption_operations_total', ('test-op',))] == local + 5
+        assert histograms[('todobox_job_duration_seconds', ('test-job',))][-1] >= 1
+
+    def test_gauges_from_dead_workers_are_dropped(self, metrics_dir):
+        from app import metrics
+
+        self._write_worker(metrics_dir, 999999, values=[['todobox_db_pool_connections_in_use', [], 7]])
+        self._write_worker(metrics_dir, os.getppid(), values=[['todobox_db_pool_connections_in_use', [], 2]])
+        local = metrics.REGISTRY.values.get(('todobox_db_pool_connections_in_use', ()), 0)
+
+        values, _ = metrics.collect()
+        assert values[('todobox_db_pool_connections_in_use', ())] == local + 2
+
+    def test_dead_worker_files_are_archived(self, metrics_dir):
+        from app import metrics
+
+        self._write_worker(metrics_dir, 999999, values=[
+            ['todobox_encryption_operations_total', ['archived-op'], 5],
+            ['todobox_db_pool_connections_in_use', [], 7],
+        ])
+        first, _ = metrics.collect()
+        assert not (metrics_dir / 'metrics_999999.json').exists()
+        assert (metrics_dir / metrics.ARCHIVE_FILE).exists()
+
+        second, _ = metrics.collect()
+        key = ('todobox_encryption_operations_total', ('archived-op',))
+        assert first[key] == second[key] == metrics.REGISTRY.values.get(key, 0) + 5
+        archived = json.loads((metrics_dir / metrics.ARCHIVE_FILE).read_text())
+        assert [v[0] for v in archived['values']] == ['todobox_encryption_operations_total']
+
+    def test_import_writes_no_file(self, tmp_path):
+        import subprocess
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, METRICS_DIR=str(tmp_path / 'metrics'), LOG_PIPELINE_ENABLED='false')
+        subprocess.run([sys.executable, '-c', 'import app'], cwd=root, env=env, check=True,
+                       capture_output=True, timeout=120)
+        assert not (tmp_path / 'metrics').exists()
+
+    def test_flush_writes_worker_file(self, metrics_dir):
+        from app import metrics
+
+        metrics.flush()
+        with open(os.path.join(metrics_dir, f'metrics_{os.getpid()}.json')) as fh:
+            assert json.load(fh)['pid'] == os.getpid()
+
+
+class TestHotPathCounters:
+    """Instrumented call sites update their metrics"""
+
+    def test_smtp_failure_is_counted(self):
+        from app import metrics
+
+        key = ('todobox_smtp_failures_total', ('test',))
+        before = metrics.REGISTRY.values.get(key, 0)
+        with pytest.raises(OSError):
+            with metrics.track_smtp('test'):
+                raise OSError('connection refused')
+        assert metrics.REGISTRY.values[key] == before + 1
+
+    def test_reminder_polls_counted_on_304(self, app, client):
+        from app import db, metrics
+        from app.models import User
+
+        user = User(email='poll@example.com')
+        user.set_password('PollPass123!')
+        user.email_verified = True
+        db.session.add(user)
+        db.session.commit()
+        client.post('/login', data={'email': 'poll@example.com', 'password': 'PollPass123!'})
+
+        key = ('todobox_reminder_polls_total', ())
+        before = metrics.REGISTRY.values.get(key, 0)
+        etag = client.get('/api/reminders/check').headers['ETag']
+        assert client.get('/api/reminders/check', headers={'If-None-Match': etag}).status_code == 304
+        assert metrics.REGISTRY.values[key] == before + 2
@@ -0,0 +1,241 @@
+"""
+Tests for cached Google sign-in metadata.
+
+Google is replaced by a local identity provider serving a discovery
+document, PEM signing certificates and a token endpoint that returns ID
+tokens signed with a throwaway RSA key.
+"""
+import pytest
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CLIENT_ID = 'todobox-test-client'
+
+
+def _signing_key(key_id):
+    """An RSA signer and its self-signed certificate in PEM"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    from google.auth import crypt
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'stub-idp')])
+    now = datetime.now(timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now - timedelta(days=1))
+            .not_valid_after(now + timedelta(days=1)).sign(key, hashes.SHA256()))
+    private_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                    serialization.NoEncryption())
+    signer = crypt.RSASigner.from_string(private_pem, key_id=key_id)
+    return signer, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class _IdPHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.idp['connections'] += 1
+
+    def _reply(self, status, payload, cache_control=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if cache_control:
+            self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        idp = self.server.idp
+        idp['calls'].append(self.path)
+        if idp['status'] != 200:
+            self._reply(idp['status'], {'error': 'unavailable'})
+        elif self.path == '/.well-known/openid-configuration':
+            self._reply(200, {'issuer': idp['base'], 'authorization_endpoint': idp['base'] + '/auth',
+                              'token_endpoint': idp['base'] + '/token'}, idp['cache_control'])
+        else:
+            self._reply(200, {key_id: cert for key_id, (_, cert) in idp['keys'].items()}, idp['cache_control'])
+
+    def do_POST(self):
+        from google.auth import jwt
+
+        idp = self.server.idp
+        idp['calls'].append(self.path)
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        now = int(time.time())
+        signer = idp['keys'][idp['signing_key']][0]
+        token = jwt.encode(signer, {'iss': idp['base'], 'aud': CLIENT_ID, 'sub': 'google-42', 'iat': now,
+                                    'exp': now + 300, 'email': 'oidc@example.com', 'name': 'Stub User'})
+        self._reply(200, {'access_token': 'access', 'id_token': token.decode()})
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def keys():
+    return {'key-1': _signing_key('key-1'), 'key-2': _signing_key('key-2')}
+
+
+@pytest.fixture
+def idp(keys):
+    """Local stand-in for Google's OpenID endpoints"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _IdPHandler)
+    server.daemon_threads = True
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    server.idp = {'base': base, 'calls': [], 'connections': 0, 'status': 200,
+                  'cache_control': 'public, max-age=3600', 'keys': {'key-1': keys['key-1']},
+                  'signing_key': 'key-1'}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.idp
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def provider(idp):
+    from app.oauth import OIDCProvider
+
+    provider = OIDCProvider()
+    provider.configure({'GOOGLE_DISCOVERY_URL': idp['base'] + '/.well-known/openid-configuration',
+                        'GOOGLE_CERTS_URL': idp['base'] + '/certs', 'OAUTH_HTTP_TIMEOUT': 2})
+    yield provider
+    provider.stop()
+
+
+@pytest.fixture
+def app(provider):
+    """Create a test application signing in against the stub provider."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import app, db
+    import app.oauth as oauth
+
+    saved = {key: app.config.get(key) for key in ('GOOGLE_CLIENT_ID', 'GOOGLE_CLIENT_SECRET')}
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config.update(GOOGLE_CLIENT_ID=CLIENT_ID, GOOGLE_CLIENT_SECRET='secret')
+    default_provider, oauth.google_provider = oauth.google_provider, provider
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+    oauth.google_provider = default_provider
+    app.config.update(saved)
+
+
+class TestCacheLifetime:
+    """Cache-Control / Expires handling"""
+
+    def test_headers(self):
+        from app.oauth import cache_lifetime
+
+        assert cache_lifetime({'Cache-Control': 'public, max-age=19800, must-revalidate'}, 60) == 19800
+        assert cache_lifetime({'Cache-Control': 'max-age=300', 'Age': '100'}, 60) == 200
+        assert cache_lifetime({'Cache-Control': 's-maxage=300'}, 60) == 60
+        assert cache_lifetime({'Cache-Control': 'no-cache, no-store, max-age=0'}, 60) == 0
+        assert cache_lifetime({'Date': 'Mon, 19 Oct 2026 10:00:00 GMT',
+                               'Expires': 'Mon, 19 Oct 2026 11:00:00 GMT'}, 60) == 3600
+        assert cache_lifetime({'Expires': '0'}, 60) == 0
+        assert cache_lifetime({}, 60) == 60
+
+
+class TestCachedDocuments:
+    """Discovery document and certificates"""
+
+    def test_reused_while_fresh(self, provider, idp):
+        for _ in range(3):
+            assert provider.config()['token_endpoint'] == idp['base'] + '/token'
+        assert idp['calls'] == ['/.well-known/openid-configuration']
+
+    def test_uncacheable_document_refetched(self, provider, idp):
+        idp['cache_control'] = 'no-store'
+        provider.config()
+        provider.config()
+        assert len(idp['calls']) == 2
+
+    def test_stale_copy_served_when_provider_down(self, provider, idp):
+        provider.config()
+        provider.discovery.expires_at = 0
+        idp['status'] = 503
+        assert provider.config()['issuer'] == idp['base']
+        provider.config()  # not retried straight away
+        assert len(idp['calls']) == 2
+
+    def test_connections_are_pooled(self, provider, idp):
+        idp['cache_control'] = 'no-store'
+        for _ in range(5):
+            provider.config()
+        assert idp['connections'] == 1
+
+    def test_background_refresh_before_expiry(self, provider, idp):
+        idp['cache_control'] = 'max-age=2'
+        provider.start()
+        deadline = time.time() + 5
+        while idp['calls'].count('/certs') < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        assert idp['calls'].count('/certs') >= 2
+        # Requests are still served from memory
+        assert provider.certs.fresh
+
+
+class TestGoogleLogin:
+    """generate_google_auth_url() and process_google_callback()"""
+
+    def test_warm_login_only_exchanges_the_code(self, app, provider, idp):
+        from app.models import User
+        from app.oauth import generate_google_auth_url, process_google_callback
+
+        provider.config()
+        provider.certs.get()
+        del idp['calls'][:]
+
+        with app.test_request_context('/auth/callback/google', environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+            assert generate_google_auth_url().startswith(idp['base'] + '/auth?client_id=' + CLIENT_ID)
+            user, is_new = process_google_callback('auth-code')
+
+        assert is_new and user.email == 'oidc@example.com' and user.oauth_id == 'google-42'
+        assert User.query.filter_by(email='oidc@example.com').count() == 1
+        assert idp['calls'] == ['/token']
+
+    def test_rotated_key_refreshes_certificates_once(self, app, provider, idp, keys):
+        from app.oauth import process_google_callback
+
+        provider.certs.get()
+        idp['keys'] = {'key-1': keys['key-1'], 'key-2': keys['key-2']}
+        idp['signing_key'] = 'key-2'
+
+        with app.test_request_context('/auth/callback/google', environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+            user, _ = process_google_callback('auth-code')
+            assert user is not None
+            process_google_callback('auth-code')
+        assert idp['calls'].count('/certs') == 2
+
+    def test_token_for_another_client_rejected(self, app, idp):
+        from app.oauth import process_google_callback
+
+        app.config['GOOGLE_CLIENT_ID'] = 'someone-else'
+        with app.test_request_context('/auth/callback/google', environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+            assert process_google_callback('auth-code') == (None, False)
@@ -0,0 +1,128 @@
+"""
+Tests for the admin-triggered request profiler.
+"""
+import pytest
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Create and configure a test application instance."""
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['PROFILER_DIR'] = str(tmp_path)
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+    # Requests push their own app context so the logged-in user is not shared
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+    app.config['PROFILER_DIR'] = ''
+
+
+def _login(app, email, admin=False):
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import db
+    from app.models import User
+
+    with app.app_context():
+        user = User(email=email)
+        user.set_password('ProfilePass123!')
+        user.email_verified = True
+        user.is_admin = admin
+        db.session.add(user)
+        db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': 'ProfilePass123!'})
+    return client
+
+
+@pytest.fixture
+def admin_client(app):
+    return _login(app, 'admin@example.com', admin=True)
+
+
+def _prof_files(directory):
+    return sorted(f for f in os.listdir(directory) if f.endswith('.prof'))
+
+
+class TestProfiler:
+    """Arming, capture and download"""
+
+    def test_captures_next_n_matching_requests(self, app, admin_client, tmp_path):
+        response = admin_client.post('/admin/profiler/arm', data={'count': 2, 'path_prefix': '/healthz'})
+        assert response.status_code == 302
+
+        admin_client.get('/today/list')  # does not match the path prefix
+        assert _prof_files(tmp_path) == []
+
+        for _ in range(3):
+            admin_client.get('/healthz')
+
+        files = _prof_files(tmp_path)
+        assert len(files) == 2
+        assert all('_healthz_' in f for f in files)
+        assert not os.path.exists(tmp_path / 'armed.json')
+
+    def test_user_filter(self, app, admin_client, tmp_path):
+        other = _login(app, 'slow@example.com')
+        admin_client.post('/admin/profiler/arm', data={'count': 1, 'user_email': 'slow@example.com'})
+
+        admin_client.get('/dashboard')
+        assert _prof_files(tmp_path) == []
+
+        other.get('/dashboard')
+        files = _prof_files(tmp_path)
+        assert len(files) == 1 and '_dashboard_' in files[0]
+
+    def test_listed_and_downloadable(self, app, admin_client, tmp_path):
+        admin_client.post('/admin/profiler/arm', data={'count': 1, 'path_prefix': '/healthz'})
+        admin_client.get('/healthz')
+        name = _prof_files(tmp_path)[0]
+
+        page = admin_client.get('/admin/profiler')
+        assert name.encode() in page.data
+
+        download = admin_client.get(f'/admin/profiler/{name}')
+        assert download.status_code == 200
+        assert 'attachment' in download.headers['Content-Disposition']
+
+        summary = admin_client.get('/admin/profiler/' + name.replace('.prof', '.txt'))
+        assert b'GET /healthz' in summary.data
+
+    def test_disarm(self, app, admin_client, tmp_path):
+        admin_client.post('/admin/profiler/arm', data={'count': 5, 'path_prefix': '/healthz'})
+        admin_client.post('/admin/profiler/disarm')
+        admin_client.get('/healthz')
+        assert _prof_files(tmp_path) == []
+
+    def test_invalid_count_rejected(self, app, admin_client, tmp_path):
+        admin_client.post('/admin/profiler/arm', data={'count': 0})
+        assert not os.path.exists(tmp_path / 'armed.json')
+
+    def test_download_rejects_other_files(self, app, admin_client, tmp_path):
+        admin_client.post('/admin/profiler/arm', data={'count': 1, 'path_prefix': '/nowhere'})
+        assert admin_client.get('/admin/profiler/armed.json').status_code == 404
+        assert admin_client.get('/admin/profiler/../config.py').status_code == 404
+
+    def test_non_admin_cannot_arm(self, app, tmp_path):
+        client = _login(app, 'user@example.com')
+        client.post('/admin/profiler/arm', data={'count': 1})
+        assert not os.path.exists(tmp_path / 'armed.json')
@@ -0,0 +1,148 @@
+"""
+Tests for the background-refreshed quote pool.
+
+The quote API is replaced by a local HTTP server whose responses each test
+controls.
+"""
+import pytest
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _QuoteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        upstream = self.server.upstream
+        upstream['calls'] += 1
+        time.sleep(upstream['delay'])
+        body = json.dumps(upstream['body']).encode()
+        self.send_response(upstream['status'])
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    """Local stand-in for the ZenQuotes API"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _QuoteHandler)
+    server.daemon_threads = True
+    server.upstream = {
+        'calls': 0, 'delay': 0, 'status': 200,
+        'body': [{'q': 'Quote one', 'a': 'Alice'}, {'q': 'Quote two', 'a': 'Bob'}],
+        'url': f'http://127.0.0.1:{server.server_address[1]}/api/quotes',
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.upstream
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(upstream, tmp_path):
+    from app.quote_service import QuoteService
+
+    service = QuoteService()
+    service.configure({'QUOTE_API_URL': upstream['url'], 'QUOTE_FETCH_TIMEOUT': 2,
+                       'QUOTE_BREAKER_THRESHOLD': 2, 'QUOTE_BREAKER_COOLDOWN': 60}, str(tmp_path))
+    yield service
+    service.stop()
+
+
+class TestQuoteService:
+    """Pool refresh, persistence and fallback"""
+
+    def test_serves_local_quotes_until_refreshed(self, service):
+        from app.quote_service import LOCAL_QUOTES
+
+        assert service.get_quote()['quote'] in LOCAL_QUOTES
+
+        assert service.refresh() == 2
+        quote = service.get_quote()
+        assert quote in ({'quote': 'Quote one', 'author': 'Alice'}, {'quote': 'Quote two', 'author': 'Bob'})
+        assert not service.is_stale()
+
+    def test_pool_persisted_for_restart(self, service, upstream, tmp_path):
+        from app.quote_service import QuoteService
+
+        service.refresh()
+        restarted = QuoteService()
+        restarted.configure({'QUOTE_API_URL': upstream['url']}, str(tmp_path))
+        assert restarted.load()
+        assert restarted.size == 2 and not restarted.is_stale()
+
+    def test_rate_limit_response_is_a_failure(self, service, upstream):
+        upstream['body'] = [{'q': 'Too many requests. Obtain an auth key for unlimited access.', 'a': 'zenquotes.io'}]
+        assert service.refresh() is None
+        assert service.size == 0
+
+    def test_breaker_opens_after_consecutive_failures(self, service, upstream):
+        upstream['status'] = 500
+        assert service.refresh() is None
+        assert service.refresh() is None
+        assert service.breaker.state == 'open'
+
+        upstream['status'] = 200
+        assert service.refresh() is None  # not attempted while open
+        assert upstream['calls'] == 2
+
+        service.breaker.opened_at -= 61
+        assert service.breaker.state == 'half-open'
+        assert service.refresh() == 2
+        assert service.breaker.state == 'closed'
+
+    def test_failed_trial_reopens(self, service, upstream):
+        upstream['status'] = 503
+        service.refresh()
+        service.refresh()
+        service.breaker.opened_at -= 61
+        assert service.refresh() is None
+        assert service.breaker.state == 'open'
+
+    def test_get_never_waits_for_slow_upstream(self, service, upstream):
+        upstream['delay'] = 1
+        service.start()
+        time.sleep(0.1)  # refresh now in flight
+
+        started = time.perf_counter()
+        service.get_quote()
+        assert time.perf_counter() - started < 0.05
+
+        deadline = time.time() + 5
+        while service.size == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        assert service.size == 2
+
+
+class TestQuoteRoute:
+    """/api/quote"""
+
+    def test_route_serves_from_pool(self, upstream):
+        import werkzeug
+        if not hasattr(werkzeug, '__version__'):
+            werkzeug.__version__ = '3.0.0'
+        from app import app
+        from app.quote_service import quotes
+
+        app.config['TESTING'] = True
+        saved_url, saved_path = quotes.url, quotes.path
+        quotes.url, quotes.path = upstream['url'], None
+        try:
+            quotes.refresh()
+            data = app.test_client().get('/api/quote').get_json()
+            assert data['quote'] in ('Quote one', 'Quote two') and data['author'] in ('Alice', 'Bob')
+            assert upstream['calls'] == 1
+        finally:
+            quotes.url, quotes.path = saved_url, saved_path
+            quotes.reset()
@@ -0,0 +1,159 @@
+"""
+Tests for batched reminder state updates.
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    from app import app, db
+    from app.reminder_scheduler import scheduler
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+        scheduler.reset()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+        scheduler.reset()
+
+
+@pytest.fixture
+def user(app):
+    """Create a verified user."""
+    from app import db
+    from app.models import User
+
+    user = User(email='batch@example.com')
+    user.set_password('BatchPass123!')
+    user.email_verified = True
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _add_due(user, count=1):
+    from app import db
+    from app.models import Todo
+
+    due = datetime.utcnow() - timedelta(minutes=1)
+    db.session.execute(Todo.__table__.insert(), [{
+        'name': f'Reminder {i}', 'user_id': user.id, 'reminder_enabled': True, 'reminder_sent': False,
+        'reminder_time': due, 'reminder_notification_count': 0, 'reminder_next_fire_at': due,
+    } for i in range(count)])
+    db.session.commit()
+    return [row[0] for row in db.session.query(Todo.id).filter(Todo.user_id == user.id).order_by(Todo.id)]
+
+
+class TestMarkRemindersSent:
+    """State transitions and statement count"""
+
+    def test_burst_uses_one_update_per_chunk(self, app, user):
+        from app import db
+        from app.models import Todo
+        from app.reminder_service import ReminderService, BATCH_SIZE
+        from sqlalchemy import event
+
+        todo_ids = _add_due(user, BATCH_SIZE * 2 + 1)
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            assert ReminderService.mark_reminders_sent(todo_ids) == len(todo_ids)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        todo_updates = [s for s in statements if s.startswith('UPDATE todo')]
+        assert len(todo_updates) == 3
+        assert Todo.query.filter(Todo.reminder_notification_count == 1).count() == len(todo_ids)
+        assert Todo.query.filter(Todo.reminder_next_fire_at != None).count() == len(todo_ids)
+
+    def test_follow_up_and_auto_close_classes(self, app, user):
+        from app import db
+        from app.models import Todo
+        from app.reminder_service import ReminderService
+
+        first, second, third = _add_due(user, 3)
+        started = datetime.utcnow() - timedelta(minutes=10)
+        Todo.query.filter(Todo.id == second).update(
+            {'reminder_notification_count': 1, 'reminder_first_notification_time': started})
+        Todo.query.filter(Todo.id == third).update(
+            {'reminder_notification_count': 2, 'reminder_first_notification_time': started})
+        db.session.commit()
+
+        ReminderService.mark_reminders_sent([first, second, third])
+
+        first, second, third = (db.session.get(Todo, i) for i in (first, second, third))
+        assert first.reminder_notification_count == 1
+        assert first.reminder_next_fire_at == first.reminder_first_notification_time + timedelta(minutes=30)
+        assert second.reminder_notification_count == 2
+        assert second.reminder_next_fire_at == started + timedelta(minutes=60)
+        assert third.reminder_notification_count == 3
+        assert not third.reminder_enabled and third.reminder_sent
+        assert third.reminder_next_fire_at is None
+
+    def test_loaded_objects_are_synchronized(self, app, user):
+        from app import db
+        from app.models import Todo
+        from app.reminder_service import ReminderService
+
+        todo = db.session.get(Todo, _add_due(user)[0])
+        ReminderService.mark_reminder_sent(todo.id)
+        assert todo.reminder_notification_count == 1
+        assert todo.reminder_first_notification_time is not None
+
+    def test_version_bumped_and_scheduler_updated(self, app, user):
+        from app import db
+        from app.reminder_scheduler import scheduler
+        from app.reminder_service import ReminderService
+
+        todo_id = _add_due(user)[0]
+        db.session.refresh(user)
+        version = user.data_version
+        assert scheduler.has_due(user.id, version)
+
+        ReminderService.mark_reminders_sent([todo_id])
+        db.session.refresh(user)
+        assert user.data_version > version
+        assert scheduler._entries[todo_id][0] > datetime.utcnow()
+        assert not scheduler.has_due(user.id, user.data_version)
+
+    def test_unknown_ids_ignored(self, app, user):
+        from app.reminder_service import ReminderService
+
+        assert ReminderService.mark_reminders_sent([]) == 0
+        assert ReminderService.mark_reminder_sent(999999) is False
+
+    def test_process_endpoint_marks_all(self, app, user):
+        import werkzeug
+        if not hasattr(werkzeug, '__version__'):
+            werkzeug.__version__ = '3.0.0'
+        from app.models import Todo
+
+        todo_ids = _add_due(user, 3)
+        client = app.test_client()
+        client.post('/login', data={'email': 'batch@example.com', 'password': 'BatchPass123!'})
+
+        data = client.post('/api/reminders/process').get_json()
+        assert sorted(n['todo_id'] for n in data['notifications']) == todo_ids
+        assert Todo.query.filter(Todo.reminder_notification_count == 1).count() == 3
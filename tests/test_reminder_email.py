@@ -0,0 +1,232 @@
+"""
+Tests for reminder digest emails and outbox delivery.
+
+Delivery runs against the ``smtp_sink`` SMTP server from conftest.py.
+"""
+import pytest
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(smtp_sink):
+    """Create and configure a test application instance."""
+    from app import app, db
+    from app.reminder_scheduler import scheduler
+
+    saved = {key: app.config.get(key) for key in ('SMTP_SERVER', 'SMTP_PORT', 'SMTP_USERNAME',
+                                                  'SMTP_PASSWORD', 'SMTP_FROM_EMAIL', 'REMINDER_EMAIL_ENABLED',
+                                                  'REMINDER_EMAIL_MAX_PER_HOUR')}
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+    app.config.update(SMTP_SERVER='127.0.0.1', SMTP_PORT=smtp_sink[0], SMTP_USERNAME='', SMTP_PASSWORD='',
+                      SMTP_FROM_EMAIL='noreply@todobox.local', REMINDER_EMAIL_ENABLED=True)
+
+    with app.app_context():
+        db.create_all()
+        scheduler.reset()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+        scheduler.reset()
+    app.config.update(saved)
+
+
+@pytest.fixture
+def user(app):
+    """Create a verified user."""
+    from app import db
+    from app.models import User
+
+    user = User(email='digest@example.com')
+    user.set_password('DigestPass123!')
+    user.email_verified = True
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _add_reminder(user, name, due):
+    from app import db
+    from app.models import Todo
+
+    todo = Todo(name=name, details='', details_html='', user_id=user.id)
+    db.session.add(todo)
+    db.session.commit()
+    todo.set_reminder(due)
+    return todo
+
+
+def _outbox():
+    from app.models import EmailOutbox
+    return EmailOutbox.query.order_by(EmailOutbox.id).all()
+
+
+class TestReminderDigests:
+    """Collecting due reminders into per-user digests"""
+
+    def test_digest_waits_for_window_then_groups(self, app, user):
+        from app.reminder_service import ReminderService
+
+        now = datetime.utcnow()
+        first = _add_reminder(user, 'Standup', now - timedelta(seconds=10))
+        second = _add_reminder(user, 'Retro', now - timedelta(seconds=5))
+
+        assert ReminderService.queue_reminder_digests(now) == 0
+        assert ReminderService.queue_reminder_digests(now + timedelta(seconds=61)) == 1
+
+        entries = _outbox()
+        assert len(entries) == 1
+        assert entries[0].kind == 'reminder_digest' and entries[0].recipient == 'digest@example.com'
+        assert 'Standup' not in entries[0].subject + entries[0].body_text
+        assert json.loads(entries[0].payload) == {'todo_ids': [first.id, second.id]}
+        assert first.reminder_emailed_at is not None and second.reminder_emailed_at is not None
+
+        # Already emailed reminders are not sent again
+        assert ReminderService.queue_reminder_digests(now + timedelta(seconds=120)) == 0
+
+    def test_reminders_seen_in_browser_are_skipped(self, app, user):
+        from app.reminder_service import ReminderService
+
+        todo = _add_reminder(user, 'Standup', datetime.utcnow() - timedelta(minutes=5))
+        ReminderService.mark_reminder_sent(todo.id)
+
+        assert ReminderService.queue_reminder_digests(datetime.utcnow() + timedelta(hours=1)) == 0
+
+    def test_hourly_cap_defers_digest(self, app, user):
+        from app.reminder_service import ReminderService
+
+        app.config['REMINDER_EMAIL_MAX_PER_HOUR'] = 1
+        now = datetime.utcnow()
+        _add_reminder(user, 'Standup', now - timedelta(minutes=5))
+        assert ReminderService.queue_reminder_digests(now) == 1
+
+        late = _add_reminder(user, 'Retro', now - timedelta(minutes=2))
+        assert ReminderService.queue_reminder_digests(now) == 0
+        assert late.reminder_emailed_at is None
+
+    def test_rescheduling_allows_another_email(self, app, user):
+        from app import db
+        from app.reminder_service import ReminderService
+
+        todo = _add_reminder(user, 'Standup', datetime.utcnow() - timedelta(minutes=5))
+        ReminderService.queue_reminder_digests()
+        assert todo.reminder_emailed_at is not None
+
+        todo.reminder_time = datetime.utcnow() + timedelta(hours=1)
+        db.session.commit()
+        assert todo.reminder_emailed_at is None
+
+
+class TestOutboxDelivery:
+    """Sending queued email over one SMTP connection"""
+
+    def _queue(self, *recipients):
+        from app import db
+        from app.email_service import enqueue_email
+
+        for recipient in recipients:
+            enqueue_email(recipient, 'Subject', 'Body', '<p>Body</p>', kind='test')
+        db.session.commit()
+
+    def test_batch_reuses_connection(self, app, smtp_sink):
+        from app.email_service import send_outbox
+
+        self._queue('a@example.com', 'b@example.com', 'c@example.com')
+        assert send_outbox() == (3, 0)
+
+        sink = smtp_sink[1]
+        assert sink['connections'] == 1
+        assert [m[0] for m in sink['messages']] == [['a@example.com'], ['b@example.com'], ['c@example.com']]
+        assert all(e.status == 'sent' and e.sent_at for e in _outbox())
+        assert send_outbox() == (0, 0)
+
+    def test_refused_recipient_fails_without_blocking_others(self, app, smtp_sink):
+        from app.email_service import send_outbox
+
+        self._queue('refused@example.com', 'ok@example.com')
+        assert send_outbox() == (1, 1)
+
+        refused, ok = _outbox()
+        assert refused.status == 'failed' and refused.last_error
+        assert ok.status == 'sent'
+
+    def test_unreachable_server_is_retried_later(self, app):
+        import socket
+        from app.email_service import send_outbox
+
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        app.config['SMTP_PORT'] = closed.getsockname()[1]
+        closed.close()
+
+        self._queue('a@example.com')
+        assert send_outbox() == (0, 1)
+        entry = _outbox()[0]
+        assert entry.status == 'pending' and entry.attempts == 1
+        assert entry.next_attempt_at > datetime.utcnow()
+
+    def test_cli_queues_and_sends(self, app, user, smtp_sink):
+        _add_reminder(user, 'Standup', datetime.utcnow() - timedelta(minutes=5))
+
+        result = app.test_cli_runner().invoke(args=['send-reminder-emails'])
+        assert 'Queued 1 digest(s); sent 1, failed 0' in result.output
+        assert 'Standup' in smtp_sink[1]['messages'][0][1]
+
+    def test_digest_is_rendered_at_send_time(self, app, user, smtp_sink):
+        from app import db
+        from app.email_service import send_outbox
+        from app.reminder_service import ReminderService
+
+        first = _add_reminder(user, 'Standup', datetime.utcnow() - timedelta(minutes=5))
+        _add_reminder(user, 'Retro', datetime.utcnow() - timedelta(minutes=4))
+        ReminderService.queue_reminder_digests()
+        db.session.delete(first)
+        db.session.commit()
+
+        assert send_outbox() == (1, 0)
+        message = smtp_sink[1]['messages'][0][1]
+        assert 'Subject: TodoBox reminder: Retro' in message
+        entry = _outbox()[0]
+        assert entry.status == 'sent' and entry.body_text == '' and entry.body_html is None
+
+    def test_digest_with_no_todos_left_is_dropped(self, app, user, smtp_sink):
+        from app import db
+        from app.email_service import send_outbox
+        from app.reminder_service import ReminderService
+
+        todo = _add_reminder(user, 'Standup', datetime.utcnow() - timedelta(minutes=5))
+        ReminderService.queue_reminder_digests()
+        db.session.delete(todo)
+        db.session.commit()
+
+        assert send_outbox() == (0, 0)
+        assert _outbox()[0].status == 'failed'
+        assert smtp_sink[1]['messages'] == []
+
+    def test_unrenderable_digest_fails_without_blocking_batch(self, app, user, smtp_sink):
+        from app import db
+        from app.email_service import enqueue_email, send_outbox
+
+        enqueue_email(user.email, 'TodoBox reminders', '', kind='reminder_digest', user_id=user.id, payload='{not json')
+        enqueue_email('ok@example.com', 'Subject', 'Body', kind='test')
+        db.session.commit()
+
+        assert send_outbox() == (1, 1)
+        bad, good = _outbox()
+        assert bad.status == 'failed' and bad.attempts == 1 and bad.last_error
+        assert good.status == 'sent'
+        assert [m[0] for m in smtp_sink[1]['messages']] == [['ok@example.com']]
+        assert send_outbox() == (0, 0)
@@ -0,0 +1,178 @@
+"""
+Tests for the in-process reminder scheduler.
+"""
+import pytest
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    from app import app, db
+    from app.reminder_scheduler import scheduler
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+        scheduler.reset()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+        scheduler.reset()
+
+
+@pytest.fixture
+def user(app):
+    """Create a verified user."""
+    from app import db
+    from app.models import User
+
+    user = User(email='heap@example.com')
+    user.set_password('HeapPass123!')
+    user.email_verified = True
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _add_todo(user, reminder_time=None):
+    from app import db
+    from app.models import Todo
+
+    todo = Todo(name='Standup', details='details', details_html='<p>details</p>', user_id=user.id)
+    db.session.add(todo)
+    db.session.commit()
+    if reminder_time is not None:
+        todo.set_reminder(reminder_time)
+    return todo
+
+
+def _version(user):
+    from app import db
+
+    db.session.refresh(user)
+    return user.data_version
+
+
+class TestNextFireTime:
+    """Follow-up spacing"""
+
+    def test_spacing(self):
+        from app.reminder_scheduler import next_fire_time
+
+        due = datetime(2025, 1, 1, 9, 0)
+        first = datetime(2025, 1, 1, 9, 2)
+        assert next_fire_time(due, 0, None) == due
+        assert next_fire_time(due, 1, first) == first + timedelta(minutes=30)
+        assert next_fire_time(due, 2, first) == first + timedelta(minutes=60)
+        assert next_fire_time(due, 3, first) is None
+        assert next_fire_time(None, 0, None) is None
+
+
+class TestReminderScheduler:
+    """Heap maintenance and due checks"""
+
+    def test_due_only_once_time_has_passed(self, app, user):
+        from app.reminder_scheduler import scheduler
+
+        _add_todo(user, datetime.utcnow() + timedelta(hours=1))
+        assert scheduler.has_due(user.id, _version(user)) is False
+
+        _add_todo(user, datetime.utcnow() - timedelta(minutes=1))
+        assert scheduler.has_due(user.id, _version(user)) is True
+
+    def test_follow_up_is_reinserted(self, app, user):
+        from app import db
+        from app.reminder_scheduler import scheduler
+        from app.reminder_service import ReminderService
+
+        todo = _add_todo(user, datetime.utcnow() - timedelta(minutes=1))
+        assert scheduler.has_due(user.id, _version(user))
+
+        ReminderService.mark_reminder_sent(todo.id)
+        assert scheduler.has_due(user.id, _version(user)) is False
+        fire_at, _ = scheduler._entries[todo.id]
+        assert fire_at == todo.reminder_first_notification_time + timedelta(minutes=30)
+
+        # 30 minutes later the second notification is due
+        todo.reminder_first_notification_time -= timedelta(minutes=31)
+        db.session.commit()
+        assert scheduler.has_due(user.id, _version(user)) is True
+
+    def test_clear_and_cancel_unschedule(self, app, user):
+        from app.reminder_scheduler import scheduler
+        from app.reminder_service import ReminderService
+
+        scheduler.load()
+        cleared = _add_todo(user, datetime.utcnow() - timedelta(minutes=1))
+        cancelled = _add_todo(user, datetime.utcnow() - timedelta(minutes=1))
+        assert {cleared.id, cancelled.id} <= set(scheduler._entries)
+
+        cleared.clear_reminder()
+        ReminderService.cancel_reminder(cancelled.id)
+        assert cleared.id not in scheduler._entries
+        assert cancelled.id not in scheduler._entries
+        assert scheduler.has_due(user.id, _version(user)) is False
+
+    def test_rebuilt_from_database_after_restart(self, app, user):
+        from app.reminder_scheduler import scheduler
+
+        todo = _add_todo(user, datetime.utcnow() - timedelta(minutes=1))
+        scheduler.reset()
+
+        assert scheduler.has_due(user.id, _version(user)) is True
+        assert todo.id in scheduler._entries
+
+    def test_version_change_reloads_user(self, app, user):
+        from app.reminder_scheduler import scheduler
+
+        todo = _add_todo(user, datetime.utcnow() - timedelta(minutes=1))
+        version = _version(user)
+        assert scheduler.has_due(user.id, version)
+
+        # Another worker's view: this heap missed a write, the version did not
+        scheduler.schedule(todo.id, user.id, None)
+        assert scheduler.has_due(user.id, version) is False
+        assert scheduler.has_due(user.id, version + 1) is True
+
+    def test_check_endpoint_uses_scheduler(self, app, user):
+        import werkzeug
+        if not hasattr(werkzeug, '__version__'):
+            werkzeug.__version__ = '3.0.0'
+        from app.reminder_scheduler import scheduler
+
+        client = app.test_client()
+        client.post('/login', data={'email': 'heap@example.com', 'password': 'HeapPass123!'})
+        todo = _add_todo(user, datetime.utcnow() - timedelta(minutes=1))
+
+        data = client.get('/api/reminders/check').get_json()
+        assert [r['todo_id'] for r in data['reminders']] == [todo.id]
+        assert user.id in scheduler._versions
+
+    def test_thread_wakes_listeners_when_due(self):
+        from app.reminder_scheduler import ReminderScheduler
+
+        local = ReminderScheduler()
+        local.loaded = True
+        fired = threading.Event()
+        local.on_due(lambda users: 7 in users and fired.set())
+        local.start()
+
+        local.schedule(1, 7, datetime.utcnow() + timedelta(milliseconds=100))
+        assert fired.wait(2)
+        assert local._due == {7: {1}}
@@ -0,0 +1,202 @@
+"""
+Tests for SQL-side pending reminder selection (reminder_next_fire_at).
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    """Create a user."""
+    from app import db
+    from app.models import User
+
+    user = User(email='due@example.com')
+    user.set_password('DuePass123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _add_reminder(user, minutes_ago=5):
+    from app import db
+    from app.models import Todo
+
+    todo = Todo(name='Standup', details='details', details_html='<p>details</p>', user_id=user.id)
+    db.session.add(todo)
+    db.session.commit()
+    todo.set_reminder(datetime.utcnow() - timedelta(minutes=minutes_ago))
+    return todo
+
+
+def _pending_ids(user):
+    from app.reminder_service import ReminderService
+    return [t.id for t in ReminderService.get_pending_reminders(user.id)]
+
+
+def _shift_first_notification(todo, minutes):
+    from app import db
+
+    todo.reminder_first_notification_time -= timedelta(minutes=minutes)
+    db.session.commit()
+
+
+class TestNextFireAt:
+    """The stored due time follows the reminder fields"""
+
+    def test_set_and_clear(self, app, user):
+        todo = _add_reminder(user)
+        assert todo.reminder_next_fire_at == todo.reminder_time
+
+        todo.clear_reminder()
+        assert todo.reminder_next_fire_at is None
+
+    def test_future_reminder_not_pending(self, app, user):
+        from app.reminder_service import ReminderService
+
+        todo = _add_reminder(user, minutes_ago=-60)
+        assert _pending_ids(user) == []
+        assert ReminderService.get_next_reminder_time(user.id) == todo.reminder_time
+
+    def test_other_users_reminders_excluded(self, app, user):
+        from app import db
+        from app.models import User
+
+        other = User(email='other@example.com')
+        db.session.add(other)
+        db.session.commit()
+        _add_reminder(other)
+        assert _pending_ids(user) == []
+
+
+class TestThirtyMinuteInterval:
+    """Follow-ups are spaced 30 minutes apart"""
+
+    def test_follow_ups_wait_thirty_minutes(self, app, user):
+        from app.reminder_service import ReminderService
+
+        todo = _add_reminder(user)
+        assert _pending_ids(user) == [todo.id]
+
+        ReminderService.mark_reminder_sent(todo.id)
+        assert _pending_ids(user) == []
+        assert todo.reminder_next_fire_at == todo.reminder_first_notification_time + timedelta(minutes=30)
+
+        _shift_first_notification(todo, 29)
+        assert _pending_ids(user) == []
+        _shift_first_notification(todo, 2)
+        assert _pending_ids(user) == [todo.id]
+
+        ReminderService.mark_reminder_sent(todo.id)
+        assert _pending_ids(user) == []
+        _shift_first_notification(todo, 30)
+        assert _pending_ids(user) == [todo.id]
+
+    def test_no_fourth_notification(self, app, user):
+        from app import db
+
+        todo = _add_reminder(user)
+        todo.reminder_notification_count = 3
+        todo.reminder_first_notification_time = datetime.utcnow() - timedelta(hours=2)
+        db.session.commit()
+
+        assert todo.reminder_next_fire_at is None
+        assert _pending_ids(user) == []
+
+
+class TestAutoClose:
+    """Three notifications inside 30 minutes close the reminder"""
+
+    def test_third_notification_within_window_closes(self, app, user):
+        from app.reminder_service import ReminderService
+
+        todo = _add_reminder(user)
+        for _ in range(3):
+            ReminderService.mark_reminder_sent(todo.id)
+
+        assert todo.reminder_notification_count == 3
+        assert not todo.reminder_enabled
+        assert todo.reminder_sent
+        assert todo.reminder_next_fire_at is None
+        assert _pending_ids(user) == []
+
+    def test_uses_due_index(self, app, user):
+        from app import db
+
+        if db.engine.dialect.name != 'sqlite':
+            pytest.skip('query plan check is SQLite specific')
+        now = datetime.utcnow()
+        plan = db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT id FROM todo WHERE reminder_enabled = 1 AND reminder_sent = 0 "
+            "AND user_id = :user_id AND reminder_next_fire_at <= :now"
+        ), {'user_id': user.id, 'now': now}).fetchall()
+        assert any('ix_todo_reminder_due' in row[-1] for row in plan)
+
+
+class TestPollHints:
+    """/api/reminders/check tells pollers when to come back"""
+
+    def _client(self, app):
+        import werkzeug
+        if not hasattr(werkzeug, '__version__'):
+            werkzeug.__version__ = '3.0.0'
+        client = app.test_client()
+        client.post('/login', data={'email': 'due@example.com', 'password': 'DuePass123!'})
+        return client
+
+    def test_idle_user_polls_rarely(self, app, user):
+        from app import db
+
+        user.email_verified = True
+        db.session.commit()
+        data = self._client(app).get('/api/reminders/check').get_json()
+        assert data['next_check_after'] == app.config['REMINDER_POLL_MAX_INTERVAL']
+        assert data['next_reminder_at'] is None
+
+    def test_imminent_reminder_sets_fire_time(self, app, user):
+        import calendar
+        from app import db
+
+        user.email_verified = True
+        db.session.commit()
+        todo = _add_reminder(user, minutes_ago=-2)
+        data = self._client(app).get('/api/reminders/check').get_json()
+
+        assert 100 <= data['next_check_after'] <= 120
+        assert data['next_reminder_at'] == calendar.timegm(todo.reminder_time.utctimetuple())
+
+    def test_interval_is_clamped(self, app):
+        from app.reminder_service import ReminderService
+
+        soon = datetime.utcnow() + timedelta(seconds=1)
+        later = datetime.utcnow() + timedelta(days=1)
+        assert ReminderService.get_poll_interval(soon) == app.config['REMINDER_POLL_MIN_INTERVAL']
+        assert ReminderService.get_poll_interval(later) == app.config['REMINDER_POLL_MAX_INTERVAL']
+        assert ReminderService.get_poll_interval(later, has_pending=True) == 10
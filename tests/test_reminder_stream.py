@@ -0,0 +1,171 @@
+"""
+Tests for the Server-Sent Events reminder stream.
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+    # Short streams so each response ends on its own
+    app.config['REMINDER_STREAM_HEARTBEAT'] = 0.05
+    app.config['REMINDER_STREAM_MAX_AGE'] = 0.3
+    app.config['REMINDER_STREAM_ENABLED'] = True
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+    app.config['REMINDER_STREAM_HEARTBEAT'] = 15
+    app.config['REMINDER_STREAM_MAX_AGE'] = 3600
+    app.config['REMINDER_STREAM_ENABLED'] = False
+
+
+@pytest.fixture
+def auth_client(app):
+    """Log a verified user in."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import db
+    from app.models import User
+
+    user = User(email='stream@example.com')
+    user.set_password('StreamPass123!')
+    user.email_verified = True
+    db.session.add(user)
+    db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'stream@example.com', 'password': 'StreamPass123!'})
+    client.user = user
+    return client
+
+
+def _add_due_reminder(user, name='Standup'):
+    from app import db
+    from app.models import Todo, Tracker
+
+    todo = Todo(name=name, details='details', details_html='<p>details</p>', user_id=user.id)
+    todo.reminder_enabled = True
+    todo.reminder_time = datetime.utcnow() - timedelta(minutes=1)
+    db.session.add(todo)
+    db.session.commit()
+    Tracker.add(todo.id, 5, todo.timestamp)
+    return todo
+
+
+def _events(body):
+    """Split an event-stream body into (event name, id, data) tuples"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = {}
+        for line in block.split('\n'):
+            if line.startswith(':'):
+                fields.setdefault('event', 'comment')
+                continue
+            name, _, value = line.partition(': ')
+            fields[name] = value
+        events.append((fields.get('event'), fields.get('id'), fields.get('data')))
+    return events
+
+
+class TestReminderStream:
+    """Events, reconnection and capacity"""
+
+    def test_stream_headers_and_heartbeat(self, auth_client):
+        response = auth_client.get('/api/reminders/stream')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert 'no-cache' in response.headers['Cache-Control']
+        body = response.get_data(as_text=True)
+        assert body.startswith('retry: ')
+        assert ': heartbeat' in body
+
+    def test_due_reminder_is_pushed_once(self, auth_client):
+        todo = _add_due_reminder(auth_client.user)
+
+        events = _events(auth_client.get('/api/reminders/stream').get_data(as_text=True))
+        reminders = [e for e in events if e[0] == 'reminders']
+
+        assert len(reminders) == 1
+        assert reminders[0][1] == f'{todo.id}-0'
+        assert f'"todo_id":{todo.id}' in reminders[0][2]
+
+    def test_last_event_id_skips_delivered_reminders(self, auth_client):
+        todo = _add_due_reminder(auth_client.user)
+
+        response = auth_client.get('/api/reminders/stream', headers={'Last-Event-ID': f'{todo.id}-0'})
+        assert 'event: reminders' not in response.get_data(as_text=True)
+
+    def test_next_notification_is_pushed_again(self, auth_client):
+        from app import db
+
+        todo = _add_due_reminder(auth_client.user)
+        todo.reminder_notification_count = 1
+        todo.reminder_first_notification_time = datetime.utcnow() - timedelta(minutes=31)
+        db.session.commit()
+
+        response = auth_client.get('/api/reminders/stream', headers={'Last-Event-ID': f'{todo.id}-0'})
+        assert f'id: {todo.id}-1' in response.get_data(as_text=True)
+
+    def test_worker_cap_returns_503(self, app, auth_client):
+        app.config['REMINDER_STREAM_MAX_PER_WORKER'] = 0
+        try:
+            response = auth_client.get('/api/reminders/stream')
+        finally:
+            app.config['REMINDER_STREAM_MAX_PER_WORKER'] = 50
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '300'
+        assert response.get_json()['fallback'] == 'poll'
+
+    def test_disabled_stream_keeps_browsers_polling(self, app, auth_client):
+        app.config['REMINDER_STREAM_ENABLED'] = False
+        try:
+            response = auth_client.get('/api/reminders/stream')
+            page = auth_client.get('/today/list').get_data(as_text=True)
+        finally:
+            app.config['REMINDER_STREAM_ENABLED'] = True
+
+        assert response.status_code == 404
+        assert 'const REMINDER_STREAM_ENABLED = false;' in page
+
+    def test_stream_unregisters_when_closed(self, auth_client):
+        from app.reminder_stream import hub
+
+        response = auth_client.get('/api/reminders/stream')
+        assert hub.active == 1
+        response.close()
+        assert hub.active == 0
+
+    def test_hub_wakes_streams_on_commit(self, app, auth_client):
+        from app import db
+        from app.reminder_stream import hub
+
+        wake = hub.register(auth_client.user.id, limit=10)
+        try:
+            _add_due_reminder(auth_client.user)
+            assert wake.is_set()
+        finally:
+            hub.unregister(auth_client.user.id, wake)
+        db.session.remove()
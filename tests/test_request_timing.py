@@ -0,0 +1,173 @@
+"""
+Tests for per-request Server-Timing / SQL instrumentation.
+"""
+import pytest
+import logging
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['REQUEST_TIMING_ENABLED'] = True
+    app.config['REQUEST_TIMING_SAMPLE_RATE'] = 1.0
+    app.config['SERVER_TIMING_HEADER'] = 'all'
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+    app.config['N_PLUS_ONE_THRESHOLD'] = 20
+    app.config['REQUEST_TIMING_SAMPLE_RATE'] = 1.0
+    app.config['SERVER_TIMING_HEADER'] = 'all'
+
+
+@pytest.fixture
+def auth_client(app):
+    """Create a verified user and log them in."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import db
+    from app.models import User
+
+    user = User(email='timing@example.com', fullname='Timing User')
+    user.set_password('TimingPass123!')
+    user.email_verified = True
+    db.session.add(user)
+    db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'timing@example.com', 'password': 'TimingPass123!'})
+    client.user = user
+    return client
+
+
+def _parse_server_timing(header):
+    metrics = {}
+    for part in header.split(','):
+        fields = part.strip().split(';')
+        metrics[fields[0]] = dict(f.split('=', 1) for f in fields[1:])
+    return metrics
+
+
+class TestServerTiming:
+    """Server-Timing header and structured log"""
+
+    def test_header_reports_sql_and_template_time(self, auth_client):
+        response = auth_client.get('/today/list')
+        metrics = _parse_server_timing(response.headers['Server-Timing'])
+
+        assert set(metrics) == {'app', 'db', 'tpl', 'crypto'}
+        assert float(metrics['tpl']['dur']) > 0
+        assert int(metrics['db']['desc'].strip('"').split()[0]) > 0
+
+    def test_structured_log_line(self, auth_client, caplog):
+        import json
+
+        with caplog.at_level(logging.INFO, logger='app.request_timing'):
+            auth_client.get('/today/list')
+
+        records = [json.loads(r.getMessage()) for r in caplog.records
+                   if r.name == 'app.request_timing' and r.levelno == logging.INFO]
+        assert records[-1]['path'] == '/today/list'
+        assert records[-1]['status'] == 200
+        assert records[-1]['sql_count'] > 0
+
+    def test_encryption_time_is_counted(self, app, auth_client):
+        from app import db
+        from app.models import Todo, Tracker
+
+        app.config['TODO_ENCRYPTION_ENABLED'] = True
+        try:
+            todo = Todo(name='Secret', details='Secret', details_html='<p>Secret</p>', user_id=auth_client.user.id)
+            db.session.add(todo)
+            db.session.commit()
+            Tracker.add(todo.id, 5, todo.modified)
+
+            response = auth_client.get('/today/list')
+        finally:
+            app.config['TODO_ENCRYPTION_ENABLED'] = False
+
+        metrics = _parse_server_timing(response.headers['Server-Timing'])
+        assert int(metrics['crypto']['desc'].strip('"').split()[0]) >= 2
+
+    def test_unsampled_request_has_no_header(self, app, auth_client):
+        app.config['REQUEST_TIMING_SAMPLE_RATE'] = 0.0
+        response = auth_client.get('/today/list')
+        assert 'Server-Timing' not in response.headers
+
+    def test_header_only_for_admins_by_default(self, app, auth_client):
+        from app import db
+
+        app.config['SERVER_TIMING_HEADER'] = 'admin'
+        app.config['REQUEST_TIMING_SAMPLE_RATE'] = 0.0
+        assert 'Server-Timing' not in auth_client.get('/today/list').headers
+        assert 'Server-Timing' not in app.test_client().get('/login').headers
+
+        # Admin-ness is read from the session, set when the admin logs in
+        auth_client.user.is_admin = True
+        db.session.commit()
+        auth_client.get('/logout')
+        auth_client.post('/login', data={'email': 'timing@example.com', 'password': 'TimingPass123!'})
+        assert 'Server-Timing' in auth_client.get('/today/list').headers
+        assert 'Server-Timing' not in auth_client.get('/static/assets/js/app.js').headers
+
+    def test_unsampled_request_does_not_load_user(self, app, auth_client, monkeypatch):
+        from flask import g
+
+        app.config['SERVER_TIMING_HEADER'] = 'admin'
+        app.config['REQUEST_TIMING_SAMPLE_RATE'] = 0.0
+        loads = []
+        loader = app.login_manager._user_callback
+        monkeypatch.setattr(app.login_manager, '_user_callback', lambda user_id: loads.append(user_id) or loader(user_id))
+
+        g.pop('_login_user', None)  # requests share the fixture's app context, and with it Flask-Login's cache
+        assert auth_client.get('/static/assets/js/app.js').status_code == 200
+        assert loads == []
+
+
+class TestNPlusOneDetector:
+    """Repeated statement shapes are flagged"""
+
+    def test_repeated_statement_warns(self, app, auth_client, caplog):
+        from datetime import datetime, timedelta
+        from app import db
+        from app.models import Todo, Tracker
+
+        # /undone looks up the latest tracker once per todo
+        past = datetime.now() - timedelta(days=3)
+        for i in range(4):
+            todo = Todo(name=f'Old {i}', details='x', details_html='<p>x</p>',
+                        user_id=auth_client.user.id, modified=past)
+            db.session.add(todo)
+            db.session.commit()
+            Tracker.add(todo.id, 5, past)
+
+        app.config['N_PLUS_ONE_THRESHOLD'] = 3
+        with caplog.at_level(logging.WARNING, logger='app.request_timing'):
+            auth_client.get('/undone')
+
+        assert any('Possible N+1 query on GET /undone' in r.getMessage() for r in caplog.records)
+
+    def test_below_threshold_is_quiet(self, app, auth_client, caplog):
+        app.config['N_PLUS_ONE_THRESHOLD'] = 1000
+        with caplog.at_level(logging.WARNING, logger='app.request_timing'):
+            auth_client.get('/today/list')
+
+        assert not any('Possible N+1' in r.getMessage() for r in caplog.records)
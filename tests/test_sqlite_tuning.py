@@ -0,0 +1,108 @@
+"""
+Tests for the SQLite production profile (pragmas and WAL maintenance).
+"""
+import pytest
+import os
+import sys
+
+from sqlalchemy import create_engine, event, text
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _engine(path, config=None):
+    from app.sqlite_tuning import apply_pragmas, pragmas_from_config
+
+    engine = create_engine(f'sqlite:///{path}')
+    pragmas = pragmas_from_config(config or {})
+    event.listen(engine, 'connect', lambda conn, record: apply_pragmas(conn, pragmas))
+    return engine
+
+
+class TestPragmas:
+    """Settings applied on connect"""
+
+    def test_defaults_applied(self, tmp_path):
+        engine = _engine(tmp_path / 'profile.db')
+        with engine.connect() as conn:
+            values = {name: conn.execute(text(f'PRAGMA {name}')).scalar()
+                      for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size',
+                                   'mmap_size', 'temp_store')}
+        engine.dispose()
+        assert values == {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000,
+                          'cache_size': -16000, 'mmap_size': 134217728, 'temp_store': 2}
+
+    def test_invalid_values_rejected(self):
+        from app.sqlite_tuning import pragmas_from_config
+
+        with pytest.raises(ValueError):
+            pragmas_from_config({'SQLITE_JOURNAL_MODE': 'WAL; DROP TABLE user'})
+        with pytest.raises(ValueError):
+            pragmas_from_config({'SQLITE_BUSY_TIMEOUT': '5s'})
+
+    def test_open_reader_does_not_block_commit(self, tmp_path):
+        engine = _engine(tmp_path / 'profile.db', {'SQLITE_BUSY_TIMEOUT': 0})
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE tracker (id INTEGER PRIMARY KEY, todo_id INTEGER)'))
+            conn.execute(text('INSERT INTO tracker (todo_id) VALUES (1)'))
+
+        reader = engine.raw_connection()
+        try:
+            cursor = reader.cursor()
+            cursor.execute('BEGIN')
+            cursor.execute('SELECT count(*) FROM tracker').fetchall()
+
+            # Would raise "database is locked" with the rollback journal
+            with engine.begin() as conn:
+                conn.execute(text('INSERT INTO tracker (todo_id) VALUES (2)'))
+            assert cursor.execute('SELECT count(*) FROM tracker').fetchone()[0] == 1  # reader's snapshot
+        finally:
+            reader.close()
+            engine.dispose()
+
+    def test_app_engine_uses_profile(self):
+        import werkzeug
+        if not hasattr(werkzeug, '__version__'):
+            werkzeug.__version__ = '3.0.0'
+        from app import app, db
+
+        with app.app_context():
+            if db.engine.url.drivername != 'sqlite':
+                pytest.skip('not using SQLite')
+            with db.engine.connect() as conn:
+                assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+                assert conn.execute(text('PRAGMA synchronous')).scalar() == 1
+
+
+class TestMaintenance:
+    """wal_checkpoint / optimize"""
+
+    def test_checkpoint_truncates_wal(self, tmp_path):
+        from app.sqlite_tuning import checkpoint
+
+        path = tmp_path / 'profile.db'
+        engine = _engine(path)
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE tracker (id INTEGER PRIMARY KEY, todo_id INTEGER)'))
+            for i in range(200):
+                conn.execute(text('INSERT INTO tracker (todo_id) VALUES (:i)'), {'i': i})
+        assert os.path.getsize(f'{path}-wal') > 0
+
+        busy, wal_pages, checkpointed = checkpoint(engine)
+        assert busy == 0 and wal_pages == checkpointed
+        assert os.path.getsize(f'{path}-wal') == 0
+        engine.dispose()
+
+        with pytest.raises(ValueError):
+            checkpoint(engine, 'SOMETIMES')
+
+    def test_cli(self):
+        import werkzeug
+        if not hasattr(werkzeug, '__version__'):
+            werkzeug.__version__ = '3.0.0'
+        from app import app
+
+        result = app.test_cli_runner().invoke(args=['sqlite-maintenance'])
+        assert result.exit_code == 0
+        assert 'Checkpointed' in result.output or 'Not using SQLite' in result.output
@@ -0,0 +1,176 @@
+"""
+Tests for the request-scoped unit of work (one commit per todo mutation).
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    from app import db
+    from app.models import User
+
+    user = User(email='uow@example.com')
+    user.set_password('UowPass123!')
+    user.email_verified = True
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    client.post('/login', data={'email': 'uow@example.com', 'password': 'UowPass123!'})
+    return client
+
+
+@pytest.fixture
+def todo(app, user):
+    from app import db
+    from app.models import Todo, Tracker
+
+    todo = Todo(name='Write report', details='draft', user_id=user.id)
+    db.session.add(todo)
+    db.session.commit()
+    Tracker.add(todo.id, 5, todo.timestamp)
+    return todo
+
+
+class CommitCounter:
+    """Counts session commits while active"""
+
+    def __enter__(self):
+        from app import db
+
+        self.count = 0
+        event.listen(db.session, 'after_commit', self._count)
+        return self
+
+    def _count(self, session):
+        self.count += 1
+
+    def __exit__(self, *exc):
+        from app import db
+
+        event.remove(db.session, 'after_commit', self._count)
+
+
+def _statuses(todo_id):
+    from app.models import Tracker
+
+    return [t.status_id for t in Tracker.query.filter_by(todo_id=todo_id).order_by(Tracker.id)]
+
+
+class TestCommitsPerEndpoint:
+    """Each mutating endpoint commits exactly once"""
+
+    def test_add_new(self, client, user):
+        from app.models import Todo
+
+        with CommitCounter() as commits:
+            response = client.post('/add', data={'title': 'New todo', 'activities': 'details',
+                                                 'reminder_enabled': 'true', 'reminder_type': 'before',
+                                                 'reminder_before_minutes': '10', 'reminder_before_unit': 'minutes'})
+        assert response.status_code in (200, 302)
+        assert commits.count == 1
+        todo = Todo.query.filter_by(user_id=user.id).one()
+        assert todo.reminder_enabled and _statuses(todo.id) == [5]
+
+    def test_add_update_exits_kiv(self, app, client, todo, user):
+        from app.models import KIV
+
+        KIV.add(todo.id, user.id)
+        with CommitCounter() as commits:
+            response = client.post('/add', data={'todo_id': todo.id, 'title': todo.name,
+                                                 'activities': todo.details, 'schedule_day': 'tomorrow'})
+        assert response.get_json()['exitedKIV'] is True
+        assert commits.count == 1
+        assert not KIV.is_kiv(todo.id)
+        assert _statuses(todo.id) == [5, 5]
+
+    @pytest.mark.parametrize('url, status_id', [('/{id}/done', 6), ('/{id}/kiv', 9),
+                                                ('/today/{id}/done', 6), ('/today/{id}/kiv', 9)])
+    def test_status_changes(self, client, todo, url, status_id):
+        with CommitCounter() as commits:
+            assert client.post(url.format(id=todo.id)).status_code == 200
+        assert commits.count == 1
+        assert _statuses(todo.id)[-1] == status_id
+
+    def test_delete(self, client, todo):
+        from app import db
+        from app.models import Todo
+
+        todo_id = todo.id
+        with CommitCounter() as commits:
+            client.post(f'/{todo_id}/delete')
+        assert commits.count == 1
+        assert db.session.get(Todo, todo_id) is None and _statuses(todo_id) == []
+
+
+class TestRollback:
+    """A failure part way through leaves nothing behind"""
+
+    def test_error_rolls_back_staged_changes(self, client, todo, monkeypatch):
+        from app import db
+        from app.models import KIV, Tracker
+
+        def fail(*args, **kwargs):
+            raise RuntimeError('tracker write failed')
+
+        monkeypatch.setattr(Tracker, 'add', fail)
+        with pytest.raises(RuntimeError):  # TESTING propagates view errors
+            client.post(f'/{todo.id}/kiv')
+
+        db.session.expire_all()
+        assert not KIV.is_kiv(todo.id)
+        assert _statuses(todo.id) == [5]
+
+
+class TestHelpersOutsideRequests:
+    """CLI and background callers keep the commit-per-call behaviour"""
+
+    def test_helpers_commit_immediately(self, app, todo):
+        from app import db
+        from app.unit_of_work import active
+
+        assert not active()
+        with CommitCounter() as commits:
+            todo.set_reminder(datetime.utcnow() + timedelta(hours=1))
+            todo.clear_reminder()
+        assert commits.count == 2
+
+        db.session.expire_all()
+        assert todo.reminder_enabled is False
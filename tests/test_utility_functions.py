@@ -203,6 +203,31 @@ class TestTimezoneUtilities:
         result = convert_to_user_timezone(utc_dt, 'Invalid/Timezone')
         assert result is not None
 
+    def test_convert_many(self):
+        """Test batch conversion matches one-at-a-time conversion"""
+        from app.timezone_utils import convert_many, convert_to_user_timezone
+
+        pst = pytz.timezone('America/Los_Angeles')
+        batch = [datetime(2024, 12, 4, 12, 0, 0), None, datetime(2024, 7, 4, 12, 0, 0),
+                 pst.localize(datetime(2024, 12, 4, 9, 0, 0))]
+
+        converted = convert_many(batch, 'America/New_York')
+        assert converted == [None if dt is None else convert_to_user_timezone(dt, 'America/New_York')
+                             for dt in batch]
+        assert [dt.hour for dt in converted if dt] == [7, 8, 12]  # EST, EDT, 9am PST
+        assert convert_many(batch[:1], 'Invalid/Timezone')[0].utcoffset() == timedelta(0)
+
+    def test_timezone_cache_and_validation(self):
+        """Test timezone objects are reused and names validated without a list scan"""
+        from app.timezone_utils import get_timezone, is_valid_timezone, VALID_TIMEZONES
+
+        assert get_timezone('Asia/Kuala_Lumpur') is get_timezone('Asia/Kuala_Lumpur')
+        assert isinstance(VALID_TIMEZONES, frozenset)
+        assert is_valid_timezone('Europe/London')
+        assert not is_valid_timezone('Invalid/Timezone')
+        with pytest.raises(pytz.UnknownTimeZoneError):
+            get_timezone('Invalid/Timezone')
+
 
 class TestGeolocationUtilities:
     """Tests for geolocation.py utility functions"""
@@ -228,9 +253,9 @@ class TestGeolocationUtilities:
             ip = get_client_ip()
             assert ip == '9.10.11.12'
     
-    @patch('app.geolocation.requests.get')
+    @patch('app.http_client._session')
     @patch('app.geolocation.get_client_ip')
-    def test_detect_timezone_from_ip_success(self, mock_get_ip, mock_requests_get):
+    def test_detect_timezone_from_ip_success(self, mock_get_ip, mock_session):
         """Test successful timezone detection from IP"""
         from app.geolocation import detect_timezone_from_ip
         
@@ -242,14 +267,14 @@ class TestGeolocationUtilities:
             'timezone': 'America/New_York',
             'countryCode': 'US'
         }
-        mock_requests_get.return_value = mock_response
+        mock_session.get.return_value = mock_response
         
         tz = detect_timezone_from_ip()
         assert tz == 'America/New_York'
     
-    @patch('app.geolocation.requests.get')
+    @patch('app.http_client._session')
     @patch('app.geolocation.get_client_ip')
-    def test_detect_timezone_from_ip_localhost(self, mock_get_ip, mock_requests_get):
+    def test_detect_timezone_from_ip_localhost(self, mock_get_ip, mock_session):
         """Test timezone detection skips localhost"""
         from app.geolocation import detect_timezone_from_ip
         
@@ -258,11 +283,11 @@ class TestGeolocationUtilities:
         tz = detect_timezone_from_ip()
         assert tz is None
         # Should not make API call for localhost
-        mock_requests_get.assert_not_called()
+        mock_session.get.assert_not_called()
     
-    @patch('app.geolocation.requests.get')
+    @patch('app.http_client._session')
     @patch('app.geolocation.get_client_ip')
-    def test_detect_timezone_from_ip_private_network(self, mock_get_ip, mock_requests_get):
+    def test_detect_timezone_from_ip_private_network(self, mock_get_ip, mock_session):
         """Test timezone detection skips private IP ranges"""
         from app.geolocation import detect_timezone_from_ip
         
@@ -270,24 +295,24 @@ class TestGeolocationUtilities:
         
         tz = detect_timezone_from_ip()
         assert tz is None
-        mock_requests_get.assert_not_called()
+        mock_session.get.assert_not_called()
     
-    @patch('app.geolocation.requests.get')
+    @patch('app.http_client._session')
     @patch('app.geolocation.get_client_ip')
-    def test_detect_timezone_from_ip_api_failure(self, mock_get_ip, mock_requests_get):
+    def test_detect_timezone_from_ip_api_failure(self, mock_get_ip, mock_session):
         """Test timezone detection handles API failures gracefully"""
         from app.geolocation import detect_timezone_from_ip
         import requests
         
         mock_get_ip.return_value = '8.8.8.8'
-        mock_requests_get.side_effect = requests.RequestException("API unavailable")
+        mock_session.get.side_effect = requests.RequestException("API unavailable")
         
         tz = detect_timezone_from_ip()
         assert tz is None
     
-    @patch('app.geolocation.requests.get')
+    @patch('app.http_client._session')
     @patch('app.geolocation.get_client_ip')
-    def test_detect_timezone_from_ip_fallback_to_country(self, mock_get_ip, mock_requests_get):
+    def test_detect_timezone_from_ip_fallback_to_country(self, mock_get_ip, mock_session):
         """Test timezone detection falls back to country code"""
         from app.geolocation import detect_timezone_from_ip
         
@@ -299,7 +324,7 @@ class TestGeolocationUtilities:
             'timezone': 'Invalid/Timezone',
             'countryCode': 'US'
         }
-        mock_requests_get.return_value = mock_response
+        mock_session.get.return_value = mock_response
         
         tz = detect_timezone_from_ip()
         assert tz == 'America/New_York'  # Default US timezone
@@ -0,0 +1,149 @@
+"""
+Tests for stored email verification tokens.
+"""
+import pytest
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test application instance."""
+    import werkzeug
+    if not hasattr(werkzeug, '__version__'):
+        werkzeug.__version__ = '3.0.0'
+    from app import app, db
+
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['TODO_ENCRYPTION_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+
+        from app.models import Status
+        if Status.query.count() == 0:
+            Status.seed()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    """Create an unverified user."""
+    from app import db
+    from app.models import User
+
+    user = User(email='verify@example.com')
+    user.set_password('VerifyPass123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+class TestVerificationTokens:
+    """Issuing, resolving and expiring tokens"""
+
+    def test_only_hash_is_stored(self, app, user):
+        from app.models import UserToken
+        from app.verification import VerificationToken
+
+        token, _ = VerificationToken.create_verification_token(user)
+        record = UserToken.query.one()
+        assert record.user_id == user.id and record.purpose == 'email_verification'
+        assert record.token_hash == VerificationToken.hash_token(token) != token
+        assert VerificationToken.find_user(token) == user
+
+    def test_unknown_expired_and_wrong_purpose_tokens_rejected(self, app, user):
+        from app import db
+        from app.models import UserToken
+        from app.verification import VerificationToken
+
+        token, _ = VerificationToken.create_verification_token(user)
+        assert VerificationToken.find_user('') is None
+        assert VerificationToken.find_user(VerificationToken.generate_token(user.email)) is None
+        assert VerificationToken.find_user(token, purpose='password_reset') is None
+
+        UserToken.query.one().expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        assert VerificationToken.find_user(token) is None
+
+    def test_email_change_invalidates_token(self, app, user):
+        from app import db
+        from app.verification import VerificationToken
+
+        token, _ = VerificationToken.create_verification_token(user)
+        user.email = 'changed@example.com'
+        db.session.commit()
+        assert VerificationToken.find_user(token) is None
+
+    def test_purge_expired(self, app, user):
+        from app.models import UserToken
+        from app.verification import VerificationToken
+
+        VerificationToken.create_verification_token(user)
+        assert VerificationToken.purge_expired() == 0
+        assert VerificationToken.purge_expired(datetime.utcnow() + timedelta(days=2)) == 1
+        assert UserToken.query.count() == 0
+
+
+class TestVerifyEmailRoute:
+    """/verify-email/<token>"""
+
+    def test_verifies_with_indexed_lookup(self, app, user):
+        from app import db
+        from app.models import User, UserToken
+        from app.verification import VerificationToken
+        from sqlalchemy import event
+
+        # Other unverified accounts must not be scanned
+        db.session.add_all([User(email=f'spam{i}@example.com') for i in range(50)])
+        db.session.commit()
+        token, _ = VerificationToken.create_verification_token(user)
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = app.test_client().get(f'/verify-email/{token}')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        assert response.status_code == 302 and '/login' in response.headers['Location']
+        assert not any('WHERE user.email_verified' in s for s in statements)
+        assert any('WHERE user_token.token_hash = ?' in s for s in statements)
+        db.session.refresh(user)
+        assert user.email_verified
+        assert UserToken.query.count() == 0
+
+    def test_link_cannot_be_reused(self, app, user):
+        from app.verification import VerificationToken
+
+        token, _ = VerificationToken.create_verification_token(user)
+        client = app.test_client()
+        client.get(f'/verify-email/{token}')
+
+        response = client.get(f'/verify-email/{token}')
+        assert '/resend-verification' in response.headers['Location']
+
+    def test_cleanup_cli(self, app, user):
+        from app import db
+        from app.models import UserToken
+        from app.verification import VerificationToken
+
+        VerificationToken.create_verification_token(user)
+        UserToken.query.one().expires_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+        result = app.test_cli_runner().invoke(args=['cleanup-tokens'])
+        assert 'Deleted 1 expired token(s)' in result.output